@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BulavaArms.settings')
+# Под ASGI каталог и карточка товара — async view с параллельными запросами к БД
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
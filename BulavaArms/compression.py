@@ -0,0 +1,164 @@
+"""
+Сжатие ответов: brotli (если установлен) или gzip по Accept-Encoding.
+
+Сжимаются только текстовые типы (HTML, JSON, CSS, JS, SVG) от
+COMPRESSION_MIN_SIZE байт. Потоковые ответы сжимаются по частям со сбросом
+буфера после каждой: клиент получает каждую часть сразу, а не когда у
+компрессора накопится окно. Статику заранее сжимает collectstatic
+(BulavaArms/storage.py), на лету её сжимать не нужно.
+
+CSRF-токен Django маскирует заново в каждом ответе, поэтому сжатый HTML
+не раскрывает его через BREACH.
+"""
+import gzip
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен, тогда только gzip
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+})
+QUALITY = re.compile(r'q=([0-9.]+)')
+
+
+def compress(content):
+    """Сжатые копии файла для статики (максимальные уровни): {'.gz': bytes, '.br': bytes}"""
+    # mtime=0 — одинаковый .gz при каждой сборке
+    result = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        result['.br'] = brotli.compress(content, quality=11)
+    return result
+
+
+def accepted_encoding(header):
+    """Кодирование ответа по Accept-Encoding: 'br', 'gzip' или None; при равном q — br"""
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        match = QUALITY.search(params)
+        try:
+            weights[coding.strip().lower()] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            weights[coding.strip().lower()] = 0.0
+
+    def weight(coding):
+        return weights.get(coding, weights.get('*', 0.0))
+
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    return max((coding for coding in available if weight(coding) > 0), key=weight, default=None)
+
+
+class GzipEncoder:
+    def __init__(self):
+        # wbits=31 — формат gzip (заголовок и контрольная сумма)
+        self._compressor = zlib.compressobj(getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+ENCODERS = {'br': BrotliEncoder, 'gzip': GzipEncoder}
+
+
+def compress_stream(chunks, encoder):
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def compress_async_stream(chunks, encoder):
+    async for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжатие HTML и JSON ответов. Ставится сразу после RequestStatsMiddleware:
+    остальные middleware (и профилировщик, подменяющий ответ) видят несжатое тело.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compressible(self, response):
+        if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').partition(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return False
+        # У потокового ответа размер заранее неизвестен
+        return response.streaming or len(response.content) >= getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+    def compress(self, request, response):
+        if not self.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = accepted_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        encoder = ENCODERS[encoding]()
+        if response.streaming:
+            stream = compress_async_stream if response.is_async else compress_stream
+            response.streaming_content = stream(response.streaming_content, encoder)
+            del response.headers['Content-Length']
+        else:
+            content = encoder.compress(response.content) + encoder.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # Сильный ETag относится к несжатому телу (RFC 9110, 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
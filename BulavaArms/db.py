@@ -0,0 +1,112 @@
+"""
+Запись в SQLite под конкурентной нагрузкой.
+
+Транзакции открываются как BEGIN IMMEDIATE (transaction_mode в настройках БД),
+поэтому конфликт записи проявляется сразу при входе в транзакцию, а не при
+повышении блокировки посреди неё. Если блокировку не удалось получить за
+busy_timeout, транзакция целиком повторяется с экспоненциальной задержкой.
+"""
+import asyncio
+import functools
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import OperationalError, close_old_connections, connections, transaction
+
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_locked_error(error):
+    """Ошибка блокировки БД, в том числе обёрнутая (UpdateError сессий и т. п.)"""
+    while error is not None:
+        if isinstance(error, OperationalError) and any(message in str(error) for message in LOCKED_MESSAGES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_on_locked(func=None, *, attempts=5, base_delay=0.05, using=None):
+    """
+    Повторить вызов при «database is locked».
+
+    Внутри уже открытой транзакции не повторяет: откатывать и повторять
+    нужно внешнюю транзакцию целиком.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if transaction.get_connection(using).in_atomic_block:
+                return func(*args, **kwargs)
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as error:
+                    if not is_locked_error(error) or attempt == attempts - 1:
+                        raise
+                    # Случайный разброс, чтобы повторы разных воркеров не совпадали
+                    time.sleep(base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+        return wrapper
+
+    return decorator(func) if func else decorator
+
+
+def write_transaction(func=None, *, using=None):
+    """Транзакция записи с повтором при блокировке БД"""
+    def decorator(func):
+        return retry_on_locked(transaction.atomic(using=using)(func), using=using)
+
+    return decorator(func) if func else decorator
+
+
+def _in_atomic_block(using):
+    return transaction.get_connection(using).in_atomic_block
+
+
+def _release_pooled_connections():
+    # Соединение из пула psycopg занято, пока открыто: простаивающие потоки
+    # исполнителя (их больше, чем DATABASE_POOL_MAX_SIZE) выбрали бы весь пул.
+    # close() возвращает его в пул; постоянные соединения без пула остаются
+    # потоку и закрываются по CONN_MAX_AGE.
+    for connection in connections.all(initialized_only=True):
+        if connection.settings_dict.get('OPTIONS', {}).get('pool'):
+            connection.close()
+
+
+def _in_worker(func):
+    def run(*args):
+        # Поток пула живёт дольше запроса: как в начале запроса, закрыть устаревшее соединение
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            _release_pooled_connections()
+    return run
+
+
+async def run_in_pool(func, *args, using=None):
+    """
+    Синхронный код с запросами к БД из async view — в потоке общего пула.
+
+    Под ASGI синхронный код запроса выполняется в новом потоке на каждый
+    запрос, и соединение с БД открывается заново (с холодным кэшем SQLite).
+    Потоки пула живут долго, их постоянные соединения переиспользуются;
+    соединение из пула psycopg после вызова возвращается в пул.
+    Внутри транзакции (и в тестах) код выполняется в потоке запроса:
+    другие соединения не видят данных транзакции.
+    """
+    if await sync_to_async(_in_atomic_block)(using):
+        return await sync_to_async(func)(*args)
+    return await sync_to_async(_in_worker(func), thread_sensitive=False)(*args)
+
+
+async def gather_queries(*funcs, using=None):
+    """
+    Выполнить независимые синхронные функции с запросами к БД одновременно.
+
+    Async ORM Django выполняет все запросы в одном потоке, поэтому gather по
+    acount()/aget() их не распараллеливает. Здесь каждая функция идёт в своём
+    потоке пула со своим соединением (в транзакции — по очереди, см. run_in_pool).
+    """
+    return await asyncio.gather(*(run_in_pool(func, using=using) for func in funcs))
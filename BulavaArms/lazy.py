@@ -0,0 +1,33 @@
+import importlib
+import importlib.util
+
+
+class LazyModule:
+    """
+    Модуль, который импортируется при первом обращении к атрибуту.
+
+    Тяжёлые зависимости, нужные единичным view (requests — только API Новой
+    Пошты, numpy — только движку snapshot), не замедляют запуск воркеров и
+    management-команд. Импорт под общей блокировкой импорта, поэтому первое
+    обращение из нескольких потоков безопасно.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'загружен' if self._module is not None else 'не загружен'
+        return f'<LazyModule {self._name} ({state})>'
+
+
+def lazy_import(name):
+    """LazyModule для установленного модуля или None, если его нет"""
+    if importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
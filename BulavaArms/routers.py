@@ -0,0 +1,158 @@
+"""
+Чтение каталога с реплики.
+
+Запросы к Product, Category и ProductImage уходят на реплику
+(DATABASE_REPLICA) только внутри view, помеченных @read_replica, и только
+если у пользователя не открыто «окно» основной базы. Всё остальное —
+запись, корзина, оформление заказа, админка — работает с основной базой.
+
+Окно: после запроса, который что-то записал (или был не GET/HEAD),
+cookie `primary_until` на REPLICA_STICKY_SECONDS секунд отправляет все
+чтения пользователя на основную базу, пока реплика догоняет изменения.
+
+Данные, которые кэшируются под версией каталога (варианты фильтров,
+фасеты, индексы в памяти, sitemap, кэш страниц), строятся внутри
+primary_reads(): версия берётся с основной базы, и отстающая реплика
+оставила бы в кэше старые данные до следующего изменения каталога.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+REPLICA_MODELS = {'main.Product', 'main.Category', 'main.ProductImage'}
+STICKY_COOKIE = 'primary_until'
+
+
+class RequestRouting:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = False
+        self.wrote = False
+
+
+_routing = ContextVar('request_routing', default=None)
+_primary_reads = ContextVar('primary_reads', default=False)
+
+
+def replica_alias():
+    alias = getattr(settings, 'DATABASE_REPLICA', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def read_replica(view):
+    """Разрешить view (обычной или async) читать каталог с реплики"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            routing = _routing.get()
+            if routing is None:
+                return await view(request, *args, **kwargs)
+            previous, routing.replica = routing.replica, True
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                routing.replica = previous
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        routing = _routing.get()
+        if routing is None:
+            return view(request, *args, **kwargs)
+        previous, routing.replica = routing.replica, True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            routing.replica = previous
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Читать каталог только с основной базы, в том числе внутри @read_replica"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        alias = replica_alias()
+        if (
+            routing is None or not routing.replica or routing.pinned or alias is None or _primary_reads.get()
+            or model._meta.label not in REPLICA_MODELS
+            # Внутри транзакции читаем то, что она записала
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплики приходит с данными (репликация или sync_replica)
+        return db == DEFAULT_DB_ALIAS
+
+
+class StickyPrimaryMiddleware:
+    """Состояние маршрутизации на время запроса и окно основной базы после записи"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = self.routing(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.stick(request, response, routing)
+
+    async def __acall__(self, request):
+        routing = self.routing(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.stick(request, response, routing)
+
+    def routing(self, request):
+        try:
+            pinned = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return RequestRouting(pinned)
+
+    def stick(self, request, response, routing):
+        if replica_alias() and (routing.wrote or request.method not in ('GET', 'HEAD')):
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + seconds:.3f}', max_age=seconds,
+                httponly=True, samesite='Lax',
+            )
+        return response
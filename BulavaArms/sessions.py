@@ -0,0 +1,10 @@
+"""Сессии в БД с повтором записи при блокировке SQLite (SESSION_ENGINE)"""
+from django.contrib.sessions.backends import db
+
+from .db import retry_on_locked
+
+
+class SessionStore(db.SessionStore):
+    @retry_on_locked
+    def save(self, must_create=False):
+        return super().save(must_create=must_create)
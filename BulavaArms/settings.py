@@ -1,11 +1,16 @@
 from pathlib import Path
-from dotenv import load_dotenv
 import os
+import sys
 
-load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# .env необязателен (в продакшене переменные задаёт окружение):
+# python-dotenv импортируется, только если файл есть
+if (BASE_DIR / '.env').is_file():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -28,14 +33,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'django_filters',
     'apps.main',
     'apps.cart',
     'apps.users',
     'apps.payments',
+    'apps.monitoring',
 ]
 
 MIDDLEWARE = [
+    'apps.monitoring.middleware.RequestStatsMiddleware',
+    'BulavaArms.compression.CompressionMiddleware',
+    'BulavaArms.routers.StickyPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.monitoring.profiling.ProfilerMiddleware',
 ]
 # Добавьте после INSTALLED_APPS:
 AUTH_USER_MODEL = 'users.User'
@@ -68,15 +79,92 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'BulavaArms.wsgi.application'
+# Async-варианты каталога и карточки товара; asgi.py включает их по умолчанию
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '0') == '1'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite под конкурентной записью: WAL (читатели не блокируют писателя),
+# ожидание блокировки вместо мгновенной ошибки, BEGIN IMMEDIATE для транзакций
+SQLITE_INIT_COMMAND = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA busy_timeout=5000;'
+    'PRAGMA mmap_size=134217728;'
+    'PRAGMA cache_size=-20000;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
+# DATABASE_ENGINE=postgresql переключает на PostgreSQL (pip install "psycopg[binary,pool]")
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DATABASE_NAME', 'bulava_arms'),
+            'USER': os.getenv('DATABASE_USER', 'bulava_arms'),
+            'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
+            'HOST': os.getenv('DATABASE_HOST', 'localhost'),
+            'PORT': os.getenv('DATABASE_PORT', '5432'),
+            'OPTIONS': {},
+        }
+    }
+    if os.getenv('DATABASE_POOL', '1') == '1':
+        # Пул psycopg в каждом процессе; с пулом соединения не должны быть постоянными
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DATABASE_CONN_MAX_AGE', '60'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'init_command': SQLITE_INIT_COMMAND,
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # Соединение (и его прагмы) живёт между запросами потока
+            'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+# Реплика для чтения каталога: для SQLite — путь к копии базы
+# (обновляется командой sync_replica), для PostgreSQL — имя базы на REPLICA_DATABASE_HOST
+REPLICA_DATABASE = os.getenv('REPLICA_DATABASE')
+if REPLICA_DATABASE:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DATABASE,
+        'HOST': os.getenv('REPLICA_DATABASE_HOST', DATABASES['default'].get('HOST', '')),
+        # В тестах реплика — та же тестовая база
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES['replica']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES['replica']['OPTIONS'] = {'init_command': SQLITE_INIT_COMMAND + 'PRAGMA query_only=ON;'}
+    DATABASE_REPLICA = 'replica'
+
+DATABASE_ROUTERS = ['BulavaArms.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает только основную базу
+REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Для нескольких воркеров нужен общий бэкенд (Redis, Memcached, файловый)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'bulava-arms'),
     }
 }
 
@@ -118,6 +206,12 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# collectstatic: минифицированные CSS/JS с хэшем в имени и копии .gz/.br (BulavaArms/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'BulavaArms.storage.BundleStaticFilesStorage'},
+}
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -127,10 +221,85 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CART_SESSION_ID = 'cart'
+# Сессии в БД с повтором записи при блокировке SQLite
+SESSION_ENGINE = 'BulavaArms.sessions'
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 7
 
 # LiqPay
 LIQPAY_PUBLIC_KEY = os.getenv('LIQPAY_PUBLIC_KEY', '')
 LIQPAY_PRIVATE_KEY = os.getenv('LIQPAY_PRIVATE_KEY', '')
 LIQPAY_CURRENCY = 'UAH'
-NOVA_POST_KEY=os.getenv('NOVA_POST_KEY', '')
\ No newline at end of file
+NOVA_POST_KEY=os.getenv('NOVA_POST_KEY', '')
+
+# Каталог
+# 'orm' — запросы к БД, 'snapshot' — колоночный снимок в памяти процесса (нужен numpy)
+CATALOG_ENGINE = os.getenv('CATALOG_ENGINE', 'orm')
+# Кэш целых страниц (главная, каталог, карточка товара) для анонимных посетителей, секунды
+FULL_PAGE_CACHE = os.getenv('FULL_PAGE_CACHE', '0') == '1'
+FULL_PAGE_CACHE_TIMEOUT = int(os.getenv('FULL_PAGE_CACHE_TIMEOUT', 300))
+# Товаров в LRU процесса перед общим кэшем (apps/main/product_cache.py)
+PRODUCT_CACHE_SIZE = int(os.getenv('PRODUCT_CACHE_SIZE', 1000))
+
+# Сжатие ответов (BulavaArms/compression.py): меньше COMPRESSION_MIN_SIZE байт не сжимается —
+# ответ и так помещается в один TCP-пакет; уровни — компромисс скорости и размера на лету
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_GZIP_LEVEL = 6
+
+# Мониторинг
+# Заголовок Server-Timing со статистикой запроса (SQL, шаблоны, кэш). Его видит
+# любой клиент, поэтому по умолчанию выключен: включать для отладки или на стенде
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', '0') == '1'
+# Сколько одинаковых SELECT за запрос считается вероятным N+1
+NPLUSONE_THRESHOLD = 5
+# В тестах строки лога по каждому запросу не выводятся
+TESTING = sys.argv[1:2] == ['test']
+
+# Медленные запросы: порог, интервал записи одной формы запроса, файл журнала
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_RATE_LIMIT = 60
+LOG_DIR = BASE_DIR / 'logs'
+SLOW_QUERY_LOG_FILE = LOG_DIR / 'slow_queries.log'
+os.makedirs(LOG_DIR, exist_ok=True)
+
+# Метрики Prometheus (/metrics). Для нескольких воркеров — общий каталог файлов процессов
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = 5
+# Если задан, /metrics требует заголовок Authorization: Bearer <токен>
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Профили cProfile: ?profile=1 для сотрудников и выборочный режим {view: N} — 1 из N запросов
+PROFILE_DIR = LOG_DIR / 'profiles'
+PROFILE_SAMPLING = {}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+        # Строки JSON без префикса — их читает команда slow_query_report
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'apps.monitoring': {
+            'handlers': ['console'],
+            'level': 'WARNING' if TESTING else os.getenv('MONITORING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'apps.monitoring.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
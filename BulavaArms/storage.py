@@ -0,0 +1,99 @@
+"""
+Статика для продакшена.
+
+CSS и JS шаблонов лежат в static/ приложений. collectstatic минифицирует их
+(только бандлы приложений проекта из apps/, сторонние файлы — как есть),
+даёт имена с хэшем содержимого (staticfiles.json) и кладёт рядом сжатые копии
+.gz и .br. Веб-сервер отдаёт готовые копии и кэширует файлы навсегда
+(deploy/nginx.conf): новое содержимое — новое имя.
+"""
+import os
+import re
+from functools import cached_property
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .compression import compress
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - без него встроенная минификация
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - без него встроенная минификация
+    rjsmin = None
+
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s*([{};,])\s*|(?<=:)\s+')
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'\s+', ' ', CSS_COMMENT.sub('', text))
+    return CSS_SPACE.sub(lambda match: match.group(1) or '', text).replace(';}', '}').strip()
+
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    # Без разбора JS — только безопасное: отступы, пустые строки и строки-комментарии
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class BundleStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest-хранилище с минификацией CSS/JS и сжатыми копиями"""
+
+    # Текстовые форматы; картинки и woff уже сжаты
+    compressed_extensions = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf', '.eot')
+
+    @cached_property
+    def project_namespaces(self):
+        """Каталоги static/<app>/ приложений проекта; admin и прочие сторонние не минифицируются"""
+        root = Path(settings.BASE_DIR) / 'apps'
+        return frozenset(config.label for config in apps.get_app_configs() if Path(config.path).is_relative_to(root))
+
+    def _save(self, name, content):
+        minify = MINIFIERS.get(os.path.splitext(name)[1])
+        # Уже минифицированные файлы (*.min.js) не трогаем
+        if minify is not None and '.min.' not in name and name.split('/', 1)[0] in self.project_namespaces:
+            content = ContentFile(minify(b''.join(content.chunks()).decode()).encode())
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception) and not dry_run:
+                # Повторный collectstatic: неизменённый файл не пересохраняется, копии уже есть
+                if processed or not self.exists(hashed_name + '.gz'):
+                    self._save_compressed(hashed_name)
+            yield name, hashed_name, processed
+
+    def _save_compressed(self, name):
+        if not name.endswith(self.compressed_extensions):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        for suffix, compressed in compress(content).items():
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+    def stored_name(self, name):
+        # Без collectstatic манифеста нет: в разработке и тестах — исходное имя. В продакшене —
+        # ошибка, а не ссылки без хэша, которые nginx отдал бы с вечным кэшем
+        if not self.hashed_files and (settings.DEBUG or getattr(settings, 'TESTING', False)):
+            return name
+        return super().stored_name(name)
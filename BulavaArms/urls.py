@@ -3,8 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.monitoring.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
+    path('monitoring/', include("apps.monitoring.urls")),
     path('', include("apps.main.urls")),
     path('cart/', include("apps.cart.urls")),
     path('users/', include("apps.users.urls")),
@@ -1,7 +1,8 @@
 # cart/cart.py
 from decimal import Decimal
 from django.conf import settings
-from apps.main.models import Product
+from apps.main.product_cache import product_cache
+from apps.monitoring.metrics import CART_MUTATIONS
 
 
 class Cart:
@@ -10,15 +11,13 @@ class Cart:
     def __init__(self, request):
         """
         Ініціалізація корзини
+
+        Порожня корзина не записується в сесію: інакше сесія зберігалася б
+        у БД на кожному запиті кожного відвідувача.
         """
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        
-        if not cart:
-            # Зберегти порожню корзину в сесії
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        
-        self.cart = cart
+        self.cart = self.session.get(settings.CART_SESSION_ID) or {}
+        self._products = None
     
     def add(self, product, quantity=1, override_quantity=False):
         """
@@ -48,10 +47,19 @@ class Cart:
             self.cart[product_id]['quantity'] += quantity
         
         self.save()
+        CART_MUTATIONS.inc(action='add')
     
     def save(self):
         """Зберегти корзину в сесії"""
+        self.session[settings.CART_SESSION_ID] = self.cart
         self.session.modified = True
+        self._products = None
+
+    def get_products(self):
+        """Товари корзини з кешу товарів, один раз на об'єкт корзини"""
+        if self._products is None:
+            self._products = list(product_cache.get_many(self.cart.keys()).values())
+        return self._products
     
     def remove(self, product):
         """
@@ -65,6 +73,7 @@ class Cart:
         if product_id in self.cart:
             del self.cart[product_id]
             self.save()
+            CART_MUTATIONS.inc(action='remove')
     
     def update_quantity(self, product_id, quantity):
         """
@@ -82,13 +91,10 @@ class Cart:
             else:
                 del self.cart[product_id]
             self.save()
+            CART_MUTATIONS.inc(action='update')
 
     def __iter__(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids) \
-            .select_related('category')
-
-        for product in products:
+        for product in self.get_products():
             # Беремо копію, щоб не змінювати оригінал
             item = self.cart[str(product.id)].copy()
             item['product'] = product
@@ -117,15 +123,9 @@ class Cart:
         """
         Підрахувати суму без знижок (оригінальні ціни)
         """
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        
         subtotal = Decimal('0')
-        for product in products:
-            product_id = str(product.id)
-            if product_id in self.cart:
-                quantity = self.cart[product_id]['quantity']
-                subtotal += product.price * quantity
+        for product in self.get_products():
+            subtotal += product.price * self.cart[str(product.id)]['quantity']
         
         return subtotal
     
@@ -139,8 +139,11 @@ class Cart:
         """
         Очистити корзину
         """
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
+        self.session.pop(settings.CART_SESSION_ID, None)
+        self.session.modified = True
+        self.cart = {}
+        self._products = None
+        CART_MUTATIONS.inc(action='clear')
     
     def get_items_count(self):
         """
@@ -3,6 +3,10 @@ from .cart import Cart
 
 
 def cart(request):
+    # Сторінка для загального кешу: корзину й повідомлення шапка завантажить сама
+    if getattr(request, 'full_page_cache', False):
+        return {'deferred_header': True}
+
     cart_obj = Cart(request)
     
     return {
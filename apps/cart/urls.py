@@ -10,4 +10,5 @@ urlpatterns = [
     path('remove/<int:product_id>/', views.cart_remove, name='cart_remove'),
     path('update/<int:product_id>/', views.cart_update, name='cart_update'),
     path('clear/', views.cart_clear, name='cart_clear'),
+    path('state/', views.cart_state, name='cart_state'),
 ]
\ No newline at end of file
@@ -1,12 +1,22 @@
 # cart/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from apps.main.models import Product
+from django.template.loader import render_to_string
+from django.http import Http404, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET, require_POST
+from apps.main.product_cache import product_cache
 from .cart import Cart
 
 
+def get_product_or_404(product_id):
+    """Товар з кешу товарів або 404"""
+    product = product_cache.get(product_id)
+    if product is None:
+        raise Http404('Товар не знайдено')
+    return product
+
+
 def cart_view(request):
     cart = Cart(request)
     
@@ -36,7 +46,7 @@ def cart_add(request, product_id):
     Додати товар до корзини
     """
     cart = Cart(request)
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
     
     # Перевірка наявності товару
     if not product.in_stock:
@@ -72,7 +82,7 @@ def cart_remove(request, product_id):
     Видалити товар з корзини
     """
     cart = Cart(request)
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
     
     cart.remove(product)
     
@@ -111,7 +121,7 @@ def cart_update(request, product_id):
             return redirect('cart:cart_detail')
         
         # Перевірка наявності на складі
-        product = get_object_or_404(Product, id=product_id)
+        product = get_product_or_404(product_id)
         if not product.in_stock and quantity > 0:
             # Для AJAX
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -158,4 +168,16 @@ def cart_clear(request):
     cart.clear()
     
     messages.success(request, 'Корзину очищено')
-    return redirect('cart:cart_detail')
\ No newline at end of file
+    return redirect('cart:cart_detail')
+
+
+@never_cache
+@require_GET
+def cart_state(request):
+    """
+    Лічильник корзини та повідомлення для сторінок із загального кешу
+    """
+    return JsonResponse({
+        'cart_items_count': len(Cart(request)),
+        'messages': render_to_string('main/messages.html', {'messages': messages.get_messages(request)}),
+    })
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .admin_mixins import CategoryListFilter, LargeTableAdminMixin, ManufacturerListFilter
 from .models import Category, Product, ProductImage
 
 
@@ -17,10 +18,13 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'product_type', 'category', 'price', 'discount_price', 'in_stock', 'status_discount', 'created_at')
-    list_filter = ('product_type', 'category', 'in_stock', 'status_discount', 'manufacturer')
-    search_fields = ('name', 'description', 'manufacturer', 'caliber')
+    list_filter = ('product_type', CategoryListFilter, 'in_stock', 'status_discount', ManufacturerListFilter, 'created_at')
+    list_select_related = ('category',)
+    # Название и описание — подстрока (на PostgreSQL — триграммные индексы из main.0003),
+    # производитель и калибр — префикс
+    search_fields = ('name', 'description', '^manufacturer', '^caliber')
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ('in_stock', 'status_discount')
     
@@ -43,11 +47,10 @@ class ProductAdmin(admin.ModelAdmin):
     inlines = [ProductImageInline]
     
     readonly_fields = ('created_at', 'updated_at')
-    
-    date_hierarchy = 'created_at'
 
 
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
     list_display = ('product', 'image')
-    list_filter = ('product',)
\ No newline at end of file
+    list_filter = ('product',)
+    list_select_related = ('product',)
\ No newline at end of file
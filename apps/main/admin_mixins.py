@@ -0,0 +1,101 @@
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .cache import get_category_choices, get_product_choices
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    Примерное количество строк в таблице без полного COUNT(*).
+
+    PostgreSQL — статистика планировщика (pg_class.reltuples),
+    SQLite — статистика ANALYZE (sqlite_stat1) или MAX(rowid).
+    Возвращает None, если оценка недоступна.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            if row and row[0] is not None and row[0] >= 0:
+                return row[0]
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND idx IS NULL', [table]
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+            return row[0] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц.
+
+    Без фильтров берёт оценку количества строк из статистики БД. С фильтрами
+    считает точно: ограниченный счёт сделал бы страницы дальше предела
+    недоступными (InvalidPage), а фильтры и поиск админки идут по индексам.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None:
+                return estimate
+        return queryset.order_by().count()
+
+
+class LargeTableAdminMixin:
+    """
+    Профиль ModelAdmin для больших таблиц: оценка количества вместо COUNT(*).
+
+    Поля-идентификаторы в `search_fields` стоит искать по префиксу ('^field',
+    istartswith) — индекс выбирает сама СУБД.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class CachedChoicesListFilter(admin.SimpleListFilter):
+    """Фильтр по значению поля товара со списком вариантов из кэша каталога"""
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in get_product_choices(self.field_name)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+
+class ManufacturerListFilter(CachedChoicesListFilter):
+    title = 'Производитель'
+    parameter_name = 'manufacturer'
+    field_name = 'manufacturer'
+
+
+class CategoryListFilter(admin.SimpleListFilter):
+    title = 'Категория'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        return [(str(pk), name) for pk, slug, name in get_category_choices()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(category_id=self.value())
+        return queryset
@@ -0,0 +1,113 @@
+"""
+Подсказки поиска по префиксу.
+
+Индекс — отсортированные массивы ключей в памяти процесса (поиск через
+bisect), пересобираются при смене версии каталога. Ответ на запрос не
+обращается к БД и не зависит от размера каталога: бинарный поиск плюс
+просмотр не более `SCAN_LIMIT` совпадений.
+"""
+from bisect import bisect_left
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+from .cache import ProcessLocalIndex
+from .models import Category, Product
+
+
+# Сколько совпадений по префиксу просматривается для выбора лучших
+SCAN_LIMIT = 200
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Отсортированные ключи с привязанными записями"""
+
+    def __init__(self, entries):
+        # entries: (ключ, вес, запись); один объект может иметь несколько ключей
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self.keys = [key for key, weight, item in entries]
+        self.weights = [weight for key, weight, item in entries]
+        self.items = [item for key, weight, item in entries]
+
+    def search(self, prefix, limit):
+        position = bisect_left(self.keys, prefix)
+        end = min(position + SCAN_LIMIT, len(self.keys))
+        candidates = []
+        seen = set()
+        for index in range(position, end):
+            if not self.keys[index].startswith(prefix):
+                break
+            item = self.items[index]
+            if item['url'] in seen:
+                continue
+            seen.add(item['url'])
+            # Вес по убыванию, затем порядок ключей
+            candidates.append((-self.weights[index], index, item))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        return [item for weight, index, item in candidates[:limit]]
+
+
+class AutocompleteIndex:
+    """Индексы подсказок: товары, производители, калибры, категории"""
+
+    def __init__(self, products, categories):
+        catalog_url = reverse('main:catalog')
+        detail_url = reverse('main:detail_page', args=['__slug__'])
+
+        def filter_url(name, value):
+            return f'{catalog_url}?{urlencode({name: value})}'
+
+        product_entries = []
+        manufacturers = Counter()
+        calibers = Counter()
+        for name, slug, manufacturer, caliber, in_stock in products:
+            item = {'name': name, 'url': detail_url.replace('__slug__', slug)}
+            words = normalize(name).split(' ')
+            # Ключ на каждое слово: «17» находит «Glock 17»
+            for position in range(len(words)):
+                product_entries.append((' '.join(words[position:]), int(in_stock), item))
+            if manufacturer:
+                manufacturers[manufacturer] += 1
+            if caliber:
+                calibers[caliber] += 1
+
+        self.products = PrefixIndex(product_entries)
+        self.manufacturers = PrefixIndex(
+            (normalize(name), count, {'name': name, 'count': count, 'url': filter_url('manufacturer', name)})
+            for name, count in manufacturers.items()
+        )
+        self.calibers = PrefixIndex(
+            (normalize(name), count, {'name': name, 'count': count, 'url': filter_url('caliber', name)})
+            for name, count in calibers.items()
+        )
+        self.categories = PrefixIndex(
+            (normalize(name), 0, {'name': name, 'url': filter_url('category', slug)})
+            for name, slug in categories
+        )
+
+    @classmethod
+    def build(cls):
+        products = Product.objects.order_by().values_list(
+            'name', 'slug', 'manufacturer', 'caliber', 'in_stock'
+        )
+        categories = Category.objects.values_list('name', 'slug')
+        return cls(list(products), list(categories))
+
+    def suggest(self, query, limit=5):
+        prefix = normalize(query)
+        if not prefix:
+            return {'products': [], 'manufacturers': [], 'calibers': [], 'categories': []}
+        return {
+            'products': self.products.search(prefix, limit),
+            'manufacturers': self.manufacturers.search(prefix, limit),
+            'calibers': self.calibers.search(prefix, limit),
+            'categories': self.categories.search(prefix, limit),
+        }
+
+
+autocomplete_index = ProcessLocalIndex(AutocompleteIndex.build)
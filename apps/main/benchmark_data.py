@@ -0,0 +1,143 @@
+"""Синтетические данные для команд-бенчмарков"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+
+from apps.payments.models import Order, OrderItem
+
+from .models import Category, Product, ProductImage
+
+
+class Rollback(Exception):
+    """Откат транзакции с синтетическими данными после замеров"""
+
+
+def seed_catalog(products_count, categories_count=20, manufacturers_count=300, seed=42):
+    """Создать категории и товары пачками, вернуть список категорий"""
+    rng = random.Random(seed)
+    categories = Category.objects.bulk_create(
+        Category(name=f'Bench category {i}', slug=f'bench-category-{i}')
+        for i in range(categories_count)
+    )
+    manufacturers = [f'Maker {i}' for i in range(manufacturers_count)]
+    calibers = [f'{i}mm' for i in range(5, 60)]
+
+    def product(i):
+        price = Decimal(rng.randint(100, 100_000))
+        discounted = rng.random() > 0.8
+        return Product(
+            name=f'Bench product {i}',
+            slug=f'bench-product-{i}',
+            description='Lorem ipsum ' * 20,
+            price=price,
+            product_type=rng.choice(Product.PRODUCT_TYPES)[0],
+            category=rng.choice(categories),
+            manufacturer=rng.choice(manufacturers),
+            caliber=rng.choice(calibers),
+            main_image='products/bench.jpg',
+            in_stock=rng.random() > 0.2,
+            status_discount=discounted,
+            discount_price=(price * Decimal('0.9')).quantize(Decimal('1.00')) if discounted else None,
+        )
+
+    Product.objects.bulk_create((product(i) for i in range(products_count)), batch_size=2000)
+    return categories
+
+
+def seed_images(products, per_product, seed=42):
+    """Дополнительные изображения для товаров"""
+    rng = random.Random(seed)
+    ProductImage.objects.bulk_create(
+        (
+            ProductImage(product_id=product_id, image='products/bench.jpg')
+            for product_id in products
+            for _ in range(rng.randint(0, per_product * 2))
+        ),
+        batch_size=2000,
+    )
+
+
+def seed_users(count):
+    """Покупатели с одним паролем `bench-password`"""
+    User = get_user_model()
+    password = make_password('bench-password')
+    return User.objects.bulk_create(
+        (
+            User(
+                username=f'bench-user-{i}',
+                email=f'bench-user-{i}@example.com',
+                phone=f'+380{i:09d}',
+                city='Київ',
+                password=password,
+            )
+            for i in range(count)
+        ),
+        batch_size=2000,
+    )
+
+
+def seed_orders(count, users, products, max_items=4, seed=42):
+    """
+    Заказы с позициями. `products` — список (id, name, price),
+    примерно треть заказов без пользователя (гости).
+    """
+    rng = random.Random(seed)
+    statuses = [status for status, label in Order.STATUS_CHOICES]
+    orders = []
+    items = []
+    for i in range(count):
+        user = rng.choice(users) if users and rng.random() > 0.3 else None
+        lines = [(rng.choice(products), rng.randint(1, 3)) for _ in range(rng.randint(1, max_items))]
+        total = sum(price * quantity for (pk, name, price), quantity in lines)
+        orders.append(Order(
+            order_id=f'BENCH-{i:012X}',
+            user=user,
+            email=user.email if user else f'guest{i}@example.com',
+            phone=f'+380{rng.randrange(10 ** 9):09d}',
+            city='Київ',
+            subtotal=total,
+            total=total,
+            status=rng.choice(statuses),
+        ))
+        items.append(lines)
+
+    orders = Order.objects.bulk_create(orders, batch_size=2000)
+    OrderItem.objects.bulk_create(
+        (
+            OrderItem(order=order, product_id=pk, product_name=name, quantity=quantity, unit_price=price)
+            for order, lines in zip(orders, items)
+            for (pk, name, price), quantity in lines
+        ),
+        batch_size=2000,
+    )
+    return orders
+
+
+def catalog_requests(rng, count=500):
+    """Набор URL с одинаковым распределением для любой базы с теми же данными"""
+    catalog = reverse('main:catalog')
+    categories = list(Category.objects.order_by('slug').values_list('slug', flat=True))
+    manufacturers = list(
+        Product.objects.exclude(manufacturer='').order_by('manufacturer')
+        .values_list('manufacturer', flat=True).distinct()[:50]
+    )
+    slugs = list(Product.objects.order_by('pk').values_list('slug', flat=True)[:1000])
+    words = ['pro', 'tactical', '9mm', 'scope', 'product 1']
+
+    requests = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.3:
+            requests.append((catalog, {'page': str(rng.randint(1, 20))}))
+        elif kind < 0.5:
+            requests.append((catalog, {'category': rng.choice(categories), 'sort': 'price'}))
+        elif kind < 0.6:
+            requests.append((catalog, {'manufacturer': rng.choice(manufacturers), 'in_stock': 'true'}))
+        elif kind < 0.7:
+            requests.append((catalog, {'search': rng.choice(words)}))
+        else:
+            requests.append((reverse('main:detail_page', args=[rng.choice(slugs)]), {}))
+    return requests
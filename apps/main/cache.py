@@ -0,0 +1,112 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from BulavaArms.routers import primary_reads
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def _initial_version():
+    # Версия от времени, чтобы после очистки кэша не вернуться к старым ключам
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """Текущая версия каталога (меняется при любом изменении товаров и категорий)"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Инвалидировать все данные, закэшированные под текущей версией каталога"""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = _initial_version()
+        cache.set(CATALOG_VERSION_KEY, version, None)
+        return version
+
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def catalog_cache_key(name):
+    """Ключ кэша, привязанный к текущей версии каталога"""
+    return f'catalog:{name}:{get_catalog_version()}'
+
+
+def get_product_choices(field):
+    """Уникальные непустые значения поля товара (производители, калибры)"""
+    from .models import Product
+
+    key = catalog_cache_key(f'choices:{field}')
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(
+            Product.objects.using(DEFAULT_DB_ALIAS)
+            .exclude(**{field: ''})
+            .order_by(field)
+            .values_list(field, flat=True)
+            .distinct()
+        )
+        cache.set(key, choices, CATALOG_CACHE_TIMEOUT)
+    return choices
+
+
+def get_category_choices():
+    """Список категорий (id, slug, name) без обращения к БД при повторных вызовах"""
+    from .models import Category
+
+    key = catalog_cache_key('choices:category')
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(Category.objects.using(DEFAULT_DB_ALIAS).values_list('id', 'slug', 'name'))
+        cache.set(key, choices, CATALOG_CACHE_TIMEOUT)
+    return choices
+
+
+class ProcessLocalIndex:
+    """
+    Структура данных в памяти процесса, привязанная к версии каталога.
+
+    `builder()` вызывается при первом обращении и после каждой смены версии
+    каталога. Версия проверяется не чаще, чем раз в
+    CATALOG_LOCAL_CHECK_INTERVAL секунд (по умолчанию — при каждом вызове).
+    Структура строится по основной базе, как и версия каталога.
+    """
+
+    def __init__(self, builder):
+        self.builder = builder
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self):
+        interval = getattr(settings, 'CATALOG_LOCAL_CHECK_INTERVAL', 0)
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < interval:
+            return self._value
+
+        version = get_catalog_version()
+        self._checked_at = now
+        if self._value is None or version != self._version:
+            with self._lock:
+                if self._value is None or version != self._version:
+                    with primary_reads():
+                        self._value = self.builder()
+                    self._version = version
+        return self._value
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._version = None
@@ -0,0 +1,41 @@
+"""
+Кэш отрисованных карточек товаров.
+
+Карточка зависит только от самого товара, поэтому ключ — id и updated_at:
+одна и та же карточка переиспользуется на всех страницах каталога и в любых
+блоках с товарами. CSRF-токен пользователя в кэш не попадает — вместо него
+хранится заглушка, которая подставляется при сборке страницы.
+"""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+
+PRODUCT_CARD_TEMPLATE = 'main/product-card.html'
+# Увеличить при изменении разметки карточки
+PRODUCT_CARD_VERSION = 1
+PRODUCT_CARD_TIMEOUT = 60 * 60 * 24
+CSRF_PLACEHOLDER = 'product-card-csrf-token'
+
+
+def product_card_key(product):
+    return f'card:{PRODUCT_CARD_VERSION}:{product.pk}:{product.updated_at.timestamp():.6f}'
+
+
+def render_product_cards(products, csrf_token=''):
+    """HTML карточек в порядке товаров: один get_many и не больше одного set_many"""
+    products = list(products)
+    keys = [product_card_key(product) for product in products]
+    cards = cache.get_many(keys)
+
+    missing = {}
+    for product, key in zip(products, keys):
+        if key not in cards:
+            missing[key] = render_to_string(
+                PRODUCT_CARD_TEMPLATE, {'product': product, 'csrf_token': CSRF_PLACEHOLDER},
+            )
+    if missing:
+        cache.set_many(missing, PRODUCT_CARD_TIMEOUT)
+        cards.update(missing)
+
+    html = ''.join(cards[key] for key in keys)
+    return html.replace(CSRF_PLACEHOLDER, str(csrf_token or ''))
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db.models import CharField, Count, F, Q, Value
+from django.db.models.functions import Cast
+
+from BulavaArms.routers import primary_reads
+from .cache import CATALOG_CACHE_TIMEOUT, catalog_cache_key, get_category_choices
+
+
+# Значение фасета в виде строки, чтобы все группы уместились в один UNION
+FACET_VALUES = {
+    'category': Cast('category_id', output_field=CharField()),
+    'manufacturer': F('manufacturer'),
+    'caliber': F('caliber'),
+}
+FLAG_FACETS = ('in_stock', 'status_discount')
+
+
+def facet_counts(product_filter):
+    """
+    Дизъюнктивные счётчики фасетов одним запросом.
+
+    Для каждой группы считаются товары, прошедшие все фильтры, кроме
+    фильтра самой группы (выбор производителя не обнуляет соседних
+    производителей, но сужает калибры и категории). Группы считаются
+    GROUP BY-ветками, объединёнными в один UNION ALL: один проход к БД,
+    а стоимость не растёт с числом значений в группах.
+
+    Возвращает {группа: {значение: количество}}.
+    """
+    base = product_filter.filter_queryset(
+        product_filter.queryset.model.objects.order_by(),
+        exclude=product_filter.facet_fields + ('sort',),
+    )
+    conditions = product_filter.facet_conditions()
+
+    branches = []
+    for group in product_filter.facet_fields:
+        others = Q(*[condition for name, condition in conditions.items() if name != group])
+        branch = base.filter(others)
+        if group in FLAG_FACETS:
+            branch = branch.filter(**{group: True})
+            value = Value('1', output_field=CharField())
+        else:
+            value = FACET_VALUES[group]
+        branches.append(
+            branch.annotate(facet=Value(group, output_field=CharField()), value=value)
+            .values('facet', 'value')
+            .annotate(count=Count('pk'))
+            .values_list('facet', 'value', 'count')
+        )
+
+    counts = {group: {} for group in product_filter.facet_fields}
+    for group, value, count in branches[0].union(*branches[1:], all=True):
+        counts[group][value] = count
+    return counts
+
+
+def cached_facet_counts(product_filter):
+    """facet_counts; для каталога без фильтров (самая частая страница) — из кэша каталога"""
+    data = product_filter.form.cleaned_data
+    if any(value not in (None, '', []) for name, value in data.items() if name != 'sort'):
+        return facet_counts(product_filter)
+    key = catalog_cache_key('facets')
+    counts = cache.get(key)
+    if counts is None:
+        # Под версией основной базы — и данные с неё
+        with primary_reads():
+            counts = facet_counts(product_filter)
+        cache.set(key, counts, CATALOG_CACHE_TIMEOUT)
+    return counts
+
+
+def build_sidebar(product_filter, counts):
+    """Списки для сайдбара каталога: значения с товарами и уже выбранные"""
+    data = product_filter.form.cleaned_data
+
+    selected_categories = set(data.get('category') or [])
+    categories = [
+        {'id': pk, 'slug': slug, 'name': name, 'product_count': counts['category'].get(str(pk), 0)}
+        for pk, slug, name in get_category_choices()
+        if str(pk) in counts['category'] or slug in selected_categories
+    ]
+
+    def values(group):
+        selected = set(data.get(group) or [])
+        names = sorted((set(counts[group]) | selected) - {''})
+        return [{group: name, 'count': counts[group].get(name, 0)} for name in names]
+
+    return {
+        'categories': categories,
+        'manufacturers': values('manufacturer'),
+        'calibers': values('caliber'),
+        'in_stock_count': counts['in_stock'].get('1', 0),
+        'discount_count': counts['status_discount'].get('1', 0),
+    }
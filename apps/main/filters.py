@@ -1,81 +1,188 @@
 import django_filters
+from django.db.models import Q
+
+from .cache import get_category_choices, get_product_choices
 from .models import Product
+from .search import search_index
+
+
+# Если обычный поиск находит меньше товаров, добавляются нечёткие совпадения
+FUZZY_MIN_RESULTS = 3
+
+
+class SubmittedValuesField(django_filters.fields.MultipleChoiceField):
+    """
+    Варианты из кэша каталога — только для формы: значение не из списка
+    (устаревшая ссылка, кэш ещё не обновился) не отбрасывается при проверке,
+    а фильтрует как есть и ничего не находит — вместо всего каталога.
+    """
+
+    def to_python(self, value):
+        return [item for item in super().to_python(value) if item]
+
+    def valid_value(self, value):
+        return True
+
+
+class SubmittedValuesFilter(django_filters.MultipleChoiceFilter):
+    field_class = SubmittedValuesField
 
 
 class ProductFilter(django_filters.FilterSet):
-    """Фильтр для товаров"""
-    
+    """
+    Фильтр для товаров.
+
+    Списки вариантов (производители, калибры, категории) берутся из кэша
+    каталога, поэтому создание фильтра не обращается к БД.
+    """
+
+    # Поиск по названию, описанию и производителю
+    search = django_filters.CharFilter(
+        method='filter_search',
+        label='Поиск'
+    )
+
     # Фильтр по названию (поиск)
     name = django_filters.CharFilter(
         lookup_expr='icontains',
         label='Поиск по названию'
     )
-    
+
     # Фильтр по производителю (бренду)
-    manufacturer = django_filters.MultipleChoiceFilter(
+    manufacturer = SubmittedValuesFilter(
         choices=[],  # Будет заполнено динамически
+        distinct=False,
         label='Производитель'
     )
-    
+
     # Фильтр по калибру
-    caliber = django_filters.MultipleChoiceFilter(
+    caliber = SubmittedValuesFilter(
         choices=[],  # Будет заполнено динамически
+        distinct=False,
         label='Калибр'
     )
-    
+
     # Фильтр по цене (диапазон)
     price_min = django_filters.NumberFilter(
         field_name='price',
         lookup_expr='gte',
         label='Цена от'
     )
-    
+
     price_max = django_filters.NumberFilter(
         field_name='price',
         lookup_expr='lte',
         label='Цена до'
     )
-    
+
     # Фильтр по наличию
     in_stock = django_filters.BooleanFilter(
         label='В наличии'
     )
-    
+
     # Фильтр по скидке
     status_discount = django_filters.BooleanFilter(
         label='Товары со скидкой'
     )
-    
-    # Фильтр по категории
-    category = django_filters.ModelMultipleChoiceFilter(
-        queryset=None,  # Будет установлено в __init__
+
+    # Фильтр по категории (по slug)
+    category = SubmittedValuesFilter(
+        choices=[],  # Будет заполнено динамически
+        method='filter_category',
         label='Категория'
     )
-    
+
     # Фильтр по типу товара
     product_type = django_filters.MultipleChoiceFilter(
         choices=Product.PRODUCT_TYPES,
+        distinct=False,
         label='Тип товара'
     )
-    
+
+    # Сортировка
+    sort = django_filters.OrderingFilter(
+        fields=('price', 'name', 'created_at', 'discount_price'),
+        label='Сортировка'
+    )
+
+    # Фасетные группы сайдбара (счётчики считаются по всем фильтрам, кроме своего)
+    facet_fields = ('category', 'manufacturer', 'caliber', 'in_stock', 'status_discount')
+
     class Meta:
         model = Product
-        fields = ['manufacturer', 'caliber', 'in_stock', 'status_discount', 
+        fields = ['manufacturer', 'caliber', 'in_stock', 'status_discount',
                   'category', 'product_type']
-    
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        
-        # Динамически получаем уникальные производители
-        manufacturers = Product.objects.values_list('manufacturer', flat=True).distinct()
-        manufacturer_choices = [(m, m) for m in manufacturers if m]
-        self.filters['manufacturer'].extra['choices'] = manufacturer_choices
-        
-        # Динамически получаем уникальные калибры
-        calibers = Product.objects.values_list('caliber', flat=True).distinct()
-        caliber_choices = [(c, c) for c in calibers if c]
-        self.filters['caliber'].extra['choices'] = caliber_choices
-        
-        # Устанавливаем queryset для категорий
-        from .models import Category
-        self.filters['category'].queryset = Category.objects.all()
\ No newline at end of file
+
+        self.filters['manufacturer'].extra['choices'] = [
+            (m, m) for m in get_product_choices('manufacturer')
+        ]
+        self.filters['caliber'].extra['choices'] = [
+            (c, c) for c in get_product_choices('caliber')
+        ]
+
+        categories = get_category_choices()
+        self.category_ids = {slug: pk for pk, slug, name in categories}
+        self.filters['category'].extra['choices'] = [
+            (slug, name) for pk, slug, name in categories
+        ]
+
+    def filter_queryset(self, queryset, exclude=()):
+        """Применить фильтры формы, кроме перечисленных в `exclude`"""
+        for name, value in self.form.cleaned_data.items():
+            if name not in exclude:
+                queryset = self.filters[name].filter(queryset, value)
+        return queryset
+
+    def facet_conditions(self):
+        """Условия (Q) выбранных значений по каждой фасетной группе"""
+        data = self.form.cleaned_data
+        conditions = {}
+        if data.get('category'):
+            conditions['category'] = Q(category_id__in=self.category_pks(data['category']))
+        if data.get('manufacturer'):
+            conditions['manufacturer'] = Q(manufacturer__in=data['manufacturer'])
+        if data.get('caliber'):
+            conditions['caliber'] = Q(caliber__in=data['caliber'])
+        for field in ('in_stock', 'status_discount'):
+            if data.get(field) is not None:
+                conditions[field] = Q(**{field: data[field]})
+        return conditions
+
+    def filter_search(self, queryset, name, value):
+        return queryset.filter(self.search_condition(value))
+
+    def search_condition(self, value):
+        """
+        Условие поиска: icontains, а если по всему каталогу это даёт меньше
+        FUZZY_MIN_RESULTS товаров — ещё и нечёткие совпадения по триграммам.
+
+        Считается один раз на фильтр: фасетные запросы используют тот же результат.
+        """
+        cached = getattr(self, '_search_condition', None)
+        if cached and cached[0] == value:
+            return cached[1]
+
+        condition = (
+            Q(name__icontains=value) |
+            Q(description__icontains=value) |
+            Q(manufacturer__icontains=value)
+        )
+        exact_count = Product.objects.filter(condition).order_by().values('pk')[:FUZZY_MIN_RESULTS].count()
+        if exact_count < FUZZY_MIN_RESULTS:
+            fuzzy_ids = search_index.get().search(value)
+            if fuzzy_ids:
+                condition |= Q(pk__in=fuzzy_ids)
+        self._search_condition = (value, condition)
+        return condition
+
+    def category_pks(self, slugs):
+        """id категорий по slug; неизвестный slug не соответствует ни одной"""
+        return [self.category_ids[slug] for slug in slugs if slug in self.category_ids]
+
+    def filter_category(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(category_id__in=self.category_pks(value))
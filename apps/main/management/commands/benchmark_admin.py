@@ -0,0 +1,113 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.main.admin import ProductAdmin
+from apps.main.benchmark_data import Rollback, seed_catalog
+from apps.main.models import Product
+from apps.payments.admin import OrderAdmin
+from apps.payments.models import Order
+
+
+class StockProductAdmin(admin.ModelAdmin):
+    """Исходная конфигурация ProductAdmin для сравнения"""
+    list_display = ProductAdmin.list_display
+    list_filter = ('product_type', 'category', 'in_stock', 'status_discount', 'manufacturer')
+    search_fields = ('name', 'description', 'manufacturer', 'caliber')
+    date_hierarchy = 'created_at'
+
+
+class StockOrderAdmin(admin.ModelAdmin):
+    """Исходная конфигурация OrderAdmin для сравнения"""
+    list_display = ('order_id', 'email', 'status', 'total', 'created_at', 'city', 'address')
+    list_filter = ('status', 'created_at')
+    search_fields = ('order_id', 'email', 'phone', 'liqpay_payment_id', 'liqpay_order_id')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает количество запросов и время загрузки списков товаров и заказов '
+        'в админке (исходная конфигурация и профиль для больших таблиц). '
+        'Данные создаются внутри транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--orders', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['products'], options['orders'])
+                self.run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, products_count, orders_count):
+        started = time.perf_counter()
+        rng = random.Random(42)
+        seed_catalog(products_count)
+        Order.objects.bulk_create(
+            (
+                Order(
+                    order_id=f'ORDER-{i:012X}',
+                    email=f'customer{i}@example.com',
+                    phone=f'+380{i:09d}',
+                    liqpay_payment_id=str(1_000_000 + i),
+                    subtotal=Decimal('100.00'),
+                    total=Decimal('100.00'),
+                    status=rng.choice(Order.STATUS_CHOICES)[0],
+                )
+                for i in range(orders_count)
+            ),
+            batch_size=2000,
+        )
+        self.stdout.write(
+            f'Создано {products_count} товаров и {orders_count} заказов '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+
+    def run(self, repeat):
+        user = get_user_model().objects.create_superuser(
+            username='bench-admin', email='bench-admin@example.com', password='bench'
+        )
+        scenarios = [
+            ('products', Product, StockProductAdmin, ProductAdmin, {}),
+            ('products ?manufacturer', Product, StockProductAdmin, ProductAdmin, {'manufacturer': 'Maker 7'}),
+            ('products ?q', Product, StockProductAdmin, ProductAdmin, {'q': 'Bench product 99'}),
+            ('orders', Order, StockOrderAdmin, OrderAdmin, {}),
+            ('orders ?q=order_id', Order, StockOrderAdmin, OrderAdmin, {'q': 'ORDER-000000001F'}),
+            ('orders ?q=email', Order, StockOrderAdmin, OrderAdmin, {'q': 'customer4242@'}),
+        ]
+        self.stdout.write(f'{"scenario":<24}{"profile":<8}{"queries":>8}{"ms":>10}')
+        for title, model, stock_class, tuned_class, params in scenarios:
+            for profile, admin_class in (('stock', stock_class), ('tuned', tuned_class)):
+                model_admin = admin_class(model, admin.site)
+                queries, elapsed = self.measure(model_admin, user, params, repeat)
+                self.stdout.write(f'{title:<24}{profile:<8}{queries:>8}{elapsed * 1000:>10.1f}')
+
+    def measure(self, model_admin, user, params, repeat):
+        factory = RequestFactory()
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            request = factory.get('/admin/', params)
+            request.user = user
+            request.session = SessionStore()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = model_admin.changelist_view(request)
+                response.render()
+                timings.append(time.perf_counter() - started)
+            queries = len(context.captured_queries)
+        return queries, min(timings)
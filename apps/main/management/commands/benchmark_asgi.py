@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from apps.main.benchmark_data import catalog_requests
+from apps.main.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Задержка и пропускная способность каталога и карточки товара под WSGI '
+        '(синхронные view, пул потоков как у gthread) и ASGI (async view с '
+        'параллельными запросами, один цикл событий как у воркера uvicorn) '
+        'при разном числе одновременных запросов. Обработчики Django вызываются '
+        'напрямую, без сервера и сети; каждый режим — в отдельном процессе. '
+        'Нужны сохранённые данные (generate_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32', help='Числа одновременных запросов через запятую')
+        parser.add_argument('--duration', type=float, default=10, help='Секунд на каждый уровень')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], help='Только один режим (JSON в stdout)')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run(options['mode'], levels, options)))
+            return
+
+        results = {}
+        for mode in ('wsgi', 'asgi'):
+            command = [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_asgi', '--mode', mode,
+                '--concurrency', options['concurrency'], '--duration', str(options['duration']),
+                '--seed', str(options['seed']),
+            ]
+            environment = {**os.environ, 'ASYNC_VIEWS': '1' if mode == 'asgi' else '0'}
+            process = subprocess.run(command, env=environment, capture_output=True, text=True)
+            if process.returncode:
+                raise CommandError(f'{mode}: {process.stderr.strip()}')
+            results[mode] = json.loads(process.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f'{"concurrency":>11}{"mode":>6}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}')
+        for level in levels:
+            for mode in ('wsgi', 'asgi'):
+                row = results[mode][str(level)]
+                self.stdout.write(
+                    f'{level:>11}{mode:>6}{row["throughput"]:>9.1f}{row["p50"]:>9.1f}'
+                    f'{row["p95"]:>9.1f}{row["errors"]:>8}'
+                )
+
+    def run(self, mode, levels, options):
+        if mode == 'asgi' and not settings.ASYNC_VIEWS:
+            raise CommandError('Режим asgi запускается с ASYNC_VIEWS=1')
+        if not Product.objects.exists():
+            raise CommandError('Каталог пуст: запустите generate_data')
+        requests = catalog_requests(random.Random(options['seed']))
+        cache.clear()
+        load = self.load_wsgi if mode == 'wsgi' else self.load_asgi
+
+        logging.disable(logging.INFO)
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                load(requests, levels[-1], 2, options['seed'])
+                for level in levels:
+                    timings, errors, elapsed = load(requests, level, options['duration'], options['seed'])
+                    results[level] = {
+                        'throughput': len(timings) / elapsed,
+                        'p50': statistics.median(timings) * 1000,
+                        'p95': statistics.quantiles(timings, n=100, method='inclusive')[94] * 1000,
+                        'errors': errors,
+                    }
+        finally:
+            logging.disable(logging.NOTSET)
+        return results
+
+    def load_wsgi(self, requests, concurrency, duration, seed):
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        timings, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def start_response(status, headers, exc_info=None):
+            start_response.status = int(status.split()[0])
+
+        def worker(number):
+            rng = random.Random(seed + number)
+            while time.perf_counter() < deadline:
+                path, params = rng.choice(requests)
+                started = time.perf_counter()
+                response = handler(factory.get(path, params).environ, start_response)
+                b''.join(response)
+                # close() отправляет request_finished: соединения с БД живут как под сервером
+                response.close()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    timings.append(elapsed)
+                    if response.status_code >= 400:
+                        errors.append(path)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(worker, range(concurrency)))
+        return timings, len(errors), time.perf_counter() - started
+
+    def load_asgi(self, requests, concurrency, duration, seed):
+        handler = ASGIHandler()
+        timings, errors = [], []
+
+        async def request(path, params):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': urlencode(params).encode(), 'root_path': '',
+                'headers': [(b'host', b'testserver')],
+                'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            }
+            body = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            status = []
+
+            async def receive():
+                if body:
+                    return body.pop()
+                # Клиент не отключается: обработчик отменит ожидание сам
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            await handler(scope, receive, send)
+            return status[0]
+
+        async def worker(number, deadline):
+            rng = random.Random(seed + number)
+            while time.perf_counter() < deadline:
+                path, params = rng.choice(requests)
+                started = time.perf_counter()
+                if await request(path, params) >= 400:
+                    errors.append(path)
+                timings.append(time.perf_counter() - started)
+
+        async def main():
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(*(worker(number, deadline) for number in range(concurrency)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return timings, len(errors), time.perf_counter() - started
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.main.benchmark_data import Rollback, seed_catalog
+from apps.main.snapshot import np, snapshot_index
+from apps.main.views import catalog
+
+
+SCENARIOS = [
+    {},
+    {'sort': 'price'},
+    {'category': ['bench-category-3']},
+    {'category': ['bench-category-3', 'bench-category-7'], 'sort': '-price'},
+    {'manufacturer': ['Maker 1', 'Maker 2'], 'in_stock': 'true'},
+    {'caliber': ['9mm'], 'price_min': '1000', 'price_max': '50000', 'sort': 'name'},
+    {'status_discount': 'true', 'in_stock': 'true', 'page': '20'},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает движки каталога (ORM и колоночный снимок) на синтетических '
+        'данных. Данные создаются внутри транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=30_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('Для движка snapshot нужен numpy')
+        try:
+            with transaction.atomic():
+                seed_catalog(options['products'])
+                cache.clear()
+                self.run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+        snapshot_index.clear()
+
+    def run(self, repeat):
+        started = time.perf_counter()
+        with override_settings(CATALOG_ENGINE='snapshot'):
+            snapshot_index.get()
+        self.stdout.write(f'Сборка снимка: {(time.perf_counter() - started) * 1000:.0f} мс')
+
+        self.stdout.write(f'{"scenario":<70}{"engine":<10}{"queries":>8}{"median ms":>11}')
+        for params in SCENARIOS:
+            title = '&'.join(f'{key}={value}' for key, value in params.items()) or '(без фильтров)'
+            for engine in ('orm', 'snapshot'):
+                with override_settings(CATALOG_ENGINE=engine):
+                    queries, timings = self.measure(params, repeat)
+                self.stdout.write(
+                    f'{title[:68]:<70}{engine:<10}{queries:>8}{statistics.median(timings) * 1000:>11.1f}'
+                )
+
+    def measure(self, params, repeat):
+        factory = RequestFactory()
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            request = factory.get('/catalog', params)
+            request.session = SessionStore()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                catalog(request)
+                timings.append(time.perf_counter() - started)
+            queries = len(context.captured_queries)
+        return queries, timings
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.main.models import Product
+from apps.main.warmup import prepare_fork, warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Время до первого байта у свежего воркера: процесс с загруженным Django '
+        'порождает воркер через fork (как gunicorn с preload_app), воркер '
+        'обрабатывает первые запросы к главной, каталогу, поиску и карточке товара. '
+        'Режим cold — без прогрева, preload — мастер до fork выполняет warm_up. '
+        'Каждый запуск — в новом процессе. Нужны сохранённые данные (generate_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--mode', choices=['cold', 'preload'], help='Один запуск (JSON в stdout)')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run(options['mode'])))
+            return
+        if not Product.objects.exists():
+            raise CommandError('Каталог пуст: запустите generate_data')
+
+        results = {'cold': [], 'preload': []}
+        for _ in range(options['runs']):
+            for mode in results:
+                command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_cold_start', '--mode', mode]
+                process = subprocess.run(command, capture_output=True, text=True)
+                if process.returncode:
+                    raise CommandError(f'{mode}: {process.stderr.strip()}')
+                results[mode].append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+        paths = list(results['cold'][0]['first'])
+        self.stdout.write(f'{"":<24}{"cold, мс":>12}{"preload, мс":>14}')
+        for path in paths:
+            for attempt in ('first', 'second'):
+                label = path if attempt == 'first' else '  повторно'
+                cold = statistics.median(run[attempt][path] for run in results['cold'])
+                warm = statistics.median(run[attempt][path] for run in results['preload'])
+                self.stdout.write(f'{label:<24}{cold:>12.1f}{warm:>14.1f}')
+        warm_up_ms = statistics.median(run['warm_up'] for run in results['preload'])
+        self.stdout.write(f'Прогрев в мастере (до fork, вне запросов): {warm_up_ms:.0f} мс')
+
+    def run(self, mode):
+        product = Product.objects.order_by('-created_at').only('name', 'slug').first()
+        paths = [
+            (reverse('main:main_page'), {}),
+            (reverse('main:catalog'), {}),
+            (reverse('main:catalog'), {'search': product.name.split()[0]}),
+            (reverse('main:detail_page', args=[product.slug]), {}),
+        ]
+        warm_up_ms = 0
+        if mode == 'preload':
+            started = time.perf_counter()
+            warm_up()
+            warm_up_ms = (time.perf_counter() - started) * 1000
+        prepare_fork()
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            result = None
+            try:
+                result = self.first_requests(paths)
+            finally:
+                with os.fdopen(write_fd, 'w') as pipe:
+                    pipe.write(json.dumps(result))
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            result = json.loads(pipe.read())
+        os.waitpid(pid, 0)
+        if result is None:
+            raise CommandError('Воркер завершился с ошибкой')
+        return {'warm_up': warm_up_ms, **result}
+
+    def first_requests(self, paths):
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        def start_response(status, headers, exc_info=None):
+            pass
+
+        timings = {'first': {}, 'second': {}}
+        logging.disable(logging.INFO)
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for attempt in timings:
+                for path, params in paths:
+                    label = path + ('?search' if params else '')
+                    started = time.perf_counter()
+                    response = handler(factory.get(path, params).environ, start_response)
+                    b''.join(response)
+                    timings[attempt][label] = (time.perf_counter() - started) * 1000
+                    response.close()
+        return timings
@@ -0,0 +1,132 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from BulavaArms.db import LOCKED_MESSAGES
+
+
+SCHEMA = '''
+CREATE TABLE session (key TEXT PRIMARY KEY, data TEXT, expire REAL);
+CREATE TABLE orders (id INTEGER PRIMARY KEY, session TEXT, total REAL, status TEXT);
+CREATE TABLE order_item (id INTEGER PRIMARY KEY, order_id INTEGER, product INTEGER, quantity INTEGER);
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Конкурентная запись в SQLite: воркеры сохраняют сессии и создают заказы, '
+        'читатели параллельно читают заказы. Сравнивает настройки SQLite по умолчанию '
+        '(журнал DELETE, DEFERRED, без повторов) с SQLITE_INIT_COMMAND '
+        '+ BEGIN IMMEDIATE + повтор при блокировке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=200, help='Записей на одного воркера')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"config":<10}{"ops/s":>10}{"p95 ms":>10}{"locked":>10}{"failed":>10}')
+        for title, pragmas, begin, retries in (
+            ('default', '', 'BEGIN', 0),
+            ('tuned', settings.SQLITE_INIT_COMMAND, 'BEGIN IMMEDIATE', 5),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                row = self.run(Path(directory) / 'bench.sqlite3', pragmas, begin, retries, options)
+            self.stdout.write(
+                f'{title:<10}{row["throughput"]:>10.0f}{row["p95"]:>10.1f}'
+                f'{row["locked"]:>10}{row["failed"]:>10}'
+            )
+
+    def connect(self, path, pragmas):
+        # Как у Django по умолчанию: timeout 5 с (в настроенном варианте его задаёт busy_timeout)
+        db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        db.executescript(pragmas)
+        return db
+
+    def run(self, path, pragmas, begin, retries, options):
+        db = self.connect(path, pragmas)
+        db.executescript(SCHEMA)
+        db.close()
+
+        lock = threading.Lock()
+        counters = {'locked': 0, 'failed': 0}
+        timings = []
+        stop = threading.Event()
+
+        def write(db, worker, number):
+            session = f'{worker}-{number % 10}'
+            db.execute(begin)
+            try:
+                db.execute('INSERT OR REPLACE INTO session VALUES (?, ?, ?)', (session, 'x' * 500, time.time()))
+                order = db.execute(
+                    'INSERT INTO orders (session, total, status) VALUES (?, ?, ?)', (session, 100.0, 'pending'),
+                ).lastrowid
+                db.executemany(
+                    'INSERT INTO order_item (order_id, product, quantity) VALUES (?, ?, ?)',
+                    [(order, product, 1) for product in range(3)],
+                )
+                db.execute('COMMIT')
+            except sqlite3.OperationalError:
+                if db.in_transaction:
+                    db.execute('ROLLBACK')
+                raise
+
+        def writer(worker):
+            db = self.connect(path, pragmas)
+            for number in range(options['operations']):
+                started = time.perf_counter()
+                for attempt in range(retries + 1):
+                    try:
+                        write(db, worker, number)
+                        break
+                    except sqlite3.OperationalError as error:
+                        if not any(message in str(error) for message in LOCKED_MESSAGES):
+                            raise
+                        with lock:
+                            counters['locked'] += 1
+                        if attempt == retries:
+                            with lock:
+                                counters['failed'] += 1
+                        else:
+                            time.sleep(0.05 * 2 ** attempt)
+                with lock:
+                    timings.append(time.perf_counter() - started)
+            db.close()
+
+        def reader():
+            db = self.connect(path, pragmas)
+            while not stop.is_set():
+                try:
+                    db.execute('SELECT COUNT(*), SUM(total) FROM orders WHERE status = ?', ('pending',)).fetchone()
+                except sqlite3.OperationalError:
+                    with lock:
+                        counters['locked'] += 1
+            db.close()
+
+        readers = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        writers = [threading.Thread(target=writer, args=(worker,)) for worker in range(options['writers'])]
+        for thread in readers:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        completed = len(timings) - counters['failed']
+        return {
+            'throughput': completed / elapsed,
+            'p95': statistics.quantiles(timings, n=100, method='inclusive')[94] * 1000,
+            **counters,
+        }
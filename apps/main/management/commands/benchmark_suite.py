@@ -0,0 +1,224 @@
+import base64
+import json
+import logging
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from apps.main.benchmark_data import Rollback, seed_catalog, seed_images, seed_orders, seed_users
+from apps.main.models import Category, Product
+from apps.payments.liqpay_utils import LiqPayAPI
+from apps.payments.models import Order
+
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный набор: каталог с разными фильтрами, страница товара, AJAX корзины, '
+        'оформление заказа и callback LiqPay через полный стек middleware. '
+        'Печатает p50/p95/p99 и число запросов к БД, сохраняет результат в JSON '
+        'и сравнивает с предыдущим. Все изменения в БД откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=0,
+                            help='Создать столько синтетических товаров (0 — использовать текущие данные)')
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', default=settings.BASE_DIR / 'benchmarks' / 'results')
+        parser.add_argument('--compare', help='Файл результата для сравнения (по умолчанию — последний)')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Рост p95 больше этой доли считается регрессией')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        baseline = Path(options['compare']) if options['compare'] else self.latest_result(output)
+
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+                if options['products']:
+                    self.seed(options['products'])
+                if not Product.objects.exists():
+                    raise CommandError('Каталог пуст: запустите generate_data или укажите --products')
+                cache.clear()
+                # Строки лога по каждому запросу не смешиваются с таблицей
+                logging.disable(logging.INFO)
+                results = self.run(options['repeat'], options['warmup'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            logging.disable(logging.NOTSET)
+        cache.clear()
+
+        path = self.save(output, results)
+        self.stdout.write(f'Результат: {path}')
+        if baseline and baseline.is_file():
+            self.compare(results, json.loads(baseline.read_text(encoding='utf-8')), options['threshold'])
+
+    def seed(self, products_count):
+        seed_catalog(products_count)
+        products = list(Product.objects.values_list('id', 'name', 'price'))
+        seed_images([pk for pk, name, price in products], 1)
+        seed_orders(products_count // 10, seed_users(100), products)
+
+    def scenarios(self):
+        """(название, функция запроса клиента) — данные для фильтров берутся из базы"""
+        categories = list(Category.objects.values_list('slug', flat=True)[:3])
+        manufacturers = list(
+            Product.objects.values('manufacturer').annotate(total=Count('id'))
+            .order_by('-total').values_list('manufacturer', flat=True)[:2]
+        )
+        caliber = Product.objects.exclude(caliber='').values_list('caliber', flat=True).first()
+        products = list(Product.objects.filter(in_stock=True).order_by('pk').values_list('pk', 'slug')[:50])
+        catalog = reverse('main:catalog')
+
+        filters = {
+            'catalog': {},
+            'catalog ?sort=price': {'sort': 'price'},
+            'catalog ?category': {'category': categories[:1]},
+            'catalog ?category x2 &sort=-price': {'category': categories[:2], 'sort': '-price'},
+            'catalog ?manufacturer x2 &in_stock': {'manufacturer': manufacturers, 'in_stock': 'true'},
+            'catalog ?caliber &price &sort=name': {
+                'caliber': [caliber], 'price_min': '1000', 'price_max': '50000', 'sort': 'name',
+            },
+            'catalog ?status_discount &page=5': {'status_discount': 'true', 'in_stock': 'true', 'page': '5'},
+            'catalog ?search': {'search': 'product 1'},
+        }
+        scenarios = [
+            (title, lambda client, i, params=params: client.get(catalog, params))
+            for title, params in filters.items()
+        ]
+
+        def detail(client, i):
+            return client.get(reverse('main:detail_page', args=[products[i % len(products)][1]]))
+
+        def cart_add(client, i):
+            return client.post(reverse('cart:cart_add', args=[products[i % len(products)][0]]), **AJAX)
+
+        def cart_update(client, i):
+            return client.post(
+                reverse('cart:cart_update', args=[products[0][0]]), {'quantity': i % 5 + 1}, **AJAX
+            )
+
+        def cart_remove(client, i):
+            client.post(reverse('cart:cart_add', args=[products[1][0]]), **AJAX)
+            return client.post(reverse('cart:cart_remove', args=[products[1][0]]), **AJAX)
+
+        def cart_view(client, i):
+            return client.get(reverse('cart:cart_detail'))
+
+        def checkout(client, i):
+            return client.get(reverse('payments:checkout'))
+
+        liqpay = LiqPayAPI()
+
+        def liqpay_callback(client, i):
+            order_id = Order.objects.order_by('-pk').values_list('order_id', flat=True).first()
+            data = base64.b64encode(json.dumps({
+                'order_id': order_id, 'status': 'success', 'payment_id': str(i),
+            }).encode()).decode()
+            return client.post(reverse('payments:liqpay_callback'), {
+                'data': data, 'signature': liqpay._generate_signature(data),
+            })
+
+        # Порядок важен: checkout использует корзину после cart_add, callback — заказ из checkout
+        return scenarios + [
+            ('product_detail', detail),
+            ('cart_add (ajax)', cart_add),
+            ('cart_update (ajax)', cart_update),
+            ('cart_remove (ajax)', cart_remove),
+            ('cart_view', cart_view),
+            ('checkout', checkout),
+            ('liqpay_callback', liqpay_callback),
+        ]
+
+    def run(self, repeat, warmup):
+        client = Client()
+        results = {}
+        self.stdout.write(f'{"scenario":<40}{"queries":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+        for title, request in self.scenarios():
+            timings = []
+            queries = 0
+            for i in range(warmup + repeat):
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = request(client, i)
+                    elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    raise CommandError(f'{title}: ответ {response.status_code}')
+                if i >= warmup:
+                    timings.append(elapsed)
+                    queries = len(context.captured_queries)
+            percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+            results[title] = {
+                'queries': queries,
+                'p50': percentiles[49] * 1000,
+                'p95': percentiles[94] * 1000,
+                'p99': percentiles[98] * 1000,
+                'mean': statistics.fmean(timings) * 1000,
+            }
+            row = results[title]
+            self.stdout.write(
+                f'{title:<40}{queries:>8}{row["p50"]:>9.1f}{row["p95"]:>9.1f}{row["p99"]:>9.1f}'
+            )
+        return results
+
+    def save(self, output, results):
+        output.mkdir(parents=True, exist_ok=True)
+        commit = self.git_commit()
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = output / f'{stamp}-{commit or "nogit"}.json'
+        path.write_text(json.dumps({
+            'commit': commit,
+            'created_at': stamp,
+            'database': connection.vendor,
+            'products': Product.objects.count(),
+            'scenarios': results,
+        }, indent=2, ensure_ascii=False), encoding='utf-8')
+        return path
+
+    def latest_result(self, output):
+        paths = sorted(output.glob('*.json')) if output.is_dir() else []
+        return paths[-1] if paths else None
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, results, baseline, threshold):
+        self.stdout.write(f'\nСравнение с {baseline.get("commit") or "?"} ({baseline["created_at"]}):')
+        regressions = 0
+        for title, row in results.items():
+            before = baseline['scenarios'].get(title)
+            if not before:
+                continue
+            change = (row['p95'] - before['p95']) / before['p95'] if before['p95'] else 0
+            flag = ''
+            if change > threshold or row['queries'] > before['queries']:
+                flag = '  РЕГРЕССИЯ'
+                regressions += 1
+            self.stdout.write(
+                f'{title:<40}p95 {before["p95"]:>8.1f} → {row["p95"]:>8.1f} ({change:+.0%}), '
+                f'запросов {before["queries"]} → {row["queries"]}{flag}'
+            )
+        if regressions:
+            self.stderr.write(f'Регрессий: {regressions}')
@@ -0,0 +1,112 @@
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from apps.main.benchmark_data import catalog_requests
+from apps.main.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность чтения каталога: несколько потоков с тестовыми '
+        'клиентами в течение --duration секунд (каталог с фильтрами, поиск, '
+        'карточка товара). Работает с текущей базой (DATABASE_ENGINE) — для сравнения '
+        'SQLite и PostgreSQL заполните обе через generate_data с одинаковым --seed '
+        'и запустите команду дважды, второй раз с --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=20)
+        parser.add_argument('--warmup', type=float, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=settings.BASE_DIR / 'benchmarks' / 'throughput')
+        parser.add_argument('--compare', help='Результат другого запуска (например, на SQLite)')
+
+    def handle(self, *args, **options):
+        if not Product.objects.exists():
+            raise CommandError('Каталог пуст: запустите generate_data')
+        requests = catalog_requests(random.Random(options['seed']))
+        cache.clear()
+
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                self.load(requests, options['threads'], options['warmup'], options['seed'])
+                timings, errors, elapsed = self.load(
+                    requests, options['threads'], options['duration'], options['seed'],
+                )
+        finally:
+            logging.disable(logging.NOTSET)
+
+        result = {
+            'database': connection.vendor,
+            'threads': options['threads'],
+            'products': Product.objects.count(),
+            'requests': len(timings),
+            'errors': errors,
+            'throughput': len(timings) / elapsed,
+            'p50': statistics.median(timings) * 1000,
+            'p95': statistics.quantiles(timings, n=100, method='inclusive')[94] * 1000,
+        }
+        self.stdout.write(
+            f'{result["database"]}: {result["throughput"]:.1f} запросов/с, '
+            f'p50 {result["p50"]:.1f} мс, p95 {result["p95"]:.1f} мс, ошибок {errors}'
+        )
+
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        path = output / f'{datetime.now():%Y%m%d-%H%M%S-%f}-{connection.vendor}.json'
+        path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+        self.stdout.write(f'Результат: {path}')
+
+        if options['compare']:
+            other = json.loads(Path(options['compare']).read_text(encoding='utf-8'))
+            self.stdout.write(
+                f'{other["database"]}: {other["throughput"]:.1f} запросов/с, p95 {other["p95"]:.1f} мс → '
+                f'{result["database"]}: {result["throughput"] / other["throughput"]:.2f}x'
+            )
+
+    def load(self, requests, threads, duration, seed):
+        timings = []
+        errors = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker(number):
+            client = Client()
+            rng = random.Random(seed + number)
+            local = []
+            failed = 0
+            try:
+                while time.perf_counter() < deadline:
+                    path, params = rng.choice(requests)
+                    started = time.perf_counter()
+                    if client.get(path, params).status_code >= 400:
+                        failed += 1
+                    local.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                timings.extend(local)
+                errors.append(failed)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return timings, sum(errors), time.perf_counter() - started
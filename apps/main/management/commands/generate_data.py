@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.main.benchmark_data import seed_catalog, seed_images, seed_orders, seed_users
+from apps.main.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочного тестирования: '
+        'категории, товары, изображения, покупатели, заказы с позициями. '
+        'Данные сохраняются — запускать только на тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--manufacturers', type=int, default=300)
+        parser.add_argument('--images', type=int, default=2, help='Среднее число доп. изображений на товар')
+        parser.add_argument('--users', type=int, default=2_000)
+        parser.add_argument('--orders', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if Category.objects.filter(slug='bench-category-0').exists():
+            raise CommandError('Синтетические данные уже созданы')
+
+        with transaction.atomic():
+            self.step('Товары', lambda: seed_catalog(
+                options['products'], options['categories'], options['manufacturers'], options['seed'],
+            ))
+            products = list(
+                Product.objects.filter(slug__startswith='bench-product-').values_list('id', 'name', 'price')
+            )
+            self.step('Изображения', lambda: seed_images(
+                [pk for pk, name, price in products], options['images'], options['seed'],
+            ))
+            users = self.step('Покупатели', lambda: seed_users(options['users']))
+            self.step('Заказы', lambda: seed_orders(options['orders'], users, products, seed=options['seed']))
+
+    def step(self, title, action):
+        started = time.perf_counter()
+        result = action()
+        self.stdout.write(f'{title}: {time.perf_counter() - started:.1f} с')
+        return result
@@ -0,0 +1,93 @@
+import gzip
+import logging
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from BulavaArms.compression import compress
+from BulavaArms.storage import MINIFIERS
+from apps.main.benchmark_data import Rollback
+from apps.main.models import Product
+
+
+STATIC_ASSET = re.compile(r'(?:href|src)="' + re.escape(settings.STATIC_URL) + r'([^"]+\.(?:css|js))"')
+
+
+class Command(BaseCommand):
+    help = (
+        'Вес HTML по страницам после выноса CSS/JS шаблонов в статические бандлы: '
+        'HTML сейчас, сколько байт раньше было встроено в каждый ответ (исходники '
+        'бандлов страницы) и сколько бандлы стоят один раз — минифицированные и '
+        'сжатые gzip/brotli. При повторных просмотрах браузер берёт их из кэша. '
+        'Изменения в БД (заказ на странице оформления) откатываются.'
+    )
+
+    def handle(self, *args, **options):
+        product = Product.objects.order_by('-created_at').only('slug').first()
+        if product is None:
+            raise CommandError('Каталог пуст: запустите generate_data')
+        pages = [
+            ('Главная', reverse('main:main_page')),
+            ('Каталог', reverse('main:catalog')),
+            ('Товар', reverse('main:detail_page', args=[product.slug])),
+            ('Корзина', reverse('cart:cart_detail')),
+            ('Оформление', reverse('payments:checkout')),
+            ('Вход', reverse('users:login')),
+        ]
+
+        rows = []
+        logging.disable(logging.INFO)
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+                client = Client()
+                client.post(reverse('cart:cart_add', args=[product.pk]))
+                for label, url in pages:
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f'{url}: {response.status_code}')
+                    rows.append((label, response.content, self.assets(response.content.decode())))
+                raise Rollback
+        except Rollback:
+            pass
+
+        header = ('Страница', 'HTML', 'было', 'gzip', 'было gzip', 'экономия', 'бандлы min', 'gzip', 'br')
+        self.stdout.write(f'{header[0]:<12}' + ''.join(f'{column:>11}' for column in header[1:]))
+        for label, html, assets in rows:
+            inline = b''.join(source for source, _ in assets)
+            minified = b''.join(content for _, content in assets)
+            # «Было» — HTML вместе со встроенными стилями и скриптами
+            before = len(html) + len(inline)
+            html_gzip = len(gzip.compress(html))
+            before_gzip = len(gzip.compress(html + inline))
+            bundles = compress(minified)
+            values = [
+                len(html), before, html_gzip, before_gzip, before_gzip - html_gzip, len(minified),
+                len(bundles['.gz']), len(bundles['.br']) if '.br' in bundles else '-',
+            ]
+            self.stdout.write(f'{label:<12}' + ''.join(f'{value:>11}' for value in values))
+        self.stdout.write(
+            '\nБайты. «экономия» — на каждый ответ со сжатием; бандлы браузер '
+            'загружает один раз (Cache-Control: immutable, deploy/nginx.conf).'
+        )
+
+    def assets(self, html):
+        """[(исходник, минифицированный)] для CSS/JS проекта, подключённых на странице"""
+        originals = {hashed: name for name, hashed in getattr(staticfiles_storage, 'hashed_files', {}).items()}
+        result = []
+        for name in STATIC_ASSET.findall(html):
+            path = finders.find(originals.get(name, name))
+            if path is None:
+                continue
+            with open(path, 'rb') as source:
+                content = source.read()
+            minify = MINIFIERS[os.path.splitext(name)[1]]
+            result.append((content, minify(content.decode()).encode()))
+        return result
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from BulavaArms.routers import replica_alias
+
+
+class Command(BaseCommand):
+    help = (
+        'Скопировать основную базу SQLite в реплику для чтения каталога '
+        '(онлайн-копия через backup API, работа сайта не останавливается). '
+        'PostgreSQL-реплика обновляется штатной репликацией и команды не требует.'
+    )
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            raise CommandError('Реплика не настроена: задайте REPLICA_DATABASE')
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[alias]
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite' or connections[alias].vendor != 'sqlite':
+            raise CommandError('sync_replica копирует только SQLite')
+
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(f'Реплика {replica["NAME"]} обновлена из {primary["NAME"]}')
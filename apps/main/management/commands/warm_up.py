@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.main.warmup import WARMUP_PRODUCTS, warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогреть кэш каталога после деплоя: шаблоны, списки категорий, '
+        'производителей и калибров, фасеты каталога без фильтров, индексы поиска '
+        'и первые страницы товаров (кэш товаров и карточек). С общим кэшем '
+        '(CACHE_BACKEND) прогретые данные получат все воркеры; кэш в памяти '
+        'процесса прогревают хуки gunicorn (deploy/hooks.py).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=WARMUP_PRODUCTS, help='Сколько товаров прогреть')
+
+    def handle(self, *args, **options):
+        timings = warm_up(options['products'])
+        for name, ms in timings.items():
+            self.stdout.write(f'{name:<10}{ms:>9.1f} мс')
+        self.stdout.write(f'{"всего":<10}{sum(timings.values()):>9.1f} мс')
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+# Только для PostgreSQL; на SQLite миграция ничего не делает.
+# icontains в PostgreSQL — UPPER(поле::text) LIKE UPPER(...), поэтому
+# триграммные GIN-индексы построены по тому же выражению.
+POSTGRES_INDEXES = [
+    ('main_product_name_trgm',
+     'ON main_product USING gin (UPPER(name::text) gin_trgm_ops)'),
+    ('main_product_descr_trgm',
+     'ON main_product USING gin (UPPER(description::text) gin_trgm_ops)'),
+    ('main_product_manuf_trgm',
+     'ON main_product USING gin (UPPER(manufacturer::text) gin_trgm_ops)'),
+    # Частичные: каталог «в наличии» по новизне и товары со скидкой по цене
+    ('main_product_in_stock_new',
+     'ON main_product (created_at DESC) WHERE in_stock'),
+    ('main_product_discount_price',
+     'ON main_product (price) WHERE status_discount'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, definition in POSTGRES_INDEXES:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY не работает внутри транзакции, зато не блокирует запись в таблицу
+    atomic = False
+
+    dependencies = [
+        ('main', '0002_product_main_product_name_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Частичные индексы из 0003 (только PostgreSQL) заменены общими индексами ниже
+SUPERSEDED = {
+    'main_product_in_stock_new': 'ON main_product (created_at DESC) WHERE in_stock',
+    'main_product_discount_price': 'ON main_product (price) WHERE status_discount',
+}
+
+
+def drop_superseded(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in SUPERSEDED:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def restore_superseded(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, definition in SUPERSEDED.items():
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_postgres_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_superseded, restore_superseded),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='products', to='main.category', verbose_name='Категория'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at'], name='main_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='main_product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['discount_price'], name='main_product_disc_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-created_at'], name='main_product_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price'], name='main_product_cat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['in_stock', 'category'], name='main_product_stock_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status_discount', True)), fields=['-created_at'], name='main_product_sale_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status_discount', True)), fields=['discount_price'], name='main_product_sale_price_idx'),
+        ),
+    ]
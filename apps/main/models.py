@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.utils.text import slugify
 
 
@@ -37,7 +38,10 @@ class Product(models.Model):
     description = models.TextField(blank=True, verbose_name='Описание')
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена')
     product_type = models.CharField(max_length=50, choices=PRODUCT_TYPES, verbose_name='Тип товара')
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', verbose_name='Категория')
+    # Отдельный индекс не нужен: category_id — первый столбец составных индексов
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='products', verbose_name='Категория', db_index=False,
+    )
     
     # Общие характеристики
     manufacturer = models.CharField(max_length=100, blank=True, verbose_name='Производитель')
@@ -64,6 +68,26 @@ class Product(models.Model):
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['name'], name='main_product_name_idx'),
+            models.Index(fields=['manufacturer'], name='main_product_manuf_idx'),
+            models.Index(fields=['caliber'], name='main_product_caliber_idx'),
+            # Сортировки каталога без фильтров и диапазон цен
+            models.Index(fields=['-created_at'], name='main_product_created_idx'),
+            models.Index(fields=['price'], name='main_product_price_idx'),
+            models.Index(fields=['discount_price'], name='main_product_disc_price_idx'),
+            # Категория + основные сортировки
+            models.Index(fields=['category', '-created_at'], name='main_product_cat_created_idx'),
+            models.Index(fields=['category', 'price'], name='main_product_cat_price_idx'),
+            # В наличии почти все товары: частичный индекс по in_stock медленнее полного
+            # прохода для фасетов, а покрывающий обслуживает и счётчик, и фасет категорий
+            models.Index(fields=['in_stock', 'category'], name='main_product_stock_cat_idx'),
+            # Товаров со скидкой мало — частичные индексы только по ним
+            models.Index(fields=['-created_at'], condition=Q(status_discount=True), name='main_product_sale_new_idx'),
+            models.Index(
+                fields=['discount_price'], condition=Q(status_discount=True), name='main_product_sale_price_idx',
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -0,0 +1,99 @@
+"""
+Кэш целых страниц для анонимных посетителей (FULL_PAGE_CACHE=1).
+
+Страница из кэша одна на всех: ключ — версия каталога, схема, хост и
+полный путь с параметрами, но не cookie. Поэтому в кэшируемую отрисовку не
+попадает ничего личного:
+- счётчик корзины и сообщения шапка загружает после загрузки страницы
+  (cart:cart_state), см. context_processors в apps/cart;
+- CSRF-токены в сохранённом HTML заменены заглушкой, при выдаче из кэша
+  подставляется токен текущего запроса.
+Сохраняемая страница отрисовывается по основной базе (primary_reads): ключ
+содержит её версию каталога, а реплика может отставать.
+"""
+import functools
+import hashlib
+import re
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from BulavaArms.routers import primary_reads
+from .cache import get_catalog_version
+
+
+CSRF_INPUT = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = 'page-cache-csrf-token'
+
+
+def _cacheable(request):
+    return getattr(settings, 'FULL_PAGE_CACHE', False) and request.method in ('GET', 'HEAD')
+
+
+def page_cache_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{get_catalog_version()}:{request.scheme}:{request.get_host()}:{path}'
+
+
+def _cached_response(request, entry):
+    content = entry['content']
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response.headers['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _entry(response):
+    if response.status_code != 200 or response.streaming:
+        return None
+    content = response.content.decode(response.charset)
+    return {
+        'content': CSRF_INPUT.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', content),
+        'content_type': response.headers['Content-Type'],
+    }
+
+
+def anonymous_page_cache(view):
+    """Отдавать страницу анонимным посетителям из кэша (обычная или async view)"""
+    timeout = getattr(settings, 'FULL_PAGE_CACHE_TIMEOUT', 300)
+
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not _cacheable(request) or (await request.auser()).is_authenticated:
+                return await view(request, *args, **kwargs)
+            key = await sync_to_async(page_cache_key)(request)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return _cached_response(request, entry)
+            request.full_page_cache = True
+            with primary_reads():
+                response = await view(request, *args, **kwargs)
+            entry = _entry(response)
+            if entry is not None and request.method == 'GET':
+                await cache.aset(key, entry, timeout)
+            response.headers['X-Page-Cache'] = 'miss'
+            return response
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable(request) or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        key = page_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            return _cached_response(request, entry)
+        request.full_page_cache = True
+        with primary_reads():
+            response = view(request, *args, **kwargs)
+        entry = _entry(response)
+        if entry is not None and request.method == 'GET':
+            cache.set(key, entry, timeout)
+        response.headers['X-Page-Cache'] = 'miss'
+        return response
+    return wrapper
@@ -0,0 +1,151 @@
+"""
+Двухуровневый кэш товаров по id и slug.
+
+Первый уровень — LRU в памяти процесса (PRODUCT_CACHE_SIZE товаров), второй —
+общий кэш (CACHES['default']). У каждого товара своя метка версии в общем
+кэше; сохранение или удаление товара меняет её (signals.py), и все воркеры
+при следующем обращении видят, что их копия устарела. Метки всех
+запрошенных товаров читаются одним get_many, так что корзина из N товаров —
+один поход в общий кэш, если товары не менялись.
+
+Промахи читаются из основной базы: копия с отстающей реплики не должна
+попасть в кэш под новой меткой.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import CATALOG_CACHE_TIMEOUT
+
+
+def _version_key(product_id):
+    return f'product:version:{product_id}'
+
+
+def _product_key(product_id, version):
+    return f'product:{product_id}:{version}'
+
+
+def _slug_key(slug):
+    return f'product:slug:{slug}'
+
+
+class ProductCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+
+    def _max_size(self):
+        return getattr(settings, 'PRODUCT_CACHE_SIZE', 1000)
+
+    def _versions(self, ids):
+        keys = {product_id: _version_key(product_id) for product_id in ids}
+        found = cache.get_many(keys.values())
+        versions, missing = {}, {}
+        for product_id, key in keys.items():
+            if key in found:
+                versions[product_id] = found[key]
+            else:
+                versions[product_id] = missing[key] = time.time_ns()
+        # Метки без срока: после вытеснения или очистки кэша — новая метка. Только add:
+        # invalidate() из другого процесса за это время не должна потеряться
+        for product_id, key in keys.items():
+            if key in missing and not cache.add(key, missing[key], None):
+                versions[product_id] = cache.get(key, missing[key])
+        return versions
+
+    def _remember(self, product, version):
+        with self._lock:
+            self._local[product.pk] = (version, product)
+            self._local.move_to_end(product.pk)
+            while len(self._local) > self._max_size():
+                self._local.popitem(last=False)
+
+    def get_many(self, ids):
+        """Словарь {id: товар} в порядке ids; несуществующих товаров в нём нет"""
+        from .models import Product
+
+        ids = list(dict.fromkeys(int(product_id) for product_id in ids))
+        if not ids:
+            return {}
+        versions = self._versions(ids)
+
+        products = {}
+        with self._lock:
+            for product_id in ids:
+                entry = self._local.get(product_id)
+                if entry is not None and entry[0] == versions[product_id]:
+                    self._local.move_to_end(product_id)
+                    products[product_id] = entry[1]
+
+        missing = [product_id for product_id in ids if product_id not in products]
+        if missing:
+            shared = cache.get_many([_product_key(product_id, versions[product_id]) for product_id in missing])
+            for product_id in missing:
+                product = shared.get(_product_key(product_id, versions[product_id]))
+                if product is not None:
+                    products[product_id] = product
+                    self._remember(product, versions[product_id])
+
+        missing = [product_id for product_id in ids if product_id not in products]
+        if missing:
+            loaded = Product.objects.using(DEFAULT_DB_ALIAS).select_related('category').in_bulk(missing)
+            cache.set_many(
+                {_product_key(product.pk, versions[product.pk]): product for product in loaded.values()},
+                CATALOG_CACHE_TIMEOUT,
+            )
+            for product_id in missing:
+                if product_id in loaded:
+                    products[product_id] = loaded[product_id]
+                    self._remember(loaded[product_id], versions[product_id])
+
+        # Копии: вызывающий код может менять объекты, кэш — нет
+        return {product_id: copy.copy(products[product_id]) for product_id in ids if product_id in products}
+
+    def get(self, product_id):
+        """Товар по id или None"""
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return None
+        return self.get_many([product_id]).get(product_id)
+
+    def get_by_slug(self, slug):
+        """Товар по slug или None"""
+        from .models import Product
+
+        product_id = cache.get(_slug_key(slug))
+        if product_id is not None:
+            product = self.get(product_id)
+            # slug мог смениться — тогда ключ устарел
+            if product is not None and product.slug == slug:
+                return product
+
+        product_id = (
+            Product.objects.using(DEFAULT_DB_ALIAS).filter(slug=slug).values_list('pk', flat=True).first()
+        )
+        if product_id is None:
+            return None
+        cache.set(_slug_key(slug), product_id, CATALOG_CACHE_TIMEOUT)
+        return self.get(product_id)
+
+    def invalidate(self, *ids):
+        """Новые метки версий: устаревшие копии не видны ни одному воркеру"""
+        if not ids:
+            return
+        cache.set_many({_version_key(product_id): time.time_ns() for product_id in ids}, None)
+        with self._lock:
+            for product_id in ids:
+                self._local.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+product_cache = ProductCache()
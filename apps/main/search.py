@@ -0,0 +1,91 @@
+"""
+Нечёткий поиск товаров по триграммам.
+
+Используется как запасной вариант, когда обычный поиск (icontains)
+находит слишком мало товаров: «Glok» находит «Glock», «7,62х39» с
+кириллической «х» — «7.62x39». Инвертированный индекс триграмм по
+названию, производителю и калибру хранится в памяти процесса и
+пересобирается при смене версии каталога.
+"""
+import re
+from collections import Counter
+
+from .cache import ProcessLocalIndex
+from .models import Product
+
+
+# Минимальная доля триграмм запроса, найденных у товара
+SIMILARITY_THRESHOLD = 0.5
+# Сколько товаров-кандидатов оценивается на один запрос
+MAX_CANDIDATES = 2000
+# Триграммы, которые есть у большего числа товаров, пропускаются как стоп-слова
+MAX_POSTING = 10_000
+# Сколько товаров возвращает нечёткий поиск
+MAX_RESULTS = 50
+# Длина запроса, дальше которой триграммы не строятся
+MAX_QUERY_LENGTH = 64
+
+# Кириллические буквы, похожие на латинские, и разделители
+LOOKALIKES = str.maketrans({
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'і': 'i', 'ї': 'i', 'к': 'k', 'м': 'm',
+    'н': 'h', 'о': 'o', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', '×': 'x',
+    ',': '.',
+})
+SEPARATORS = re.compile(r'[^\w.]+')
+
+
+def normalize(text):
+    """Нижний регистр, латиница вместо похожей кириллицы, «,» → «.»"""
+    text = text.casefold().translate(LOOKALIKES)
+    return ' '.join(word.strip('.') for word in SEPARATORS.sub(' ', text).split())
+
+
+def trigrams(text):
+    """Триграммы слов с отступами по краям, как в pg_trgm"""
+    result = set()
+    for word in normalize(text).split():
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class TrigramIndex:
+    """Инвертированный индекс: триграмма → id товаров"""
+
+    def __init__(self, products):
+        postings = {}
+        for pk, *fields in products:
+            for trigram in trigrams(' '.join(field for field in fields if field)):
+                postings.setdefault(trigram, []).append(pk)
+        self.postings = {trigram: tuple(ids) for trigram, ids in postings.items()}
+
+    @classmethod
+    def build(cls):
+        return cls(Product.objects.order_by().values_list('id', 'name', 'manufacturer', 'caliber').iterator())
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Id товаров по убыванию сходства с запросом"""
+        query_trigrams = trigrams(query[:MAX_QUERY_LENGTH])
+        if not query_trigrams:
+            return []
+
+        # Сначала редкие триграммы: они отбирают кандидатов точнее. Слишком частые
+        # ничего не отбирают и не учитываются; кандидатов не больше MAX_CANDIDATES,
+        # счёт уже отобранных продолжается.
+        postings = sorted((self.postings.get(trigram, ()) for trigram in query_trigrams), key=len)
+        postings = [ids for ids in postings if len(ids) <= MAX_POSTING]
+        matches = Counter()
+        for ids in postings:
+            room = MAX_CANDIDATES - len(matches)
+            for pk in ids:
+                if pk in matches:
+                    matches[pk] += 1
+                elif room > 0:
+                    matches[pk] = 1
+                    room -= 1
+
+        required = SIMILARITY_THRESHOLD * len(postings)
+        return [pk for pk, shared in matches.most_common() if shared >= required][:limit]
+
+
+search_index = ProcessLocalIndex(TrigramIndex.build)
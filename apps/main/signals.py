@@ -0,0 +1,36 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import Category, Product, ProductImage
+from .product_cache import product_cache
+
+
+# Кэш меняется после фиксации транзакции: до неё другие процессы ещё читают старые
+# данные и под новой версией закэшировали бы их снова
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=ProductImage)
+def catalog_changed(sender, using, **kwargs):
+    """Любое изменение каталога меняет его версию"""
+    transaction.on_commit(bump_catalog_version, using=using)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, using, **kwargs):
+    """Новая метка версии товара для кэша товаров"""
+    # pk — сейчас: после удаления Django обнуляет его у объекта
+    transaction.on_commit(partial(product_cache.invalidate, instance.pk), using=using)
+
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, created, using, **kwargs):
+    """Товары в кэше хранятся вместе с категорией"""
+    if not created:
+        ids = list(instance.products.values_list('pk', flat=True))
+        transaction.on_commit(partial(product_cache.invalidate, *ids), using=using)
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.contrib.sitemaps import Sitemap
+from django.db.models import Count, Max, Min
+from django.urls import reverse
+
+from .models import Category, Product
+
+
+class CatalogSitemap(Sitemap):
+    """Базовая карта сайта, разбитая на страницы по `limit` записей"""
+    limit = 5000
+    # Поле, по которому считается lastmod и отпечаток страницы
+    lastmod_field = None
+    # Поля из URL, изменение которых не меняет lastmod (входят в отпечаток как хэш)
+    location_fields = ()
+
+    def lastmod(self, obj):
+        return getattr(obj, self.lastmod_field)
+
+    def get_latest_lastmod(self):
+        # Агрегат вместо перебора всех объектов в Sitemap.get_latest_lastmod
+        return self.items().aggregate(latest=Max(self.lastmod_field))['latest']
+
+    def chunk_fingerprint(self, page):
+        """
+        Отпечаток страницы карты сайта.
+
+        Меняется только если изменился, добавился или удалился объект
+        внутри среза этой страницы (или срез сместился), а также при
+        изменении полей location_fields.
+        """
+        start = (page - 1) * self.limit
+        chunk = self.items()[start:start + self.limit]
+        result = chunk.aggregate(
+            count=Count('pk'),
+            first=Min('pk'),
+            last=Max('pk'),
+            lastmod=Max(self.lastmod_field),
+        )
+        fingerprint = (
+            result['count'],
+            result['first'],
+            result['last'],
+            result['lastmod'].isoformat() if result['lastmod'] else None,
+        )
+        if self.location_fields:
+            rows = chunk.values_list('pk', *self.location_fields)
+            fingerprint += (hashlib.md5(repr(list(rows)).encode()).hexdigest(),)
+        return fingerprint
+
+
+class ProductSitemap(CatalogSitemap):
+    changefreq = 'daily'
+    priority = 0.8
+    lastmod_field = 'updated_at'
+
+    def items(self):
+        return Product.objects.only('pk', 'slug', 'updated_at').order_by('pk')
+
+    def location(self, obj):
+        return reverse('main:detail_page', args=[obj.slug])
+
+
+class CategorySitemap(CatalogSitemap):
+    changefreq = 'daily'
+    priority = 0.6
+    lastmod_field = 'last_update'
+    # Переименование категории не трогает updated_at её товаров
+    location_fields = ('slug',)
+
+    def items(self):
+        return Category.objects.annotate(
+            last_update=Max('products__updated_at')
+        ).filter(last_update__isnull=False).order_by('pk')
+
+    def location(self, obj):
+        return f"{reverse('main:catalog')}?category={obj.slug}"
+
+
+sitemaps = {
+    'products': ProductSitemap,
+    'categories': CategorySitemap,
+}
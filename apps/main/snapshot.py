@@ -0,0 +1,180 @@
+"""
+Колоночный снимок каталога в памяти процесса (NumPy).
+
+Необязательный движок каталога: фильтрация, сортировка, счётчики фасетов
+и пагинация выполняются векторными операциями над массивами, а из БД
+загружаются только товары видимой страницы. Снимок пересобирается при
+смене версии каталога. Включается настройкой CATALOG_ENGINE = 'snapshot'
+и требует установленного numpy.
+"""
+from django.conf import settings
+
+from BulavaArms.lazy import lazy_import
+from .cache import ProcessLocalIndex
+from .models import Product
+
+# numpy необязателен и импортируется только при первой сборке снимка
+np = lazy_import('numpy')
+
+
+# Фильтры ProductFilter, которые снимок умеет выполнять сам
+SUPPORTED_FILTERS = {
+    'category', 'manufacturer', 'caliber', 'product_type',
+    'price_min', 'price_max', 'in_stock', 'status_discount', 'sort',
+}
+
+
+def _codes(values):
+    """Отсортированный словарь значений, их коды и массив кодов по товарам"""
+    labels = sorted(set(values))
+    index = {label: code for code, label in enumerate(labels)}
+    column = np.fromiter((index[value] for value in values), dtype=np.int32, count=len(values))
+    return labels, index, column
+
+
+class CatalogSnapshot:
+    """Колонки всех товаров каталога"""
+
+    def __init__(self, rows):
+        (ids, category_ids, manufacturers, calibers, product_types, prices,
+         discount_prices, in_stock, status_discount, created_at, names) = (
+            list(zip(*rows)) or [()] * 11
+        )
+
+        self.size = len(ids)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.category_id = np.array(category_ids, dtype=np.int64)
+        self.manufacturers, self.manufacturer_codes, self.manufacturer = _codes(manufacturers)
+        self.calibers, self.caliber_codes, self.caliber = _codes(calibers)
+        self.product_types, self.product_type_codes, self.product_type = _codes(product_types)
+        self.price = np.array([float(price) for price in prices], dtype=np.float64)
+        self.discount_price = np.array(
+            [float(price) if price is not None else np.nan for price in discount_prices],
+            dtype=np.float64,
+        )
+        self.in_stock = np.array(in_stock, dtype=bool)
+        self.status_discount = np.array(status_discount, dtype=bool)
+        self.effective_price = np.where(
+            self.status_discount & ~np.isnan(self.discount_price), self.discount_price, self.price
+        )
+        self.created_at = np.array([value.timestamp() for value in created_at], dtype=np.float64)
+        # Ранг названия вместо строк для сортировки по имени
+        order = sorted(range(self.size), key=lambda position: names[position])
+        self.name_rank = np.empty(self.size, dtype=np.int64)
+        self.name_rank[order] = np.arange(self.size)
+
+    @classmethod
+    def build(cls):
+        rows = list(Product.objects.order_by().values_list(
+            'id', 'category_id', 'manufacturer', 'caliber', 'product_type', 'price',
+            'discount_price', 'in_stock', 'status_discount', 'created_at', 'name',
+        ))
+        return cls(rows)
+
+    def _in(self, field, values):
+        codes = getattr(self, f'{field}_codes')
+        return np.isin(getattr(self, field), [codes[value] for value in values if value in codes])
+
+    def masks(self, product_filter):
+        """Маски фасетных групп и маска остальных фильтров"""
+        data = product_filter.form.cleaned_data
+        facet_masks = {}
+        if data.get('category'):
+            ids = product_filter.category_pks(data['category'])
+            facet_masks['category'] = np.isin(self.category_id, ids)
+        if data.get('manufacturer'):
+            facet_masks['manufacturer'] = self._in('manufacturer', data['manufacturer'])
+        if data.get('caliber'):
+            facet_masks['caliber'] = self._in('caliber', data['caliber'])
+        for field in ('in_stock', 'status_discount'):
+            if data.get(field) is not None:
+                column = getattr(self, field)
+                facet_masks[field] = column if data[field] else ~column
+
+        base = np.ones(self.size, dtype=bool)
+        if data.get('product_type'):
+            base &= self._in('product_type', data['product_type'])
+        if data.get('price_min') is not None:
+            base &= self.price >= float(data['price_min'])
+        if data.get('price_max') is not None:
+            base &= self.price <= float(data['price_max'])
+        return base, facet_masks
+
+    def sort_keys(self, sort_by):
+        field = sort_by.lstrip('-')
+        if field == 'name':
+            key = self.name_rank
+        elif field == 'discount_price':
+            # NULL идут первыми по возрастанию, как в SQLite
+            key = np.nan_to_num(self.discount_price, nan=-np.inf)
+        else:
+            key = getattr(self, field)
+        return -key if sort_by.startswith('-') else key
+
+    def query(self, product_filter, sort_by):
+        """Отсортированные id подходящих товаров и дизъюнктивные счётчики фасетов"""
+        base, facet_masks = self.masks(product_filter)
+        selected = base.copy()
+        for mask in facet_masks.values():
+            selected &= mask
+
+        keys = self.sort_keys(sort_by)
+        positions = np.flatnonzero(selected)
+        # Вторичный ключ — id по убыванию, для стабильного порядка страниц
+        order = np.lexsort((-self.ids[positions], keys[positions]))
+        ids = self.ids[positions[order]]
+
+        counts = {}
+        for group in product_filter.facet_fields:
+            others = base.copy()
+            for name, mask in facet_masks.items():
+                if name != group:
+                    others &= mask
+            counts[group] = self.facet(group, others)
+        return ids, counts
+
+    def facet(self, group, mask):
+        if group in ('in_stock', 'status_discount'):
+            count = int(np.count_nonzero(getattr(self, group) & mask))
+            return {'1': count} if count else {}
+        if group == 'category':
+            values, counts = np.unique(self.category_id[mask], return_counts=True)
+            return {str(value): int(count) for value, count in zip(values, counts)}
+        labels = getattr(self, f'{group}s')
+        counts = np.bincount(getattr(self, group)[mask], minlength=len(labels))
+        return {labels[code]: int(count) for code, count in enumerate(counts) if count}
+
+
+class SnapshotPage:
+    """
+    Последовательность товаров по готовому списку id для Paginator.
+
+    Из БД загружаются только товары запрошенного среза.
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = [int(pk) for pk in self.ids[index]]
+        products = self.queryset.in_bulk(ids)
+        return [products[pk] for pk in ids if pk in products]
+
+
+snapshot_index = ProcessLocalIndex(CatalogSnapshot.build)
+
+
+def snapshot_enabled():
+    return np is not None and getattr(settings, 'CATALOG_ENGINE', 'orm') == 'snapshot'
+
+
+def can_use_snapshot(product_filter):
+    """Снимок обслуживает запрос, если все активные фильтры ему известны"""
+    data = product_filter.form.cleaned_data
+    return all(name in SUPPORTED_FILTERS for name, value in data.items() if value not in (None, '', []))
@@ -0,0 +1,38 @@
+// Mobile menu functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const burgerBtn = document.getElementById('burgerBtn');
+    const mobileMenu = document.getElementById('mobileMenu');
+    const closeMobileMenu = document.getElementById('closeMobileMenu');
+    const mobileMenuOverlay = document.getElementById('mobileMenuOverlay');
+
+    // Open mobile menu
+    burgerBtn.addEventListener('click', function() {
+        mobileMenu.classList.add('active');
+        mobileMenuOverlay.classList.add('active');
+        burgerBtn.classList.add('active');
+        document.body.style.overflow = 'hidden';
+    });
+
+    // Close mobile menu function
+    function closeMenu() {
+        mobileMenu.classList.remove('active');
+        mobileMenuOverlay.classList.remove('active');
+        burgerBtn.classList.remove('active');
+        document.body.style.overflow = '';
+    }
+
+    // Close on close button click
+    closeMobileMenu.addEventListener('click', closeMenu);
+
+    // Close on overlay click
+    mobileMenuOverlay.addEventListener('click', closeMenu);
+
+    // Language switcher
+    const langButtons = document.querySelectorAll('.mobile-menu__lang-btn');
+    langButtons.forEach(btn => {
+        btn.addEventListener('click', function() {
+            langButtons.forEach(b => b.classList.remove('active'));
+            this.classList.add('active');
+        });
+    });
+});
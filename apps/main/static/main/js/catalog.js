@@ -0,0 +1,74 @@
+// Пошук бренду
+document.getElementById('brandSearch')?.addEventListener('keyup', function(e) {
+    let term = e.target.value.toLowerCase();
+    let items = document.querySelectorAll('.brand-item');
+    items.forEach(item => {
+        let text = item.innerText.toLowerCase();
+        item.style.display = text.includes(term) ? 'flex' : 'none';
+    });
+});
+
+// Підказки пошуку
+(function() {
+    const input = document.getElementById('catalogSearch');
+    const list = document.getElementById('searchSuggest');
+    if (!input || !list) return;
+    const groups = [
+        ['categories', 'Категорії'], ['manufacturers', 'Виробники'],
+        ['calibers', 'Калібри'], ['products', 'Товари'],
+    ];
+    let timer = null;
+    let controller = null;
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(function() {
+            const query = input.value.trim();
+            if (!query) { list.hidden = true; return; }
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch(input.dataset.suggestUrl + '?q=' + encodeURIComponent(query), {signal: controller.signal})
+                .then(response => response.json())
+                .then(data => {
+                    list.innerHTML = '';
+                    groups.forEach(([key, title]) => {
+                        if (!data[key] || !data[key].length) return;
+                        const header = document.createElement('li');
+                        header.className = 'search-suggest__group';
+                        header.textContent = title;
+                        list.appendChild(header);
+                        data[key].forEach(item => {
+                            const li = document.createElement('li');
+                            const link = document.createElement('a');
+                            link.href = item.url;
+                            link.textContent = item.count ? item.name + ' (' + item.count + ')' : item.name;
+                            li.appendChild(link);
+                            list.appendChild(li);
+                        });
+                    });
+                    list.hidden = !list.children.length;
+                })
+                .catch(() => {});
+        }, 120);
+    });
+
+    document.addEventListener('click', function(e) {
+        if (!list.contains(e.target) && e.target !== input) list.hidden = true;
+    });
+})();
+
+// Мобільне меню
+const mobileBtn = document.getElementById('mobileFilterBtn');
+const sidebar = document.getElementById('sidebar');
+const closeBtn = document.getElementById('sidebarClose');
+const overlay = document.getElementById('overlay');
+
+function toggleMenu() {
+    sidebar.classList.toggle('active');
+    overlay.classList.toggle('active');
+    document.body.style.overflow = sidebar.classList.contains('active') ? 'hidden' : '';
+}
+
+if(mobileBtn) mobileBtn.addEventListener('click', toggleMenu);
+if(closeBtn) closeBtn.addEventListener('click', toggleMenu);
+if(overlay) overlay.addEventListener('click', toggleMenu);
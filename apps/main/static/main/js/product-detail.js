@@ -0,0 +1,29 @@
+function changeImage(src, btn) {
+    const mainImage = document.getElementById('mainImage');
+    // Simple fade
+    mainImage.style.opacity = '0.7';
+
+    setTimeout(() => {
+        mainImage.src = src;
+        mainImage.style.opacity = '1';
+    }, 150);
+
+    document.querySelectorAll('.thumbnail-btn').forEach(el => {
+        el.classList.remove('active', 'border-primary-900', 'border-gray-900');
+        el.classList.add('border-gray-200');
+    });
+    btn.classList.remove('border-gray-200');
+    btn.classList.add('active');
+}
+
+function incrementQty() {
+    const input = document.getElementById('quantity');
+    const current = parseInt(input.value);
+    if (current < 10) input.value = current + 1;
+}
+
+function decrementQty() {
+    const input = document.getElementById('quantity');
+    const current = parseInt(input.value);
+    if (current > 1) input.value = current - 1;
+}
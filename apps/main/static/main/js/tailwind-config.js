@@ -0,0 +1,25 @@
+tailwind.config = {
+    theme: {
+        extend: {
+            colors: {
+                primary: {
+                    50: '#f8f9fa',
+                    100: '#e9ecef',
+                    500: '#495057',
+                    600: '#343a40',
+                    700: '#212529',
+                    800: '#1a1d20',
+                    900: '#0c0d0e'
+                },
+                accent: {
+                    400: '#6c757d',
+                    500: '#495057',
+                    600: '#343a40'
+                }
+            },
+            fontFamily: {
+                'montserrat': ['Montserrat', 'sans-serif']
+            }
+        }
+    }
+}
@@ -0,0 +1,13 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..cards import render_product_cards
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def product_cards(context, products):
+    """Сетка карточек товаров из кэша фрагментов: {% product_cards products %}"""
+    return mark_safe(render_product_cards(products, context.get('csrf_token')))
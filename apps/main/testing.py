@@ -0,0 +1,9 @@
+from .models import Product
+
+
+def create_product(category, name, **kwargs):
+    """Товар для тестов: обязательные поля по умолчанию, slug — из названия"""
+    kwargs.setdefault('price', 100)
+    kwargs.setdefault('product_type', 'weapon')
+    kwargs.setdefault('main_image', 'products/test.jpg')
+    return Product.objects.create(category=category, name=name, **kwargs)
@@ -1,3 +1,1090 @@
-from django.test import TestCase
+import gzip
+import json
+import math
+import re
+import tempfile
+import time
+import zlib
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.test import AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from BulavaArms.compression import CompressionMiddleware, accepted_encoding, brotli
+from BulavaArms.routers import ReplicaRouter, STICKY_COOKIE, StickyPrimaryMiddleware, primary_reads, read_replica
+from BulavaArms.storage import BundleStaticFilesStorage, minify_css, minify_js
+from deploy.hooks import when_ready
+from apps.monitoring.slow_queries import explain
+from . import autocomplete, search, snapshot
+from .admin_mixins import EstimatedCountPaginator
+from .autocomplete import AutocompleteIndex, autocomplete_index
+from .cache import ProcessLocalIndex, get_catalog_version
+from .cards import CSRF_PLACEHOLDER
+from .facets import cached_facet_counts, facet_counts
+from .filters import ProductFilter
+from .models import Category, Product, ProductImage
+from .page_cache import CSRF_PLACEHOLDER as PAGE_CSRF_PLACEHOLDER, anonymous_page_cache, page_cache_key
+from .product_cache import ProductCache, product_cache
+from .warmup import warm_up
+from .views import catalog, catalog_async, product_detail, product_detail_async
+from apps.payments.models import Order, OrderItem
+from .search import TrigramIndex, normalize, search_index
+from .testing import create_product
+
+User = get_user_model()
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        self.products = [
+            create_product(self.category, f'Product {i}', slug=f'product-{i}')
+            for i in range(5)
+        ]
+
+    def test_index_lists_sections(self):
+        response = self.client.get(reverse('main:sitemap_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/sitemap-products.xml')
+        self.assertContains(response, '/sitemap-categories.xml')
+
+    def test_section_contains_products_with_lastmod(self):
+        response = self.client.get(reverse('main:sitemap_section', args=['products']))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/product-0</loc>')
+        self.assertContains(response, '<lastmod>')
+
+    def test_cached_section_does_not_query_database(self):
+        url = reverse('main:sitemap_section', args=['products'])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, '/product-4</loc>')
+
+    def test_unchanged_chunk_is_not_rerendered(self):
+        url = reverse('main:sitemap_section', args=['products'])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Optics', slug='optics')
+        # Только запрос отпечатка среза, без повторной выборки товаров
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_changed_product_rerenders_chunk(self):
+        url = reverse('main:sitemap_section', args=['products'])
+        self.client.get(url)
+        product = self.products[0]
+        product.slug = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        response = self.client.get(url)
+        self.assertContains(response, '/renamed</loc>')
+        self.assertNotContains(response, '/product-0</loc>')
+
+    def test_renamed_category_rerenders_chunk(self):
+        url = reverse('main:sitemap_section', args=['categories'])
+        self.assertContains(self.client.get(url), '?category=pistols</loc>')
+        self.category.slug = 'handguns'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        response = self.client.get(url)
+        self.assertContains(response, '?category=handguns</loc>')
+        self.assertNotContains(response, '?category=pistols</loc>')
+
+    def test_empty_page_is_404(self):
+        url = reverse('main:sitemap_section', args=['products'])
+        response = self.client.get(url, {'p': 2})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_section_is_404(self):
+        response = self.client.get(reverse('main:sitemap_section', args=['nope']))
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(self.admin_user)
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        for i in range(30):
+            create_product(
+                self.category, f'Glock {i}', slug=f'glock-{i}',
+                manufacturer=f'Maker {i % 5}', caliber='9mm',
+            )
+        self.url = reverse('admin:main_product_changelist')
+
+    def test_changelist_filter_choices_come_from_cache(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Maker 4')
+        product_queries = [q['sql'] for q in context.captured_queries if 'main_' in q['sql']]
+        self.assertFalse([sql for sql in product_queries if 'DISTINCT' in sql])
+        self.assertFalse([sql for sql in product_queries if 'COUNT(' in sql])
+        self.assertFalse([sql for sql in product_queries if sql.startswith('SELECT "main_category"')])
+
+    def search(self, term):
+        response = self.client.get(self.url, {'q': term})
+        return {product.name for product in response.context['cl'].result_list}
+
+    def test_search_name_and_description_by_substring(self):
+        names = self.search('LOCK 1')
+        self.assertIn('Glock 1', names)
+        self.assertIn('Glock 12', names)
+        self.assertNotIn('Glock 2', names)
+        Product.objects.filter(name='Glock 2').update(description='Компактний, полімерна рамка')
+        self.assertEqual(self.search('полімерна'), {'Glock 2'})
+
+    def test_search_identifiers_by_prefix(self):
+        self.assertEqual(len(self.search('"maker 3"')), 6)
+        self.assertEqual(self.search('"aker 3"'), set())
+        self.assertEqual(len(self.search('9M')), 30)
+
+    def test_manufacturer_filter(self):
+        response = self.client.get(self.url, {'manufacturer': 'Maker 3'})
+        products = response.context['cl'].result_list
+        self.assertEqual(len(products), 6)
+        self.assertTrue(all(product.manufacturer == 'Maker 3' for product in products))
+
+    def test_estimated_count_paginator(self):
+        paginator = EstimatedCountPaginator(Product.objects.all(), 10)
+        self.assertGreaterEqual(paginator.count, 30)
+        paginator = EstimatedCountPaginator(Product.objects.filter(manufacturer='Maker 0'), 10)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(paginator.count, 6)
+        # Точный счёт: последняя страница отфильтрованного списка всегда доступна
+        self.assertNotIn('LIMIT', context.captured_queries[0]['sql'])
+
+
+class ProductFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pistols = Category.objects.create(name='Pistols', slug='pistols')
+        self.rifles = Category.objects.create(name='Rifles', slug='rifles')
+        create_product(self.pistols, 'Glock 17', slug='glock-17', manufacturer='Glock', caliber='9mm', price=500)
+        create_product(self.pistols, 'Fort 14', slug='fort-14', manufacturer='Fort', caliber='9mm', price=300)
+        create_product(self.rifles, 'AK-74', slug='ak-74', manufacturer='Izhmash', caliber='5.45', price=900,
+                       in_stock=False)
+
+    def test_construction_does_not_query_database_when_cached(self):
+        ProductFilter({}, queryset=Product.objects.all())
+        with self.assertNumQueries(0):
+            product_filter = ProductFilter({}, queryset=Product.objects.all())
+        self.assertEqual(
+            product_filter.filters['manufacturer'].extra['choices'],
+            [('Fort', 'Fort'), ('Glock', 'Glock'), ('Izhmash', 'Izhmash')],
+        )
+
+    def test_choices_are_invalidated_on_product_change(self):
+        ProductFilter({}, queryset=Product.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            create_product(self.rifles, 'Zbroyar Z-10', slug='z-10', manufacturer='Zbroyar', caliber='.308')
+        product_filter = ProductFilter({}, queryset=Product.objects.all())
+        self.assertIn(('Zbroyar', 'Zbroyar'), product_filter.filters['manufacturer'].extra['choices'])
+        self.assertIn(('.308', '.308'), product_filter.filters['caliber'].extra['choices'])
+
+    def test_catalog_filters_through_product_filter(self):
+        response = self.client.get(reverse('main:catalog'), {
+            'category': 'pistols', 'manufacturer': 'Glock', 'price_max': '1000',
+        })
+        self.assertEqual([p.slug for p in response.context['products']], ['glock-17'])
+
+    def test_catalog_sort_and_flags(self):
+        response = self.client.get(reverse('main:catalog'), {'sort': 'price', 'in_stock': 'true'})
+        self.assertEqual([p.slug for p in response.context['products']], ['fort-14', 'glock-17'])
+        self.assertEqual(response.context['current_sort'], 'price')
+        self.assertEqual(response.context['total_count'], 2)
+
+    def test_catalog_ignores_invalid_values(self):
+        response = self.client.get(reverse('main:catalog'), {'price_min': 'abc', 'sort': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_count'], 3)
+        self.assertEqual(response.context['current_sort'], '-created_at')
+
+    def test_unknown_choice_values_match_nothing(self):
+        def slugs(params):
+            return sorted(p.slug for p in self.client.get(reverse('main:catalog'), params).context['products'])
+
+        self.assertEqual(slugs({'manufacturer': 'Beretta'}), [])
+        self.assertEqual(slugs({'caliber': '.22'}), [])
+        self.assertEqual(slugs({'category': 'shotguns'}), [])
+        self.assertEqual(slugs({'manufacturer': ['Beretta', 'Fort']}), ['fort-14'])
+        self.assertEqual(slugs({'category': ['shotguns', 'rifles']}), ['ak-74'])
+        self.assertEqual(len(slugs({'manufacturer': ''})), 3)
+        # Товар есть в БД, но кэш вариантов ещё старый
+        Product.objects.bulk_create([Product(
+            category=self.rifles, name='Zbroyar Z-10', slug='z-10', manufacturer='Zbroyar',
+            price=100, product_type='weapon', main_image='products/test.jpg',
+        )])
+        self.assertEqual(slugs({'manufacturer': 'Zbroyar'}), ['z-10'])
+
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Планы SQLite не зависят от объёма данных')
+class CatalogIndexTests(TestCase):
+    """Запросы страницы каталога и её счётчика не читают таблицу товаров целиком"""
+
+    FILTERS = {
+        'без фильтров': {},
+        'категория': {'category': 'pistols'},
+        'производитель': {'manufacturer': 'Glock'},
+        'калибр': {'caliber': '9mm'},
+        'в наличии': {'in_stock': 'true'},
+        'скидка': {'status_discount': 'true'},
+        'цена': {'price_min': '100', 'price_max': '600'},
+        'категория + в наличии': {'category': 'pistols', 'in_stock': 'true'},
+        'скидка + в наличии': {'status_discount': 'true', 'in_stock': 'true'},
+    }
+    SORTS = ('', 'price', '-price', 'name', '-created_at', 'discount_price')
+    # Проходы по индексу целиком, которые оправданы; полный проход по таблице не допускается
+    JUSTIFIED_SCANS = {
+        'количество': (
+            # COUNT(*) без условий — по самому узкому покрывающему индексу, таблица не читается
+            'SCAN main_product USING COVERING INDEX main_product_disc_price_idx',
+            # in_stock почти у всех товаров: поиск по индексу не короче прохода по нему
+            'SCAN main_product USING COVERING INDEX main_product_stock_cat_idx',
+            # Частичный индекс содержит только товары со скидкой
+            'SCAN main_product USING INDEX main_product_sale_price_idx',
+        ),
+        'страница': (
+            # Обход в порядке сортировки: LIMIT останавливает его после первой страницы
+            'SCAN main_product USING INDEX main_product_created_idx',
+            'SCAN main_product USING INDEX main_product_price_idx',
+            'SCAN main_product USING INDEX main_product_disc_price_idx',
+            'SCAN main_product USING INDEX main_product_name_idx',
+            'SCAN main_product USING INDEX main_product_sale_new_idx',
+            'SCAN main_product USING INDEX main_product_sale_price_idx',
+        ),
+    }
+
+    def setUp(self):
+        cache.clear()
+        pistols = Category.objects.create(name='Pistols', slug='pistols')
+        create_product(pistols, 'Glock 17', slug='glock-17', manufacturer='Glock', caliber='9mm', price=500)
+
+    def plans(self, queryset):
+        """Планы запроса страницы и запроса count() пагинатора"""
+        page_sql, params = queryset[:12].query.sql_with_params()
+        with CaptureQueriesContext(connection) as context:
+            queryset.count()
+        return {
+            'страница': explain(connection, page_sql, params),
+            'количество': explain(connection, context.captured_queries[0]['sql'], ()),
+        }
+
+    def test_filter_and_sort_combinations_use_indexes(self):
+        for title, data in self.FILTERS.items():
+            for sort in self.SORTS:
+                query = QueryDict(mutable=True)
+                query.update({**data, 'sort': sort} if sort else data)
+                product_filter = ProductFilter(query, queryset=Product.objects.select_related('category'))
+                self.assertTrue(product_filter.form.is_valid(), product_filter.form.errors)
+                for kind, plan in self.plans(product_filter.qs).items():
+                    with self.subTest(filter=title, sort=sort, query=kind):
+                        unjustified = [
+                            step for step in plan
+                            if step.startswith('SCAN main_product') and step not in self.JUSTIFIED_SCANS[kind]
+                        ]
+                        self.assertEqual(unjustified, [], '\n'.join(plan))
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        pistols = Category.objects.create(name='Pistols', slug='pistols')
+        rifles = Category.objects.create(name='Rifles', slug='rifles')
+        create_product(pistols, 'Glock 17', slug='glock-17', manufacturer='Glock', caliber='9mm')
+        create_product(pistols, 'Glock 19', slug='glock-19', manufacturer='Glock', caliber='9mm',
+                       in_stock=False)
+        create_product(pistols, 'Fort 17', slug='fort-17', manufacturer='Fort', caliber='9mm',
+                       status_discount=True)
+        create_product(rifles, 'AK-74', slug='ak-74', manufacturer='Izhmash', caliber='5.45')
+        create_product(rifles, 'Fort 221', slug='fort-221', manufacturer='Fort', caliber='5.56')
+        self.pistols = pistols
+
+    def facets(self, params):
+        product_filter = ProductFilter(params, queryset=Product.objects.all())
+        product_filter.qs
+        return facet_counts(product_filter)
+
+    def test_counts_ignore_own_group_only(self):
+        counts = self.facets({'manufacturer': ['Glock'], 'in_stock': 'true'})
+        # Производители: все кроме собственного фильтра (только in_stock)
+        self.assertEqual(counts['manufacturer'], {'Glock': 1, 'Fort': 2, 'Izhmash': 1})
+        # Калибры учитывают выбранного производителя и наличие
+        self.assertEqual(counts['caliber'], {'9mm': 1})
+        # Наличие учитывает производителя, но не собственный фильтр
+        self.assertEqual(counts['in_stock'], {'1': 1})
+        self.assertEqual(counts['category'], {str(self.pistols.pk): 1})
+
+    def test_all_groups_in_one_query(self):
+        product_filter = ProductFilter(
+            {'category': ['pistols'], 'caliber': ['9mm'], 'status_discount': 'true', 'price_min': '1'},
+            queryset=Product.objects.all(),
+        )
+        product_filter.qs
+        with self.assertNumQueries(1):
+            counts = facet_counts(product_filter)
+        self.assertEqual(counts['manufacturer'], {'Fort': 1})
+        self.assertEqual(counts['status_discount'], {'1': 1})
+
+    def test_catalog_sidebar(self):
+        response = self.client.get(reverse('main:catalog'), {'manufacturer': 'Fort'})
+        self.assertEqual(
+            [(c['slug'], c['product_count']) for c in response.context['categories']],
+            [('pistols', 1), ('rifles', 1)],
+        )
+        self.assertEqual(
+            [(m['manufacturer'], m['count']) for m in response.context['manufacturers']],
+            [('Fort', 2), ('Glock', 2), ('Izhmash', 1)],
+        )
+        self.assertEqual(response.context['discount_count'], 1)
+        self.assertContains(response, 'name="caliber" value="5.56"')
+
+
+@skipUnless(snapshot.np is not None, 'numpy не установлен')
+class SnapshotEngineTests(TestCase):
+    PARAMS = [
+        {},
+        {'sort': 'price'},
+        {'sort': '-name'},
+        {'category': ['rifles'], 'in_stock': 'true'},
+        {'manufacturer': ['Fort', 'Glock'], 'sort': 'price'},
+        {'caliber': ['9mm'], 'price_min': '200', 'price_max': '600'},
+        {'status_discount': 'true'},
+        {'manufacturer': ['Beretta', 'Fort'], 'category': ['shotguns', 'pistols']},
+        {'caliber': ['.22']},
+    ]
+
+    def setUp(self):
+        cache.clear()
+        snapshot.snapshot_index.clear()
+        pistols = Category.objects.create(name='Pistols', slug='pistols')
+        rifles = Category.objects.create(name='Rifles', slug='rifles')
+        create_product(pistols, 'Glock 17', slug='glock-17', manufacturer='Glock', caliber='9mm', price=500)
+        create_product(pistols, 'Glock 19', slug='glock-19', manufacturer='Glock', caliber='9mm', price=550,
+                       in_stock=False)
+        create_product(pistols, 'Fort 17', slug='fort-17', manufacturer='Fort', caliber='9mm', price=300,
+                       status_discount=True, discount_price=250)
+        create_product(rifles, 'AK-74', slug='ak-74', manufacturer='Izhmash', caliber='5.45', price=900)
+        create_product(rifles, 'Fort 221', slug='fort-221', manufacturer='Fort', caliber='5.56', price=1200)
+
+    def catalog(self, engine, params):
+        with self.settings(CATALOG_ENGINE=engine):
+            return self.client.get(reverse('main:catalog'), params).context
+
+    def test_snapshot_matches_orm(self):
+        for params in self.PARAMS:
+            with self.subTest(params=params):
+                orm = self.catalog('orm', params)
+                fast = self.catalog('snapshot', params)
+                self.assertEqual(
+                    [p.slug for p in fast['products']], [p.slug for p in orm['products']]
+                )
+                for key in ('total_count', 'categories', 'manufacturers', 'calibers',
+                            'in_stock_count', 'discount_count'):
+                    self.assertEqual(fast[key], orm[key], key)
+
+    def test_snapshot_is_rebuilt_on_catalog_change(self):
+        self.catalog('snapshot', {})
+        with self.captureOnCommitCallbacks(execute=True):
+            create_product(Category.objects.get(slug='rifles'), 'Zbroyar Z-10', slug='z-10', manufacturer='Zbroyar')
+        context = self.catalog('snapshot', {'manufacturer': ['Zbroyar']})
+        self.assertEqual([p.slug for p in context['products']], ['z-10'])
+
+    def test_search_falls_back_to_orm(self):
+        context = self.catalog('snapshot', {'search': 'glock'})
+        self.assertEqual(context['total_count'], 2)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete_index.clear()
+        pistols = Category.objects.create(name='Pistols', slug='pistols')
+        create_product(pistols, 'Glock 17', slug='glock-17', manufacturer='Glock', caliber='9mm')
+        create_product(pistols, 'Glock 19', slug='glock-19', manufacturer='Glock', caliber='9mm', in_stock=False)
+        create_product(pistols, 'Fort 17', slug='fort-17', manufacturer='Fort', caliber='9mm')
+
+    def suggest(self, query, **params):
+        response = self.client.get(reverse('main:suggest'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_suggests_all_kinds_by_prefix(self):
+        data = self.suggest('gl')
+        self.assertEqual([p['name'] for p in data['products']], ['Glock 17', 'Glock 19'])
+        self.assertEqual(data['manufacturers'], [
+            {'name': 'Glock', 'count': 2, 'url': '/catalog?manufacturer=Glock'},
+        ])
+        self.assertEqual(self.suggest('9')['calibers'][0]['name'], '9mm')
+        self.assertEqual(self.suggest('PIST')['categories'][0]['url'], '/catalog?category=pistols')
+
+    def test_matches_inner_words_and_prefers_in_stock(self):
+        data = self.suggest('1', limit=1)
+        self.assertEqual(len(data['products']), 1)
+        self.assertIn(data['products'][0]['name'], ('Glock 17', 'Fort 17'))
+
+    def test_answers_from_memory(self):
+        self.suggest('g')
+        with self.assertNumQueries(0):
+            self.suggest('fo')
+
+    def test_rebuilt_on_catalog_change(self):
+        self.suggest('g')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_product(Category.objects.get(), 'Grand Power K100', slug='k100', manufacturer='Grand Power')
+        self.assertIn('Grand Power K100', [p['name'] for p in self.suggest('gr')['products']])
+
+    def test_lookup_work_does_not_depend_on_catalog_size(self):
+        class CountingKeys(list):
+            reads = 0
+
+            def __getitem__(self, position):
+                self.reads += 1
+                return super().__getitem__(position)
+
+        products = [
+            (f'Product {i:06d}', f'product-{i}', f'Maker {i % 500}', f'{i % 40}mm', True)
+            for i in range(50_000)
+        ]
+        index = AutocompleteIndex(products, [])
+        keys = index.products.keys = CountingKeys(index.products.keys)
+        with self.assertNumQueries(0):
+            for i in range(50):
+                self.assertEqual(len(index.suggest(f'product {i:03d}')['products']), 5)
+        # Бинарный поиск и не больше SCAN_LIMIT совпадений, хотя у каждого префикса их 1000
+        per_query = math.ceil(math.log2(len(keys))) + 1 + autocomplete.SCAN_LIMIT + 1
+        self.assertLessEqual(keys.reads, 50 * per_query)
+
+
+class FuzzySearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_index.clear()
+        rifles = Category.objects.create(name='Rifles', slug='rifles')
+        create_product(rifles, 'Glock 17', slug='glock-17', manufacturer='Glock', caliber='9mm')
+        create_product(rifles, 'AK-47', slug='ak-47', manufacturer='Kalashnikov', caliber='7.62x39')
+        create_product(rifles, 'SKS', slug='sks', manufacturer='Tula', caliber='7.62x39')
+        create_product(rifles, 'Remington 700', slug='rem-700', manufacturer='Remington', caliber='.308 Win')
+
+    def search(self, query):
+        response = self.client.get(reverse('main:catalog'), {'search': query})
+        return {product.name for product in response.context['products']}
+
+    def test_normalize_folds_lookalikes_and_punctuation(self):
+        self.assertEqual(normalize('7,62х39'), '7.62x39')
+        self.assertEqual(normalize('  Glock-17 '), 'glock 17')
+
+    def test_misspelled_brand(self):
+        self.assertEqual(self.search('Glok'), {'Glock 17'})
+
+    def test_cyrillic_caliber(self):
+        self.assertEqual(self.search('7,62х39'), {'AK-47', 'SKS'})
+
+    def test_exact_hits_skip_fuzzy_fallback(self):
+        for i in range(3):
+            create_product(Category.objects.get(), f'Glock {19 + i}', slug=f'glock-{19 + i}')
+        self.assertEqual(len(self.search('Glock')), 4)
+        self.assertIsNone(search_index._value)
+
+    def test_unrelated_query_finds_nothing(self):
+        self.assertEqual(self.search('binocular'), set())
+
+    def test_candidates_are_bounded(self):
+        index = TrigramIndex((pk, f'Product {pk}', 'Maker', '9mm') for pk in range(50_000))
+        counters = []
+
+        class RecordingCounter(Counter):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                counters.append(self)
+
+        # Триграммы « 42», « 43», … есть у 1111 товаров каждая: вместе больше MAX_CANDIDATES
+        with mock.patch('apps.main.search.Counter', RecordingCounter):
+            results = index.search('Produkt 42 43 44 45')
+        self.assertEqual(len(counters[0]), search.MAX_CANDIDATES)
+        self.assertLessEqual(len(results), search.MAX_RESULTS)
+
+    @mock.patch('apps.main.search.MAX_CANDIDATES', 3)
+    def test_candidates_are_capped_within_posting(self):
+        index = TrigramIndex((pk, f'Glock {pk}', 'Glock', '9mm') for pk in range(10))
+        self.assertEqual(len(index.search('Glok')), 3)
+
+    @mock.patch('apps.main.search.MAX_POSTING', 5)
+    def test_common_trigrams_are_skipped(self):
+        index = TrigramIndex((pk, f'Glock {pk}', 'Glock', '9mm') for pk in range(10))
+        self.assertEqual(index.search('Glock 7'), [7])
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_generate_data(self):
+        call_command('generate_data', products=50, users=5, orders=20, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 50)
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertTrue(OrderItem.objects.exists())
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_results_are_stored_and_compared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            options = {'products': 60, 'repeat': 2, 'warmup': 0, 'output': directory}
+            call_command('benchmark_suite', stdout=StringIO(), **options)
+            output = StringIO()
+            call_command('benchmark_suite', stdout=output, stderr=StringIO(), **options)
+            results = sorted(Path(directory).glob('*.json'))
+            self.assertEqual(len(results), 2)
+            data = json.loads(results[-1].read_text(encoding='utf-8'))
+
+        self.assertEqual(data['products'], 0)  # данные откатываются после замеров
+        for name in ('catalog ?category', 'product_detail', 'cart_add (ajax)', 'checkout', 'liqpay_callback'):
+            self.assertEqual(set(data['scenarios'][name]), {'queries', 'p50', 'p95', 'p99', 'mean'})
+        self.assertIn('Сравнение с', output.getvalue())
+        self.assertFalse(Product.objects.exists())
+
+
+@mock.patch('BulavaArms.routers.replica_alias', lambda: 'replica')
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def request(self, view, method='get', **cookies):
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies)
+        seen = {}
+
+        @read_replica
+        def wrapped(request):
+            seen.update(view())
+            return HttpResponse()
+
+        response = StickyPrimaryMiddleware(wrapped)(request)
+        return seen, response
+
+    def reads(self):
+        return {
+            'product': self.router.db_for_read(Product),
+            'category': self.router.db_for_read(Category),
+            'order': self.router.db_for_read(Order),
+        }
+
+    def test_catalog_reads_go_to_replica(self):
+        seen, response = self.request(self.reads)
+        self.assertEqual(seen, {'product': 'replica', 'category': 'replica', 'order': 'default'})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_primary_outside_marked_views(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+        response = StickyPrimaryMiddleware(lambda request: HttpResponse(self.router.db_for_read(Product)))(
+            RequestFactory().get('/')
+        )
+        self.assertEqual(response.content, b'default')
+
+    def test_primary_inside_transaction(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            seen, response = self.request(self.reads)
+        self.assertEqual(seen['product'], 'default')
+
+    def test_write_opens_sticky_window(self):
+        seen, response = self.request(lambda: {'write': self.router.db_for_write(Product)})
+        self.assertEqual(seen['write'], 'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        pinned = {STICKY_COOKIE: response.cookies[STICKY_COOKIE].value}
+        seen, response = self.request(self.reads, **pinned)
+        self.assertEqual(seen['product'], 'default')
+
+        seen, response = self.request(self.reads, **{STICKY_COOKIE: str(time.time() - 1)})
+        self.assertEqual(seen['product'], 'replica')
+
+    def test_post_opens_sticky_window(self):
+        seen, response = self.request(lambda: {}, method='post')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_version_keyed_caches_built_from_primary(self):
+        index = ProcessLocalIndex(lambda: self.router.db_for_read(Product))
+        seen, response = self.request(lambda: {
+            'index': index.get(),
+            'product': self.router.db_for_read(Product),
+        })
+        self.assertEqual(seen, {'index': 'default', 'product': 'replica'})
+
+        with primary_reads():
+            seen, response = self.request(self.reads)
+        self.assertEqual(seen['product'], 'default')
+
+    @override_settings(FULL_PAGE_CACHE=True)
+    def test_page_cache_fill_reads_primary(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        page = anonymous_page_cache(read_replica(lambda request: HttpResponse(self.router.db_for_read(Product))))
+        request = RequestFactory().get('/page-cache-routing')
+        request.user = AnonymousUser()
+        response = StickyPrimaryMiddleware(page)(request)
+        self.assertEqual(response.content, b'default')
+
+    def test_replica_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'main'))
+        self.assertTrue(self.router.allow_migrate('default', 'main'))
+
+
+
+class AsyncViewTests(TestCase):
+    """Async-варианты каталога и карточки дают тот же контекст, что и обычные"""
+
+    def setUp(self):
+        cache.clear()
+        pistols = Category.objects.create(name='Pistols', slug='pistols')
+        rifles = Category.objects.create(name='Rifles', slug='rifles')
+        for i in range(30):
+            create_product(pistols if i % 2 else rifles, f'Product {i}', slug=f'product-{i}',
+                           manufacturer=f'Maker {i % 3}', price=100 + i)
+        ProductImage.objects.create(product=Product.objects.get(slug='product-1'), image='products/extra/1.jpg')
+
+    def context(self, view, query='', *args):
+        request = RequestFactory().get('/', QueryDict(query))
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        with mock.patch('apps.main.views.render', lambda request, template, context: context):
+            if view in (catalog_async, product_detail_async):
+                return async_to_sync(view)(request, *args)
+            return view(request, *args)
+
+    def test_catalog_matches_sync_view(self):
+        for query in ('', 'page=2', 'page=999', 'page=x', 'page=0', 'page=-1', 'page=2.0',
+                      'category=pistols&sort=price', 'manufacturer=Maker 1'):
+            expected = self.context(catalog, query)
+            actual = self.context(catalog_async, query)
+            with self.subTest(query=query):
+                self.assertEqual(list(actual['products']), list(expected['products']))
+                self.assertEqual(actual['products'].number, expected['products'].number)
+                self.assertEqual(actual['total_count'], expected['total_count'])
+                self.assertEqual(actual['manufacturers'], expected['manufacturers'])
+                self.assertEqual(actual['categories'], expected['categories'])
+
+    @skipUnless(snapshot.np is not None, 'numpy не установлен')
+    @override_settings(CATALOG_ENGINE='snapshot', FULL_PAGE_CACHE=True)
+    def test_snapshot_branch_runs_decorators_once(self):
+        request = AsyncRequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.auser = sync_to_async(lambda: request.user)
+        request.session = SessionStore()
+        with mock.patch('apps.main.page_cache.page_cache_key', wraps=page_cache_key) as key:
+            response = async_to_sync(catalog_async)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(key.call_count, 1)
+
+    def test_product_detail_matches_sync_view(self):
+        expected = self.context(product_detail, '', 'product-1')
+        actual = self.context(product_detail_async, '', 'product-1')
+        self.assertEqual(actual['product'], expected['product'])
+        self.assertEqual(list(actual['images']), list(expected['images']))
+        with self.assertRaises(Http404):
+            self.context(product_detail_async, '', 'missing')
+
+
+class ProductCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        self.products = [
+            create_product(self.category, f'Product {i}', slug=f'product-{i}')
+            for i in range(15)
+        ]
+
+    def test_cards_rendered_once_and_shared_between_pages(self):
+        with mock.patch('apps.main.cards.render_to_string', wraps=render_to_string) as render_card:
+            self.client.get(reverse('main:catalog'))
+            self.assertEqual(render_card.call_count, 12)
+            self.client.get(reverse('main:catalog'), {'sort': 'name'})
+            # «По названию» первые 12 — те же товары, кроме трёх новых
+            self.assertEqual(render_card.call_count, 15)
+            response = self.client.get(reverse('main:catalog'), {'page': 2})
+            self.assertEqual(render_card.call_count, 15)
+        self.assertContains(response, 'Product 0')
+
+    def test_one_cache_round_trip_per_page(self):
+        self.client.get(reverse('main:catalog'))
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            self.client.get(reverse('main:catalog'))
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(len(get_many.call_args.args[0]), 12)
+        set_many.assert_not_called()
+
+    def test_saved_product_gets_new_card(self):
+        product = self.products[-1]
+        self.client.get(reverse('main:catalog'))
+        product.price = 777
+        product.save()
+        self.assertContains(self.client.get(reverse('main:catalog')), '777')
+
+    def test_csrf_token_is_per_request(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(reverse('main:catalog'))
+        response = client.get(reverse('main:catalog'))
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        product = self.products[-1]
+        response = client.post(
+            reverse('cart:cart_add', args=[product.id]),
+            {'quantity': 1, 'csrfmiddlewaretoken': token},
+        )
+        self.assertNotEqual(response.status_code, 403)
+
+
+class ProductCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_cache.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        self.products = [
+            create_product(self.category, f'Product {i}', slug=f'product-{i}')
+            for i in range(3)
+        ]
+        self.ids = [product.pk for product in self.products]
+
+    def test_get_many_hits_database_once(self):
+        with self.assertNumQueries(1):
+            products = product_cache.get_many(self.ids + [0])
+        self.assertEqual(list(products), self.ids)
+        with self.assertNumQueries(0):
+            products = product_cache.get_many(map(str, reversed(self.ids)))
+            self.assertEqual(products[self.ids[0]].category.name, 'Pistols')
+        self.assertEqual(list(products), self.ids[::-1])
+
+    def test_shared_tier_serves_other_workers(self):
+        product_cache.get_many(self.ids)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(ProductCache().get_many(self.ids)), 3)
+
+    def test_save_invalidates_every_worker(self):
+        other_worker = ProductCache()
+        other_worker.get_many(self.ids)
+        product = self.products[0]
+        product.price = 555
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(other_worker.get(product.pk).price, 555)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[1].delete()
+        self.assertIsNone(other_worker.get(self.ids[1]))
+
+    def test_invalidation_waits_for_commit(self):
+        product_cache.get_many(self.ids)
+        version = get_catalog_version()
+        product = self.products[0]
+        product.price = 555
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.save()
+            # До фиксации другие процессы читают старые данные — кэш не трогается
+            self.assertEqual(get_catalog_version(), version)
+            self.assertNotEqual(ProductCache().get(product.pk).price, 555)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertEqual(ProductCache().get(product.pk).price, 555)
+
+    def test_missing_stamp_does_not_overwrite_invalidation(self):
+        # Между чтением меток и записью новой другой процесс успел инвалидировать товар
+        product_cache.invalidate(self.ids[0])
+        stamp = cache.get(f'product:version:{self.ids[0]}')
+        with mock.patch.object(cache, 'get_many', return_value={}):
+            versions = ProductCache()._versions(self.ids[:1])
+        self.assertEqual(versions, {self.ids[0]: stamp})
+        self.assertEqual(cache.get(f'product:version:{self.ids[0]}'), stamp)
+
+    def test_category_rename_invalidates_products(self):
+        product_cache.get_many(self.ids)
+        self.category.name = 'Handguns'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(product_cache.get(self.ids[0]).category.name, 'Handguns')
+
+    def test_local_tier_is_bounded(self):
+        worker = ProductCache()
+        with self.settings(PRODUCT_CACHE_SIZE=2):
+            worker.get_many(self.ids)
+        self.assertEqual(list(worker._local), self.ids[1:])
+
+    def test_returns_copies(self):
+        product_cache.get(self.ids[0]).name = 'Changed'
+        self.assertEqual(product_cache.get(self.ids[0]).name, 'Product 0')
+
+    def test_get_by_slug(self):
+        self.assertEqual(product_cache.get_by_slug('product-1').pk, self.ids[1])
+        with self.assertNumQueries(0):
+            product_cache.get_by_slug('product-1')
+        product = self.products[1]
+        product.slug = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertIsNone(product_cache.get_by_slug('product-1'))
+        self.assertEqual(product_cache.get_by_slug('renamed').pk, product.pk)
+        self.assertIsNone(product_cache.get_by_slug('missing'))
+
+
+@override_settings(FULL_PAGE_CACHE=True)
+class FullPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        self.product = create_product(self.category, 'Glock 17', slug='glock-17')
+
+    def test_anonymous_pages_served_from_cache(self):
+        for url in (reverse('main:main_page'), reverse('main:catalog'), reverse('main:detail_page', args=['glock-17'])):
+            with self.subTest(url):
+                self.assertEqual(self.client.get(url).headers['X-Page-Cache'], 'miss')
+                with self.assertNumQueries(0):
+                    response = Client().get(url)
+                self.assertEqual(response.headers['X-Page-Cache'], 'hit')
+                self.assertContains(response, 'BulavaArms')
+
+    def test_query_string_and_catalog_version_are_part_of_key(self):
+        url = reverse('main:catalog')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, {'sort': 'price'}).headers['X-Page-Cache'], 'miss')
+        self.product.name = 'Glock 19'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response.headers['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Glock 19')
+
+    def test_cached_page_has_no_personal_state(self):
+        owner = Client(enforce_csrf_checks=True)
+        owner.get(reverse('main:catalog'))
+        token = owner.cookies['csrftoken'].value
+        owner.post(reverse('cart:cart_add', args=[self.product.pk]), {'csrfmiddlewaretoken': token})
+        page = owner.get(reverse('main:catalog'))
+        self.assertNotContains(page, 'додано до кошика')
+
+        state = owner.get(reverse('cart:cart_state')).json()
+        self.assertEqual(state['cart_items_count'], 1)
+        self.assertIn('додано до кошика', state['messages'])
+        self.assertEqual(owner.get(reverse('cart:cart_state')).json()['messages'].strip(), '')
+
+        # Чужая страница из кэша — со своим CSRF-токеном
+        visitor = Client(enforce_csrf_checks=True)
+        page = visitor.get(reverse('main:catalog'))
+        self.assertEqual(page.headers['X-Page-Cache'], 'hit')
+        self.assertNotContains(page, PAGE_CSRF_PLACEHOLDER)
+        form_token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page.content.decode()).group(1)
+        response = visitor.post(
+            reverse('cart:cart_add', args=[self.product.pk]), {'csrfmiddlewaretoken': form_token},
+        )
+        self.assertNotEqual(response.status_code, 403)
+
+    def test_authenticated_users_bypass_cache(self):
+        self.client.force_login(User.objects.create_user(username='buyer', password='pass'))
+        for attempt in range(2):
+            response = self.client.get(reverse('main:catalog'))
+            self.assertNotIn('X-Page-Cache', response.headers)
+            self.assertContains(response, 'cartCounter')
+        self.assertNotContains(response, reverse('cart:cart_state'))
+
+    def test_async_views(self):
+        def get(view, *args):
+            request = AsyncRequestFactory().get(f'/{view.__name__}/{"/".join(args)}')
+            request.session = SessionStore()
+            request.user = AnonymousUser()
+
+            async def auser():
+                return AnonymousUser()
+            request.auser = auser
+            return async_to_sync(view)(request, *args)
+
+        for view, args in ((catalog_async, ()), (product_detail_async, ('glock-17',))):
+            with self.subTest(view.__name__):
+                self.assertEqual(get(view, *args).headers['X-Page-Cache'], 'miss')
+                self.assertEqual(get(view, *args).headers['X-Page-Cache'], 'hit')
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_cache.clear()
+        autocomplete_index.clear()
+        search_index.clear()
+        self.addCleanup(autocomplete_index.clear)
+        self.addCleanup(search_index.clear)
+        category = Category.objects.create(name='Pistols', slug='pistols')
+        for i in range(15):
+            create_product(category, f'Glock {i}', slug=f'glock-{i}', manufacturer='Glock')
+
+    def test_warm_up_fills_caches(self):
+        timings = warm_up()
+        self.assertEqual(list(timings), ['imports', 'templates', 'database', 'catalog', 'indexes', 'products'])
+        # Остаются только запросы самой страницы: товары и их число
+        with self.assertNumQueries(2):
+            self.client.get(reverse('main:catalog'))
+        ids = list(Product.objects.values_list('pk', flat=True)[:12])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('main:suggest'), {'q': 'glo'})
+            product_cache.get_many(ids)
+
+    def test_unfiltered_facets_cached_per_catalog_version(self):
+        def counts(query=''):
+            product_filter = ProductFilter(QueryDict(query), queryset=Product.objects.all())
+            product_filter.form.is_valid()
+            return cached_facet_counts(product_filter)
+
+        self.assertEqual(counts()['manufacturer'], {'Glock': 15})
+        with self.assertNumQueries(0):
+            counts('sort=price')
+        with self.assertNumQueries(1):
+            counts('in_stock=true')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.first().delete()
+        self.assertEqual(counts()['manufacturer'], {'Glock': 14})
+
+    def test_command(self):
+        output = StringIO()
+        call_command('warm_up', products=5, stdout=output)
+        self.assertIn('indexes', output.getvalue())
+
+    def test_failed_warm_up_does_not_stop_server(self):
+        server = mock.Mock()
+        with mock.patch('apps.main.warmup.warm_up', side_effect=RuntimeError('cache down')), \
+                mock.patch('apps.main.warmup.prepare_fork') as prepare_fork, \
+                mock.patch('deploy.hooks.PRELOAD_APP', True):
+            when_ready(server)
+        server.log.exception.assert_called_once()
+        prepare_fork.assert_called_once()
+
+
+class StaticBundleTests(TestCase):
+    def test_minify_fallbacks(self):
+        css = '/* шапка */\n.header  {\n    color: #fff;\n    margin: 0 auto;\n}\n\na, b { color: red; }\n'
+        with mock.patch('BulavaArms.storage.rcssmin', None):
+            self.assertEqual(minify_css(css), '.header{color:#fff;margin:0 auto}a,b{color:red}')
+        js = "// меню\nfunction open() {\n    const url = 'https://example.com';\n\n    return url;\n}\n"
+        with mock.patch('BulavaArms.storage.rjsmin', None):
+            self.assertEqual(minify_js(js), "function open() {\nconst url = 'https://example.com';\nreturn url;\n}")
+
+    def test_templates_link_bundles(self):
+        category = Category.objects.create(name='Pistols', slug='pistols')
+        create_product(category, 'Glock 17', slug='glock-17')
+        html = self.client.get(reverse('main:catalog')).content.decode()
+        self.assertNotIn('<style>', html)
+        self.assertIn('href="/static/main/css/base.css"', html)
+        self.assertIn('href="/static/main/css/catalog.css"', html)
+        self.assertIn('src="/static/main/js/catalog.js"', html)
+
+    def test_collectstatic_writes_hashed_compressed_bundles(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(STATIC_ROOT=directory):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = staticfiles_storage.url('main/css/catalog.css')
+            self.assertRegex(url, r'^/static/main/css/catalog\.[0-9a-f]{12}\.css$')
+            bundle = Path(directory) / url.removeprefix('/static/')
+            source = Path(__file__).parent / 'static/main/css/catalog.css'
+            self.assertLess(bundle.stat().st_size, source.stat().st_size)
+            self.assertNotIn(b'/*', bundle.read_bytes())
+            with open(f'{bundle}.gz', 'rb') as compressed:
+                self.assertEqual(gzip.decompress(compressed.read()), bundle.read_bytes())
+            # Сжатые копии — у всех текстовых форматов, не только у бандлов
+            icon = Path(directory) / staticfiles_storage.stored_name('admin/img/icon-yes.svg')
+            self.assertTrue(Path(f'{icon}.gz').is_file())
+            # Сторонние файлы не минифицируются
+            core = Path(directory) / staticfiles_storage.stored_name('admin/js/core.js')
+            self.assertEqual(core.read_bytes(), Path(finders.find('admin/js/core.js')).read_bytes())
+
+    def test_unhashed_names_only_in_debug_or_tests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            storage = BundleStaticFilesStorage(location=directory)
+            self.assertEqual(storage.stored_name('main/css/base.css'), 'main/css/base.css')
+            with override_settings(DEBUG=False, TESTING=False), self.assertRaises(ValueError):
+                storage.stored_name('main/css/base.css')
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, response, accept='gzip, deflate'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip_html_and_json(self):
+        html = '<p>Glock 17</p>' * 200
+        response = self.respond(HttpResponse(html))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content).decode(), html)
+        warehouses = JsonResponse({'warehouses': [{'Description': f'Відділення №{i}'} for i in range(400)]})
+        self.assertEqual(self.respond(warehouses)['Content-Encoding'], 'gzip')
+
+    def test_skipped(self):
+        html = '<p>Glock 17</p>' * 200
+        self.assertFalse(self.respond(HttpResponse(html), accept='').has_header('Content-Encoding'))
+        self.assertFalse(self.respond(HttpResponse(html), accept='gzip;q=0').has_header('Content-Encoding'))
+        self.assertFalse(self.respond(HttpResponse('<p>Glock</p>')).has_header('Content-Encoding'))
+        self.assertFalse(self.respond(HttpResponse(b'\x89PNG' * 500, content_type='image/png')).has_header('Content-Encoding'))
+        encoded = HttpResponse(html, headers={'Content-Encoding': 'br'})
+        self.assertEqual(self.respond(encoded).content, html.encode())
+
+    def test_streaming_chunks_flushed(self):
+        produced = []
+
+        def rows():
+            for i in range(3):
+                produced.append(i)
+                yield f'row {i}\n' * 50
+
+        response = self.respond(StreamingHttpResponse(rows(), content_type='text/plain'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        decompressor = zlib.decompressobj(31)
+        chunks = iter(response.streaming_content)
+        # Каждая часть доходит до клиента сразу, до того как view выдаст следующую
+        self.assertEqual(decompressor.decompress(next(chunks)), b'row 0\n' * 50)
+        self.assertEqual(produced, [0])
+        rest = b''.join(decompressor.decompress(chunk) for chunk in chunks)
+        self.assertEqual(rest, b'row 1\n' * 50 + b'row 2\n' * 50)
+
+    def test_async_streaming(self):
+        async def rows():
+            for i in range(3):
+                yield f'row {i}\n' * 50
+
+        async def consume(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        response = self.respond(StreamingHttpResponse(rows(), content_type='text/plain'))
+        self.assertTrue(response.is_async)
+        content = async_to_sync(consume)(response)
+        self.assertEqual(gzip.decompress(content), b''.join(f'row {i}\n'.encode() * 50 for i in range(3)))
+
+    def test_accepted_encoding(self):
+        with mock.patch('BulavaArms.compression.brotli', object()):
+            self.assertEqual(accepted_encoding('gzip, deflate, br'), 'br')
+            self.assertEqual(accepted_encoding('br;q=0.5, gzip'), 'gzip')
+            self.assertEqual(accepted_encoding('*'), 'br')
+        with mock.patch('BulavaArms.compression.brotli', None):
+            self.assertEqual(accepted_encoding('br, gzip;q=0.8'), 'gzip')
+            self.assertIsNone(accepted_encoding('identity'))
+            self.assertIsNone(accepted_encoding('gzip;q=0, *;q=0.5'))
+
+    @skipUnless(brotli is not None, 'brotli не установлен')
+    def test_brotli(self):
+        html = '<p>Glock 17</p>' * 200
+        response = self.respond(HttpResponse(html), accept='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content).decode(), html)
@@ -1,10 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from .views import catalog, main, product_detail
+from .views import (
+    catalog, catalog_async, main, product_detail, product_detail_async, sitemap_index, sitemap_section, suggest,
+)
 
 app_name = 'main'
 
 urlpatterns = [
     path('', main, name='main_page'),
-    path('catalog', catalog, name='catalog'),
-    path('<slug:slug>', product_detail, name='detail_page')
+    # Под ASGI (ASYNC_VIEWS=1) каталог и карточка товара выполняют запросы одновременно
+    path('catalog', catalog_async if settings.ASYNC_VIEWS else catalog, name='catalog'),
+    path('catalog/suggest', suggest, name='suggest'),
+    path('sitemap.xml', sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>.xml', sitemap_section, name='sitemap_section'),
+    path('<slug:slug>', product_detail_async if settings.ASYNC_VIEWS else product_detail, name='detail_page')
 ]
@@ -1,118 +1,216 @@
-from django.db.models import Q, Count
-from django.shortcuts import render,get_object_or_404
-from django.core.paginator import Paginator
-from .models import Product, Category
+from django.contrib.sitemaps import views as sitemap_views
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.core.paginator import Page, Paginator
+from BulavaArms.db import gather_queries, run_in_pool
+from BulavaArms.routers import read_replica
+from .autocomplete import autocomplete_index
+from .cache import get_catalog_version
+from .facets import build_sidebar, cached_facet_counts
+from .models import Product, ProductImage
+from .page_cache import anonymous_page_cache
+from .product_cache import product_cache
 from .filters import ProductFilter
+from .sitemaps import sitemaps
+from .snapshot import SnapshotPage, can_use_snapshot, snapshot_enabled, snapshot_index
 
 
+CATALOG_PAGE_SIZE = 12
+
+
+@anonymous_page_cache
 def main(request):
     """Главная страница"""
     return render(request, 'main/main.html')
 
 
-def catalog(request):
-    products = Product.objects.all().select_related('category')
-
-    category_slugs = request.GET.getlist('category')
-    selected_categories = []
-    if category_slugs:
-        selected_categories = Category.objects.filter(slug__in=category_slugs)
-        products = products.filter(category__slug__in=category_slugs)
-
-    manufacturers = request.GET.getlist('manufacturer')
-    if manufacturers:
-        products = products.filter(manufacturer__in=manufacturers)
-
-    calibers = request.GET.getlist('caliber')
-    if calibers:
-        products = products.filter(caliber__in=calibers)
-
-    price_min = request.GET.get('price_min')
-    price_max = request.GET.get('price_max')
-    if price_min:
-        try:
-            products = products.filter(price__gte=float(price_min))
-        except ValueError:
-            pass
-    if price_max:
-        try:
-            products = products.filter(price__lte=float(price_max))
-        except ValueError:
-            pass
-
-    in_stock = request.GET.get('in_stock')
-    if in_stock == 'true':
-        products = products.filter(in_stock=True)
-
-    status_discount = request.GET.get('status_discount')
-    if status_discount == 'true':
-        products = products.filter(status_discount=True)
-
-    search_query = request.GET.get('search')
-    if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(manufacturer__icontains=search_query)
-        )
-
-    sort_by = request.GET.get('sort', '-created_at')
-    valid_sort_fields = [
-        'price', '-price',
-        'name', '-name',
-        'created_at', '-created_at',
-        'discount_price', '-discount_price'
-    ]
+def _catalog_filter(request):
+    product_filter = ProductFilter(
+        request.GET,
+        queryset=Product.objects.select_related('category'),
+    )
+    product_filter.form.is_valid()
+    return product_filter
 
-    if sort_by in valid_sort_fields:
-        products = products.order_by(sort_by)
 
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+def _catalog_context(product_filter, page_obj, total_count, counts):
+    cleaned_data = product_filter.form.cleaned_data
+    return {
+        'products': page_obj,
+        'selected_categories': cleaned_data.get('category') or [],
+        'total_count': total_count,
+        'current_sort': (cleaned_data.get('sort') or ['-created_at'])[0],
+        'search_query': cleaned_data.get('search'),
+        **build_sidebar(product_filter, counts),
+    }
 
 
-    all_categories = Category.objects.annotate(
-        product_count=Count('products')
-    ).filter(product_count__gt=0).order_by('name')
+def _catalog(request, product_filter):
+    sort_by = (product_filter.form.cleaned_data.get('sort') or ['-created_at'])[0]
 
-    base_query = Product.objects.all()
-    if selected_categories:
-        base_query = base_query.filter(category__in=selected_categories)
+    if snapshot_enabled() and can_use_snapshot(product_filter):
+        ids, counts = snapshot_index.get().query(product_filter, sort_by)
+        products = SnapshotPage(ids, product_filter.queryset)
+    else:
+        products = product_filter.qs
+        counts = cached_facet_counts(product_filter)
 
-    manufacturers_with_count = base_query.values('manufacturer') \
-        .annotate(count=Count('id')) \
-        .filter(manufacturer__isnull=False) \
-        .exclude(manufacturer='') \
-        .order_by('manufacturer')
+    paginator = Paginator(products, CATALOG_PAGE_SIZE)
+    page_number = request.GET.get('page', 1)
+    page_obj = paginator.get_page(page_number)
 
-    # Калибры в рамках выбранных категорий
-    calibers_with_count = base_query.values('caliber') \
-        .annotate(count=Count('id')) \
-        .filter(caliber__isnull=False) \
-        .exclude(caliber='') \
-        .order_by('caliber')
+    context = _catalog_context(product_filter, page_obj, paginator.count, counts)
+    return render(request, 'main/catalog.html', context)
 
-    # Статистика по наличию и скидкам
-    in_stock_count = base_query.filter(in_stock=True).count()
-    discount_count = base_query.filter(status_discount=True).count()
 
-    context = {
-        'products': page_obj,
-        'categories': all_categories,
-        'selected_categories': selected_categories,
-        'manufacturers': manufacturers_with_count,
-        'calibers': calibers_with_count,
-        'in_stock_count': in_stock_count,
-        'discount_count': discount_count,
-        'total_count': products.count(),
-        'current_sort': sort_by,
-        'search_query': search_query,
+@anonymous_page_cache
+@read_replica
+def catalog(request):
+    return _catalog(request, _catalog_filter(request))
+
+
+@anonymous_page_cache
+@read_replica
+async def catalog_async(request):
+    """
+    Каталог для ASGI: товары страницы, их общее число и фасеты — независимые
+    запросы, они выполняются одновременно (gather_queries).
+    """
+    product_filter = await run_in_pool(_catalog_filter, request)
+    if snapshot_enabled() and can_use_snapshot(product_filter):
+        # Снимок в памяти не ходит в БД — параллелить нечего
+        return await run_in_pool(_catalog, request, product_filter)
+
+    # Страница запрашивается сразу, не дожидаясь числа товаров; если get_page
+    # выберет другой номер (за пределами, меньше 1) — перезапрос
+    queryset = await run_in_pool(lambda: product_filter.qs)
+    paginator = Paginator(queryset, CATALOG_PAGE_SIZE)
+    page_number = request.GET.get('page', 1)
+    try:
+        requested = max(int(page_number), 1)
+    except ValueError:
+        requested = 1
+    offset = (requested - 1) * CATALOG_PAGE_SIZE
+    rows, total_count, counts = await gather_queries(
+        lambda: list(queryset[offset:offset + CATALOG_PAGE_SIZE]),
+        queryset.count,
+        lambda: cached_facet_counts(product_filter),
+    )
+
+    paginator.count = total_count
+    number = paginator.get_page(page_number).number
+    if number != requested:
+        bottom = (number - 1) * CATALOG_PAGE_SIZE
+        rows = await run_in_pool(list, queryset[bottom:bottom + CATALOG_PAGE_SIZE])
+    page_obj = Page(rows, number, paginator)
+
+    context = _catalog_context(product_filter, page_obj, total_count, counts)
+    return await run_in_pool(render, request, 'main/catalog.html', context)
+
+
+def suggest(request):
+    """Подсказки поиска по префиксу (JSON) из индекса в памяти процесса"""
+    query = request.GET.get('q', '')[:100]
+    try:
+        limit = min(max(int(request.GET.get('limit', 5)), 1), 10)
+    except ValueError:
+        limit = 5
+    return JsonResponse({'query': query, **autocomplete_index.get().suggest(query, limit)})
+
+
+@anonymous_page_cache
+@read_replica
+def product_detail(request, slug):
+    product = product_cache.get_by_slug(slug)
+    if product is None:
+        raise Http404('Товар не найден')
+    return render(request, 'main/product-detail.html', {'product': product, 'images': product.images.all()})
+
+
+@anonymous_page_cache
+@read_replica
+async def product_detail_async(request, slug):
+    """Карточка товара для ASGI: товар (из кэша товаров) и его изображения запрашиваются одновременно"""
+    product, images = await gather_queries(
+        lambda: product_cache.get_by_slug(slug),
+        lambda: list(ProductImage.objects.filter(product__slug=slug)),
+    )
+    if product is None:
+        raise Http404('Товар не найден')
+    context = {'product': product, 'images': images}
+    return await run_in_pool(render, request, 'main/product-detail.html', context)
+
+
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _cached_sitemap_response(entry):
+    response = HttpResponse(entry['content'], content_type='application/xml')
+    response.headers['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    if entry['last_modified']:
+        response.headers['Last-Modified'] = entry['last_modified']
+    return response
+
+
+def _render_sitemap(view, request, **kwargs):
+    response = view(request, **kwargs)
+    response.render()
+    return {
+        'content': response.content,
+        'last_modified': response.headers.get('Last-Modified'),
     }
 
-    return render(request, 'main/catalog.html', context)
-
 
-def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-    return render(request,'main/product-detail.html', {'product':product})
\ No newline at end of file
+def sitemap_index(request):
+    """Индекс карт сайта, пересобирается только при смене версии каталога"""
+    version = get_catalog_version()
+    key = f'sitemap:index:{request.scheme}:{request.get_host()}'
+    entry = cache.get(key)
+    if entry is None or entry['version'] != version:
+        entry = _render_sitemap(
+            sitemap_views.index, request,
+            sitemaps=sitemaps, sitemap_url_name='main:sitemap_section',
+        )
+        entry['version'] = version
+        cache.set(key, entry, SITEMAP_CACHE_TIMEOUT)
+    return _cached_sitemap_response(entry)
+
+
+def sitemap_section(request, section):
+    """
+    Страница карты сайта.
+
+    Готовый XML хранится в кэше. При смене версии каталога страница
+    сверяется по отпечатку своего среза и перерисовывается только
+    если изменились именно её объекты.
+    """
+    if section not in sitemaps:
+        raise Http404('Карта сайта не найдена')
+    try:
+        page = int(request.GET.get('p', 1))
+    except ValueError:
+        raise Http404('Неверный номер страницы')
+    if page < 1:
+        raise Http404('Неверный номер страницы')
+
+    version = get_catalog_version()
+    key = f'sitemap:{section}:{page}:{request.scheme}:{request.get_host()}'
+    entry = cache.get(key)
+    if entry is not None and entry['version'] == version:
+        return _cached_sitemap_response(entry)
+
+    sitemap = sitemaps[section]()
+    fingerprint = sitemap.chunk_fingerprint(page)
+    if fingerprint[0] == 0:
+        raise Http404('Пустая страница карты сайта')
+
+    if entry is None or entry['fingerprint'] != fingerprint:
+        entry = _render_sitemap(
+            sitemap_views.sitemap, request,
+            sitemaps={section: sitemap}, section=section,
+        )
+        entry['fingerprint'] = fingerprint
+    entry['version'] = version
+    cache.set(key, entry, SITEMAP_CACHE_TIMEOUT)
+    return _cached_sitemap_response(entry)
@@ -0,0 +1,112 @@
+"""
+Прогрев процесса перед первыми запросами.
+
+Первые запросы свежего воркера платят за импорты, компиляцию шаблонов,
+пустой кэш каталога и индексы в памяти — и все воркеры после деплоя
+одновременно идут за этим в БД. warm_up() делает эту работу заранее:
+в мастер-процессе gunicorn до fork (deploy/hooks.py), после чего воркеры
+получают всё готовым, или командой warm_up для общего кэша.
+"""
+import gc
+import importlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import QueryDict
+from django.template.loader import get_template
+
+from BulavaArms.routers import replica_alias
+from .autocomplete import autocomplete_index
+from .cache import get_category_choices, get_product_choices
+from .cards import render_product_cards
+from .facets import cached_facet_counts
+from .filters import ProductFilter
+from .models import Product
+from .product_cache import product_cache
+from .search import search_index
+from .snapshot import snapshot_enabled, snapshot_index
+
+
+# Тяжёлые модули, которые иначе импортируются на первом запросе
+WARMUP_MODULES = ('requests', 'PIL.Image', 'django_filters', 'numpy')
+# Товаров каталога по умолчанию (первые страницы) в кэш товаров и карточек
+WARMUP_PRODUCTS = 36
+
+
+def _import_modules():
+    for name in WARMUP_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _compile_templates():
+    # Шаблоны приложений проекта; скомпилированные остаются в кэширующем загрузчике
+    for directory in sorted((settings.BASE_DIR / 'apps').glob('*/templates')):
+        for path in sorted(directory.rglob('*.html')):
+            get_template(path.relative_to(directory).as_posix())
+
+
+def _connect():
+    aliases = {DEFAULT_DB_ALIAS, replica_alias()} - {None}
+    for alias in aliases:
+        connections[alias].ensure_connection()
+
+
+def _catalog_data():
+    get_category_choices()
+    get_product_choices('manufacturer')
+    get_product_choices('caliber')
+    product_filter = ProductFilter(QueryDict(), queryset=Product.objects.all())
+    product_filter.form.is_valid()
+    cached_facet_counts(product_filter)
+
+
+def _indexes():
+    autocomplete_index.get()
+    search_index.get()
+    if snapshot_enabled():
+        snapshot_index.get()
+
+
+def _products(count):
+    ids = Product.objects.order_by('-created_at').values_list('pk', flat=True)[:count]
+    render_product_cards(product_cache.get_many(ids).values())
+
+
+def warm_up(products=WARMUP_PRODUCTS):
+    """Прогреть процесс; возвращает {шаг: мс}"""
+    steps = [
+        ('imports', _import_modules),
+        ('templates', _compile_templates),
+        ('database', _connect),
+        ('catalog', _catalog_data),
+        ('indexes', _indexes),
+        ('products', lambda: _products(products)),
+    ]
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def prepare_fork():
+    """
+    Подготовить прогретый мастер-процесс к fork.
+
+    Соединения с БД (и пулы psycopg) и кэшем закрываются — воркеры откроют
+    свои. gc.freeze() убирает унаследованные объекты из сборки мусора: иначе
+    каждая полная сборка в воркере обходит индексы каталога и копирует
+    страницы памяти мастера (первые запросы тогда медленнее, чем без прогрева).
+    """
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+    caches.close_all()
+    gc.freeze()
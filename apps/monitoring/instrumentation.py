@@ -0,0 +1,141 @@
+"""
+Сбор статистики текущего запроса: SQL, шаблоны, кэш.
+
+Статистика хранится в contextvar, поэтому работает и в потоках, и в
+асинхронном коде. Хуки ставятся один раз при старте приложения:
+обёртка выполнения SQL на каждое новое соединение, обёртки рендера
+шаблона и чтения из кэша.
+"""
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+from . import slow_queries
+from .sql import is_select, query_shape
+
+
+current_stats = ContextVar('request_stats', default=None)
+
+_MISSING = object()
+
+
+class RequestStats:
+    """Счётчики одного запроса"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.shapes = Counter()
+        self.view = None
+        self._template_depth = 0
+        # Запросы одного HTTP-запроса могут идти из нескольких потоков (gather_queries)
+        self._lock = threading.Lock()
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def record_query(self, sql, duration):
+        shape = query_shape(sql) if is_select(sql) else None
+        with self._lock:
+            self.queries += 1
+            self.db_time += duration
+            if shape:
+                self.shapes[shape] += 1
+
+    def repeated_queries(self, threshold):
+        """Формы SELECT, повторившиеся не меньше `threshold` раз (вероятный N+1)"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = current_stats.get()
+    started = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if stats is not None:
+            stats.record_query(sql, duration)
+    if duration * 1000 >= getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200):
+        slow_queries.record(sql, params, many, duration, context['connection'], stats)
+    return result
+
+
+def _install_execute_wrapper(sender, connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        stats = current_stats.get()
+        if stats is None:
+            return render(self, *args, **kwargs)
+        # Вложенные рендеры (например, render_to_string внутри шаблона) не считаются дважды
+        stats._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats._template_depth -= 1
+            if not stats._template_depth:
+                stats.template_time += time.perf_counter() - started
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _MISSING, version)
+        stats = current_stats.get()
+        if stats is not None:
+            if value is _MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _MISSING else value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version=version)
+        stats = current_stats.get()
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+    wrapper.instrumented = True
+    return wrapper
+
+
+def install():
+    connection_created.connect(_install_execute_wrapper, dispatch_uid='monitoring_execute_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _install_execute_wrapper(None, connection)
+
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _timed_render(Template.render)
+
+    for alias in caches:
+        backend = type(caches[alias])
+        if not getattr(backend.get, 'instrumented', False):
+            backend.get = _counted_get(backend.get)
+        # Базовый get_many вызывает get — считать второй раз не нужно
+        if backend.get_many is not BaseCache.get_many and not getattr(backend.get_many, 'instrumented', False):
+            backend.get_many = _counted_get_many(backend.get_many)
@@ -0,0 +1,50 @@
+import statistics
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from apps.monitoring.startup import LAZY_MODULES, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Профиль запуска процесса: settings, django.setup() и загрузка URLconf '
+        '(медиана по нескольким новым интерпретаторам), самые дорогие импорты '
+        'верхнего уровня и пакеты по собственному времени импорта (python -X importtime), '
+        'а также какие тяжёлые модули загружены при запуске, хотя должны быть ленивыми.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        runs = [measure_startup() for _ in range(options['runs'])]
+        self.stdout.write('Запуск, мс (медиана):')
+        for phase in runs[0]['phases']:
+            value = statistics.median(run['phases'][phase] for run in runs)
+            self.stdout.write(f'  {phase:<12}{value:>8.1f}')
+        total = statistics.median(run['total'] for run in runs)
+        self.stdout.write(f'  {"всего":<12}{total:>8.1f}')
+
+        # Отдельный запуск с -X importtime: он сам замедляет импорт, поэтому не входит в медиану
+        profile = measure_startup(importtime=True)
+        imports = profile['imports']
+        top_level = sorted((row for row in imports if row[3] == 0), key=lambda row: -row[2])
+        self.stdout.write('\nИмпорты верхнего уровня (суммарно, мс):')
+        for name, _, cumulative, _ in top_level[:options['top']]:
+            self.stdout.write(f'  {name:<48}{cumulative:>8.1f}')
+
+        packages = defaultdict(float)
+        for name, own, _, _ in imports:
+            packages[name.split('.')[0]] += own
+        self.stdout.write('\nПакеты (собственное время импорта, мс):')
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {name:<48}{own:>8.1f}')
+
+        loaded = set(profile['modules'])
+        eager = [name for name in LAZY_MODULES if name in loaded]
+        if eager:
+            self.stdout.write(self.style.WARNING(f'\nЗагружены при запуске: {", ".join(eager)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\nНе загружены при запуске: {", ".join(LAZY_MODULES)}'))
@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов: формы запросов с наибольшим '
+        'суммарным временем, их view и последний план выполнения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.SLOW_QUERY_LOG_FILE,
+                            help='Журнал; ротированные копии (.1, .2, ...) читаются тоже')
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        path = Path(options['file'])
+        files = sorted(path.parent.glob(f'{path.name}.*'), reverse=True) + [path]
+        files = [file for file in files if file.is_file()]
+        if not files:
+            raise CommandError(f'Журнал {path} не найден')
+
+        shapes = {}
+        for file in files:
+            with file.open(encoding='utf-8') as lines:
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    shape = shapes.setdefault(entry['shape'], {
+                        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': set(), 'last': None,
+                    })
+                    # Пропущенные ограничителем повторы оцениваются по длительности записанного
+                    occurrences = 1 + entry.get('suppressed', 0)
+                    shape['count'] += occurrences
+                    shape['total_ms'] += entry['duration_ms'] * occurrences
+                    shape['max_ms'] = max(shape['max_ms'], entry['duration_ms'])
+                    if entry.get('view'):
+                        shape['views'].add(entry['view'])
+                    shape['last'] = entry
+
+        ranked = sorted(shapes.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        for position, (sql, shape) in enumerate(ranked[:options['top']], 1):
+            self.stdout.write(
+                f'#{position}  всего {shape["total_ms"]:.0f} мс, {shape["count"]} раз, '
+                f'макс. {shape["max_ms"]:.0f} мс, view: {", ".join(sorted(shape["views"])) or "-"}'
+            )
+            self.stdout.write(f'    {sql}')
+            for step in shape['last'].get('plan') or []:
+                self.stdout.write(f'    | {step}')
+            self.stdout.write('')
@@ -0,0 +1,247 @@
+"""
+Метрики в текстовом формате Prometheus.
+
+Значения копятся в памяти процесса (словарь под блокировкой). Если задан
+METRICS_DIR, фоновый поток каждого процесса раз в METRICS_FLUSH_INTERVAL
+секунд сбрасывает изменившиеся значения в файл `<pid>.json` этого каталога,
+а эндпоинт суммирует файлы всех процессов — так метрики воркеров gunicorn
+видны из любого из них. Последние значения записываются и при выходе
+процесса (atexit, хук worker_exit); затем мастер gunicorn переносит файл
+завершившегося воркера в общий archive.json (mark_process_dead), чтобы
+счётчики не уменьшались, а файлы не копились.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Сумма значений завершившихся процессов
+ARCHIVE_FILE = 'archive.json'
+
+
+def _merge(merged, values):
+    for key, value in values.items():
+        if key not in merged:
+            merged[key] = value
+        elif isinstance(value, list):
+            merged[key] = [a + b for a, b in zip(merged[key], value)]
+        else:
+            merged[key] += value
+    return merged
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, values):
+    """Атомарная запись через переименование"""
+    temporary = path.with_name(f'{os.getpid()}-{threading.get_ident()}.tmp')
+    temporary.write_text(json.dumps(values), encoding='utf-8')
+    os.replace(temporary, path)
+
+
+def mark_process_dead(directory, pid):
+    """Перенести значения завершившегося процесса в archive.json (вызывается из мастера gunicorn)"""
+    directory = Path(directory)
+    path = directory / f'{pid}.json'
+    if not path.exists():
+        return
+    archive = directory / ARCHIVE_FILE
+    _write(archive, _merge(_read(archive), _read(path)))
+    path.unlink(missing_ok=True)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pid = os.getpid()
+        self._dirty = False
+        # Процесс, в котором запущен поток сброса (после fork потоков нет)
+        self._flusher_pid = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _check_pid(self):
+        # Дочерний процесс после fork: значения родителя не его. Вызывается под блокировкой
+        if self._pid != os.getpid():
+            self._values.clear()
+            self._pid = os.getpid()
+
+    def _update(self, key, update):
+        with self._lock:
+            self._check_pid()
+            self._values[key] = update(self._values.get(key))
+            self._dirty = True
+            if self._flusher_pid != self._pid and getattr(settings, 'METRICS_DIR', None):
+                self._start_flusher()
+
+    def _start_flusher(self):
+        # Под блокировкой. atexit-обработчик переживает fork, поэтому регистрируется один раз
+        if self._flusher_pid is None:
+            atexit.register(self.flush_pending)
+        self._flusher_pid = self._pid
+        threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 5))
+            self.flush_pending()
+
+    def flush_pending(self):
+        """Сбросить значения в METRICS_DIR, если они изменились после прошлой записи"""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if directory and self._dirty:
+            self.flush(directory)
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+
+    def flush(self, directory):
+        """Записать значения процесса в `<pid>.json` (атомарно, через переименование)"""
+        # Сначала флаг, потом снимок: изменение после снимка снова поднимет флаг
+        self._dirty = False
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # snapshot() сбрасывает значения, унаследованные от родителя через fork
+        _write(directory / f'{os.getpid()}.json', self.snapshot())
+
+    def collect(self):
+        """Значения всех процессов (или только текущего без METRICS_DIR)"""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        merged = {}
+        for path in Path(directory).glob('*.json'):
+            _merge(merged, _read(path))
+        return merged
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4"""
+        samples = {}
+        for key, value in self.collect().items():
+            name, labels = json.loads(key)
+            samples.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for labels, value in sorted(samples.get(name, []), key=lambda sample: sample[0]):
+                lines.extend(metric.render(labels, value))
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return '+Inf' if value == math.inf else repr(float(value))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def _key(self, labels):
+        return json.dumps([self.name, [[name, str(labels[name])] for name in self.labelnames]])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry._update(self._key(labels), lambda value: (value or 0) + amount)
+
+    def render(self, labels, value):
+        return [f'{self.name}{_format_labels(labels)} {_format_value(value)}']
+
+
+class Histogram(Metric):
+    """Значение — счётчики корзин (не накопительные), сумма и количество"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, amount, **labels):
+        position = next(i for i, bound in enumerate(self.buckets) if amount <= bound)
+
+        def update(value):
+            value = value or [0] * (len(self.buckets) + 2)
+            value[position] += 1
+            value[-2] += amount
+            value[-1] += 1
+            return value
+
+        self.registry._update(self._key(labels), update)
+
+    def render(self, labels, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            bucket_labels = labels + [['le', _format_value(bound)]]
+            lines.append(f'{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {value[-1]}')
+        return lines
+
+
+REGISTRY = Registry()
+
+# Запросы
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса по view', ['view', 'method'],
+)
+REQUESTS = Counter('http_requests_total', 'Запросы по view и коду ответа', ['view', 'method', 'status'])
+CACHE_REQUESTS = Counter('cache_requests_total', 'Чтения из кэша во время запросов', ['result'])
+
+# Магазин
+CART_MUTATIONS = Counter('cart_mutations_total', 'Изменения корзины', ['action'])
+CHECKOUT_EVENTS = Counter(
+    'checkout_events_total', 'Воронка оформления: created, details_saved, paid', ['stage'],
+)
+LIQPAY_CALLBACKS = Counter('liqpay_callbacks_total', 'Callback LiqPay по результату обработки', ['outcome'])
+
+# Нова Пошта
+NOVA_POSHTA_LATENCY = Histogram(
+    'novaposhta_request_duration_seconds', 'Время запроса к API Нової Пошти', ['method'],
+)
+NOVA_POSHTA_ERRORS = Counter('novaposhta_errors_total', 'Ошибки API Нової Пошти', ['method', 'error'])
@@ -0,0 +1,93 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import RequestStats, current_stats
+from .metrics import CACHE_REQUESTS, REQUEST_LATENCY, REQUESTS
+
+
+logger = logging.getLogger('apps.monitoring.requests')
+
+
+class RequestStatsMiddleware:
+    """
+    Статистика запроса: число SQL-запросов, время БД, рендера шаблонов,
+    попадания в кэш.
+
+    Результат — заголовок Server-Timing (если SERVER_TIMING_HEADER), строка лога в JSON и метрики
+    http_request_duration_seconds, http_requests_total, cache_requests_total. Повторяющиеся
+    формы SELECT (от NPLUSONE_THRESHOLD раз) записываются в лог как вероятный N+1.
+    Ставится первым в MIDDLEWARE, чтобы учитывать запросы остальных middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.report(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.report(request, response, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.view = request.resolver_match.view_name
+
+    def report(self, request, response, stats):
+        total = stats.total_time
+        # Нераспознанные URL (404) — одной меткой, чтобы не плодить ряды
+        view = stats.view or 'unresolved'
+        REQUEST_LATENCY.observe(total, view=view, method=request.method)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        if stats.cache_hits:
+            CACHE_REQUESTS.inc(stats.cache_hits, result='hit')
+        if stats.cache_misses:
+            CACHE_REQUESTS.inc(stats.cache_misses, result='miss')
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+                f'tpl;dur={stats.template_time * 1000:.1f}',
+                f'cache;desc="{stats.cache_hits} hits, {stats.cache_misses} misses"',
+                f'total;dur={total * 1000:.1f}',
+            ])
+
+        repeated = stats.repeated_queries(getattr(settings, 'NPLUSONE_THRESHOLD', 5))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 1),
+            'template_ms': round(stats.template_time * 1000, 1),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+            'repeated_queries': len(repeated),
+        }, ensure_ascii=False))
+        for shape, count in repeated:
+            logger.warning('Возможен N+1 в %s: %d одинаковых запросов: %s', request.path, count, shape)
@@ -0,0 +1,128 @@
+"""
+Профилирование запросов через cProfile.
+
+Два режима:
+- по запросу: сотрудник добавляет `?profile=1` или заголовок `X-Profile: 1`,
+  профиль сохраняется в PROFILE_DIR, ссылка на него — в заголовке X-Profile;
+  `?profile=text` возвращает вместо страницы текстовую сводку;
+- выборочный: PROFILE_SAMPLING = {'main:catalog': 100} профилирует в среднем
+  1 из 100 запросов view и копит сумму профилей в памяти процесса,
+  сбрасывая её в файл `sampled-<view>-<pid>.prof`.
+
+Файлы — формат pstats (открываются snakeviz, flameprof, gprof2dot).
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import reverse
+
+
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+# Значения ?profile= / X-Profile: файл .prof или текстовая сводка
+PROFILE_MODES = ('1', 'text')
+
+_sampled = {}
+_sampled_lock = threading.Lock()
+
+
+def profile_dir():
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _file_label(view_name):
+    return (view_name or 'unresolved').replace(':', '.')
+
+
+def _run(view_func, request, view_args, view_kwargs):
+    profiler = cProfile.Profile()
+    response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+    # Шаблонные ответы рендерятся позже — рендер тоже попадает в профиль
+    if hasattr(response, 'render') and callable(response.render):
+        response = profiler.runcall(response.render)
+    return response, profiler
+
+
+def save_sampled(view_name, profiler):
+    """Добавить профиль к сумме view в этом процессе и сохранить сумму"""
+    with _sampled_lock:
+        stats = _sampled.get(view_name)
+        if stats is None:
+            stats = _sampled[view_name] = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+        stats.dump_stats(profile_dir() / f'sampled-{_file_label(view_name)}-{os.getpid()}.prof')
+
+
+def merged_sampled(label):
+    """Сумма выборочных профилей view по всем процессам"""
+    paths = sorted(profile_dir().glob(f'sampled-{label}-*.prof'))
+    if not paths:
+        return None
+    stats = pstats.Stats(str(paths[0]))
+    for path in paths[1:]:
+        stats.add(str(path))
+    return stats
+
+
+class ProfilerMiddleware:
+    """
+    Ставится последним в MIDDLEWARE: view вызывается из process_view,
+    поэтому проверки предыдущих middleware (CSRF и т. п.) уже выполнены.
+    Async view не профилируются: cProfile не следит за корутинами.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def requested(self, request):
+        mode = request.GET.get('profile') or request.headers.get('X-Profile')
+        if mode in PROFILE_MODES and getattr(request, 'user', None) is not None and request.user.is_staff:
+            return mode
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func):
+            return None
+        view_name = request.resolver_match.view_name
+        mode = self.requested(request)
+        if mode:
+            response, profiler = _run(view_func, request, view_args, view_kwargs)
+            if mode == 'text':
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(50)
+                return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+            name = f'{time.strftime("%Y%m%d-%H%M%S")}-{_file_label(view_name)}-{random.randrange(16 ** 6):06x}.prof'
+            profiler.dump_stats(profile_dir() / name)
+            response['X-Profile'] = reverse('monitoring:profile_download', args=[name])
+            return response
+
+        rate = getattr(settings, 'PROFILE_SAMPLING', {}).get(view_name)
+        if rate and random.randrange(rate) == 0:
+            response, profiler = _run(view_func, request, view_args, view_kwargs)
+            save_sampled(view_name, profiler)
+            return response
+        return None
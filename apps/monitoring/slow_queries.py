@@ -0,0 +1,105 @@
+"""
+Журнал медленных SQL-запросов.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_MS пишутся строкой JSON в логгер
+apps.monitoring.slow_queries (в настройках — ротируемый файл): SQL,
+отпечаток параметров, view и план выполнения. Одна и та же форма запроса
+записывается не чаще раза в SLOW_QUERY_RATE_LIMIT секунд, пропущенные
+повторы учитываются в следующей записи.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .sql import is_select, query_shape
+
+
+logger = logging.getLogger('apps.monitoring.slow_queries')
+
+# Запрос плана сам проходит через обёртку выполнения — не записывать его
+_explaining = ContextVar('explaining_slow_query', default=False)
+
+
+class RateLimiter:
+    """Не чаще одного раза в `interval` секунд на ключ; считает пропущенные"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}
+        self._suppressed = {}
+
+    def acquire(self, key, interval):
+        """Возвращает число пропущенных с прошлого раза или None, если сейчас нельзя"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last[key] = now
+            return self._suppressed.pop(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._last.clear()
+            self._suppressed.clear()
+
+
+rate_limiter = RateLimiter()
+
+
+def params_fingerprint(params):
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+
+
+def explain(connection, sql, params):
+    """План выполнения SELECT или None, если получить его нельзя"""
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN '
+    else:
+        return None
+
+    token = _explaining.set(True)
+    try:
+        # Внутри транзакции — точка сохранения: ошибка EXPLAIN не должна её ломать.
+        # Вне транзакции atomic() в SQLite открыл бы BEGIN IMMEDIATE и взял блокировку записи
+        savepoint = transaction.atomic(using=connection.alias) if connection.in_atomic_block else nullcontext()
+        with savepoint, connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    finally:
+        _explaining.reset(token)
+    # SQLite: (id, parent, notused, detail), PostgreSQL: (строка плана,)
+    return [row[-1] for row in rows]
+
+
+def record(sql, params, many, duration, connection, stats):
+    if _explaining.get():
+        return
+    shape = query_shape(sql)
+    suppressed = rate_limiter.acquire(shape, getattr(settings, 'SLOW_QUERY_RATE_LIMIT', 60))
+    if suppressed is None:
+        return
+
+    logger.warning(json.dumps({
+        'time': round(time.time(), 3),
+        'duration_ms': round(duration * 1000, 1),
+        'view': getattr(stats, 'view', None),
+        'database': connection.alias,
+        'shape': shape,
+        'sql': sql,
+        'params': params_fingerprint(params),
+        'suppressed': suppressed,
+        'plan': explain(connection, sql, params) if is_select(sql) and not many else None,
+    }, ensure_ascii=False, default=str))
@@ -0,0 +1,18 @@
+import re
+
+
+# Литералы в SQL заменяются на «?», списки IN (...) схлопываются
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?|%s)(?:, (?:\?|%s))*\)', re.IGNORECASE)
+
+
+def query_shape(sql):
+    """Форма запроса без параметров: одинаковая для запросов, отличающихся только значениями"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def is_select(sql):
+    return sql.lstrip()[:6].upper() == 'SELECT'
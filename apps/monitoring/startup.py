@@ -0,0 +1,73 @@
+"""
+Время запуска процесса: импорт settings, django.setup() и загрузка URLconf.
+
+Замер всегда идёт в новом интерпретаторе — в текущем всё уже
+импортировано. С importtime=True добавляется разбор `python -X importtime`.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+
+# Тяжёлые модули, которые не должны импортироваться при запуске (только при первом использовании)
+LAZY_MODULES = ('requests', 'numpy', 'PIL')
+
+STARTUP_SCRIPT = '''
+import json, sys, time
+preloaded = sorted(sys.modules)
+started = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+configured = time.perf_counter()
+django.setup()
+ready = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+loaded = time.perf_counter()
+print(json.dumps({
+    'phases': {
+        'settings': (configured - started) * 1000,
+        'setup': (ready - configured) * 1000,
+        'urls': (loaded - ready) * 1000,
+    },
+    'total': (loaded - started) * 1000,
+    'modules': sorted(sys.modules),
+    'preloaded': preloaded,
+}))
+'''
+
+
+def parse_importtime(text):
+    """Строки `python -X importtime` → [(модуль, собственное мс, суммарное мс, вложенность)]"""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return rows
+
+
+def measure_startup(importtime=False):
+    """
+    Замер запуска в отдельном процессе: фазы (мс), загруженные модули и, по желанию, импорты.
+
+    preloaded — модули, загруженные интерпретатором до начала замера (site, .pth).
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', STARTUP_SCRIPT]
+    environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'BulavaArms.settings')}
+    process = subprocess.run(
+        command, cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    if importtime:
+        result['imports'] = parse_importtime(process.stderr)
+    return result
@@ -0,0 +1,16 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета SQL-запросов в тестах с выводом всех запросов при превышении"""
+
+    def assertQueryBudget(self, budget, label, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            result = func(*args, **kwargs)
+        if len(context) > budget:
+            queries = '\n'.join(
+                f'  {number}. {query["sql"]}' for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(f'{label}: {len(context)} запросов при бюджете {budget}:\n{queries}')
+        return result
@@ -0,0 +1,498 @@
+import base64
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import requests
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from apps.main.benchmark_data import seed_catalog, seed_images, seed_orders
+from apps.main.models import Category, Product, ProductImage
+from apps.main.testing import create_product
+from apps.payments.liqpay_utils import LiqPayAPI
+from apps.payments.models import Order
+from BulavaArms.lazy import LazyModule, lazy_import
+
+from .sql import query_shape
+from .metrics import REGISTRY, Counter, Histogram, Registry, mark_process_dead
+from .middleware import RequestStatsMiddleware
+from .profiling import _sampled
+from .slow_queries import explain, rate_limiter
+from .startup import LAZY_MODULES, measure_startup, parse_importtime
+from .testing import QueryBudgetMixin
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class RequestStatsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        self.product = create_product(self.category, 'Glock 17')
+
+    def request_log(self, url):
+        with self.assertLogs('apps.monitoring.requests', 'INFO') as logs:
+            response = self.client.get(url)
+        return response, logs
+
+    def test_server_timing_header(self):
+        response, logs = self.request_log(reverse('main:catalog'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'cache;desc="\d+ hits, \d+ misses"')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_server_timing_header_disabled(self):
+        response, logs = self.request_log(reverse('main:catalog'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_structured_log_line(self):
+        response, logs = self.request_log(reverse('main:catalog'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'main:catalog')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_hits'] + record['cache_misses'], 0)
+
+        # Второй запрос берёт варианты фильтров из кэша
+        response, logs = self.request_log(reverse('main:catalog'))
+        self.assertGreater(json.loads(logs.records[0].getMessage())['cache_hits'], 0)
+
+    def test_repeated_queries_flagged(self):
+        for i in range(5):
+            ProductImage.objects.create(product=self.product, image='products/test.jpg')
+            create_product(self.category, f'Glock {18 + i}')
+
+        def view(request):
+            # Категория каждого товара — отдельным запросом
+            names = [product.category.name for product in Product.objects.all()]
+            return HttpResponse(', '.join(names))
+
+        middleware = RequestStatsMiddleware(view)
+        with self.assertLogs('apps.monitoring.requests', 'WARNING') as logs:
+            middleware(RequestFactory().get('/n-plus-one'))
+        self.assertIn('6 одинаковых запросов', logs.output[0])
+        self.assertIn('"main_category"', logs.output[0])
+
+    def test_async_view(self):
+        async def view(request):
+            names = await sync_to_async(lambda: [product.name for product in Product.objects.all()])()
+            return HttpResponse(', '.join(names))
+
+        middleware = RequestStatsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('apps.monitoring.requests', 'INFO'):
+            response = async_to_sync(middleware)(RequestFactory().get('/async'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_no_warning_without_repeats(self):
+        with self.assertLogs('apps.monitoring.requests', 'INFO') as logs:
+            self.client.get(reverse('main:detail_page', args=[self.product.slug]))
+        self.assertEqual([record.levelname for record in logs.records], ['INFO'])
+
+
+class QueryShapeTests(TestCase):
+    def test_literals_and_in_lists(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id = 42 AND name = 'x''y' AND pk IN (1, 2, 3)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND pk IN (...)',
+        )
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_RATE_LIMIT=60)
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limiter.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        create_product(self.category, 'Glock 17', manufacturer='Glock')
+
+    def slow_entries(self, url, params=None):
+        with self.assertLogs('apps.monitoring.slow_queries', 'WARNING') as logs:
+            self.client.get(url, params)
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_entry_has_view_params_and_plan(self):
+        entries = self.slow_entries(reverse('main:catalog'), {'manufacturer': 'Glock'})
+        entry = next(entry for entry in entries if 'FROM "main_product"' in entry['sql'] and entry['plan'])
+        self.assertEqual(entry['view'], 'main:catalog')
+        self.assertEqual(len(entry['params']), 12)
+        self.assertTrue(any('main_product' in step for step in entry['plan']))
+
+    def test_explain_without_transaction_takes_no_lock(self):
+        sql = 'SELECT "name" FROM "main_product"'
+        with mock.patch('apps.monitoring.slow_queries.transaction.atomic') as atomic:
+            with mock.patch.object(connection, 'in_atomic_block', False):
+                self.assertTrue(explain(connection, sql, ()))
+            atomic.assert_not_called()
+            self.assertTrue(explain(connection, sql, ()))
+            atomic.assert_called_once_with(using='default')
+
+    def test_rate_limited_per_shape(self):
+        first = self.slow_entries(reverse('main:catalog'))
+        second = self.slow_entries(reverse('main:detail_page', args=['glock-17']))
+        shapes = [entry['shape'] for entry in first + second]
+        self.assertEqual(len(shapes), len(set(shapes)))
+
+        rate_limiter.clear()
+        rate_limiter.acquire('shape', 60)
+        rate_limiter.acquire('shape', 60)
+        rate_limiter.acquire('shape', 60)
+        self.assertEqual(rate_limiter.acquire('shape', 0), 2)
+
+    def test_report_ranks_shapes_by_total_time(self):
+        lines = [
+            {'shape': 'SELECT a', 'duration_ms': 300, 'view': 'main:catalog', 'suppressed': 4, 'plan': ['SCAN a']},
+            {'shape': 'SELECT b', 'duration_ms': 900, 'view': 'cart:cart_view', 'suppressed': 0, 'plan': None},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'slow.log'
+            path.write_text('\n'.join(json.dumps(line) for line in lines) + '\nnot json\n', encoding='utf-8')
+            output = StringIO()
+            call_command('slow_query_report', file=path, stdout=output)
+        report = output.getvalue()
+        self.assertLess(report.index('SELECT a'), report.index('SELECT b'))
+        self.assertIn('всего 1500 мс, 5 раз', report)
+        self.assertIn('| SCAN a', report)
+
+
+class MetricsRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.counter = Counter('events_total', 'События', ['kind'], registry=self.registry)
+        self.histogram = Histogram('latency_seconds', 'Время', ['view'], buckets=(0.1, 1), registry=self.registry)
+
+    def test_text_exposition(self):
+        self.counter.inc(kind='a')
+        self.counter.inc(2, kind='a')
+        self.histogram.observe(0.05, view='x')
+        self.histogram.observe(0.5, view='x')
+        self.histogram.observe(5, view='x')
+        text = self.registry.render()
+        self.assertIn('# TYPE events_total counter\nevents_total{kind="a"} 3.0\n', text)
+        self.assertIn('latency_seconds_bucket{view="x",le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{view="x",le="1.0"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{view="x",le="+Inf"} 3\n', text)
+        self.assertIn('latency_seconds_sum{view="x"} 5.55\n', text)
+        self.assertIn('latency_seconds_count{view="x"} 3\n', text)
+
+    def test_processes_are_merged_through_directory(self):
+        other = Registry()
+        Counter('events_total', 'События', ['kind'], registry=other).inc(4, kind='a')
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            self.counter.inc(kind='a')
+            # Файл другого воркера в том же каталоге
+            Path(directory, '99999999.json').write_text(json.dumps(other.snapshot()))
+            text = self.registry.render()
+        self.assertIn('events_total{kind="a"} 5.0', text)
+
+    def test_dead_process_values_are_archived(self):
+        other = Registry()
+        Counter('events_total', 'События', ['kind'], registry=other).inc(4, kind='a')
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            self.counter.inc(kind='a')
+            for pid in ('99999998', '99999999'):
+                Path(directory, f'{pid}.json').write_text(json.dumps(other.snapshot()))
+                mark_process_dead(directory, pid)
+            self.assertEqual(
+                sorted(path.name for path in Path(directory).glob('*.json')), ['archive.json'],
+            )
+            text = self.registry.render()
+        self.assertIn('events_total{kind="a"} 9.0', text)
+
+    def test_idle_process_values_are_flushed_in_background(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=0.01):
+            self.counter.inc(kind='a')
+            path = Path(directory, f'{os.getpid()}.json')
+            for _ in range(500):
+                if path.exists():
+                    break
+                time.sleep(0.01)
+            self.assertEqual(list(json.loads(path.read_text()).values()), [1])
+
+    def test_pending_values_are_flushed_once(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            self.counter.inc(kind='a')
+            self.registry.flush_pending()
+            path = Path(directory, f'{os.getpid()}.json')
+            self.assertEqual(list(json.loads(path.read_text()).values()), [1])
+            path.unlink()
+            self.registry.flush_pending()
+            self.assertFalse(path.exists())
+
+    def test_flush_after_fork_drops_parent_values(self):
+        self.counter.inc(kind='a')
+        self.registry._pid = -1
+        with tempfile.TemporaryDirectory() as directory:
+            self.registry.flush(directory)
+            self.assertEqual(json.loads(Path(directory, f'{os.getpid()}.json').read_text()), {})
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        REGISTRY.clear()
+        self.category = Category.objects.create(name='Pistols', slug='pistols')
+        self.product = create_product(self.category, 'Glock 17')
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_request_and_cart_metrics(self):
+        self.client.get(reverse('main:catalog'))
+        self.client.post(reverse('cart:cart_add', args=[self.product.id]))
+        text = self.metrics()
+        self.assertIn('http_requests_total{view="main:catalog",method="GET",status="200"} 1.0', text)
+        self.assertIn('http_request_duration_seconds_count{view="main:catalog",method="GET"} 1', text)
+        self.assertIn('cart_mutations_total{action="add"} 1.0', text)
+        self.assertIn('cache_requests_total{result="miss"}', text)
+
+    def test_liqpay_callback_outcomes(self):
+        self.client.post(reverse('payments:liqpay_callback'), {})
+        self.client.post(reverse('payments:liqpay_callback'), {'data': 'e30=', 'signature': 'wrong'})
+        text = self.metrics()
+        self.assertIn('liqpay_callbacks_total{outcome="bad_request"} 1.0', text)
+        self.assertIn('liqpay_callbacks_total{outcome="invalid_signature"} 1.0', text)
+
+    def test_repeated_success_callback_counts_one_payment(self):
+        Order.objects.create(order_id='ORDER-PAID', subtotal=100, total=100)
+        for _ in range(2):
+            response = self.client.post(reverse('payments:liqpay_callback'), liqpay_post('ORDER-PAID'))
+            self.assertEqual(response.status_code, 200)
+        text = self.metrics()
+        self.assertIn('liqpay_callbacks_total{outcome="success"} 2.0', text)
+        self.assertIn('checkout_events_total{stage="paid"} 1.0', text)
+
+    def test_nova_poshta_errors(self):
+        with mock.patch('apps.payments.views.requests.post', side_effect=requests.exceptions.Timeout):
+            response = self.client.post(
+                reverse('payments:get_nova_poshta_cities'), {'city_name': 'Київ'}, content_type='application/json'
+            )
+        self.assertFalse(response.json()['success'])
+        text = self.metrics()
+        self.assertIn('novaposhta_errors_total{method="searchSettlements",error="Timeout"} 1.0', text)
+        self.assertIn('novaposhta_request_duration_seconds_count{method="searchSettlements"} 1', text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _sampled.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        profile_settings = self.settings(PROFILE_DIR=self.directory)
+        profile_settings.enable()
+        self.addCleanup(profile_settings.disable)
+        self.staff = get_user_model().objects.create_user(
+            username='staff', email='staff@example.com', password='pass', is_staff=True
+        )
+
+    def test_ignored_for_anonymous(self):
+        response = self.client.get(reverse('main:catalog'), {'profile': '1'})
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_staff_profile_is_downloadable(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('main:catalog'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        download = self.client.get(response['X-Profile'])
+        self.assertEqual(download.status_code, 200)
+        self.assertGreater(len(b''.join(download.streaming_content)), 0)
+        self.assertIn('main.catalog', self.client.get(reverse('monitoring:profile_list')).content.decode())
+
+    def test_only_known_modes_start_profiling(self):
+        self.client.force_login(self.staff)
+        for mode in ('0', 'false', 'yes'):
+            response = self.client.get(reverse('main:catalog'), {'profile': mode})
+            self.assertNotIn('X-Profile', response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_text_summary(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('main:catalog'), {'profile': 'text'})
+        self.assertIn('function calls', response.content.decode())
+
+    def test_sampled_profiles_are_aggregated(self):
+        with self.settings(PROFILE_SAMPLING={'main:catalog': 1}):
+            self.client.get(reverse('main:catalog'))
+            self.client.get(reverse('main:catalog'))
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('monitoring:sampled_profile', args=['main:catalog']), {'format': 'text'}
+        )
+        self.assertIn('views.py', response.content.decode())
+        # Каждый из двух запросов вызвал view один раз
+        self.assertRegex(response.content.decode(), r'\n\s+2 .*views\.py:\d+\(catalog\)')
+
+    def test_downloads_require_staff(self):
+        response = self.client.get(reverse('monitoring:profile_list'))
+        self.assertEqual(response.status_code, 302)
+
+
+def url_names(patterns=None, namespace=None):
+    """Имена всех URL проекта с пространствами имён"""
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == 'admin':
+                continue
+            yield from url_names(pattern.url_patterns, pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def liqpay_post(order_id):
+    data = base64.b64encode(json.dumps({'order_id': order_id, 'status': 'success'}).encode()).decode()
+    return {'data': data, 'signature': LiqPayAPI()._generate_signature(data)}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Бюджет SQL-запросов для каждого URL проекта на заполненной базе.
+
+    Новый URL без записи в BUDGETS роняет test_every_url_has_budget.
+    """
+
+    # Имя URL: (бюджет, метод, аргументы reverse, параметры/данные, нужен вход, корзина).
+    # SAVEPOINT/RELEASE транзакций записи тоже считаются (вне тестов это BEGIN/COMMIT)
+    BUDGETS = {
+        'main:main_page': (0, 'get', [], {}, False, False),
+        'main:catalog': (2, 'get', [], {}, False, False),
+        'main:suggest': (0, 'get', [], {'q': 'bench'}, False, False),
+        'main:sitemap_index': (0, 'get', [], {}, False, False),
+        'main:sitemap_section': (0, 'get', ['products'], {}, False, False),
+        'main:detail_page': (1, 'get', ['bench-product-1'], {}, False, False),
+        'cart:cart_detail': (1, 'get', [], {}, False, True),
+        'cart:cart_add': (4, 'post', [1], {}, False, True),
+        'cart:cart_remove': (4, 'post', [1], {}, False, True),
+        'cart:cart_update': (4, 'post', [1], {'quantity': 2}, False, True),
+        'cart:cart_clear': (4, 'get', [], {}, False, True),
+        'cart:cart_state': (1, 'get', [], {}, False, True),
+        'users:register': (0, 'get', [], {}, False, False),
+        'users:login': (0, 'get', [], {}, False, False),
+        'users:logout': (4, 'get', [], {}, True, False),
+        'users:profile': (4, 'get', [], {}, True, False),
+        'users:profile_edit': (2, 'get', [], {}, True, False),
+        'payments:checkout': (9, 'get', [], {}, True, True),
+        'payments:liqpay_callback': (4, 'post', [], 'liqpay', False, False),
+        'payments:liqpay_success': (0, 'get', [], {}, False, False),
+        'payments:liqpay_cancel': (0, 'get', [], {}, False, False),
+        'payments:get_nova_poshta_cities': (0, 'post', [], {'city_name': 'К'}, False, False),
+        'payments:get_nova_poshta_warehouses': (0, 'post', [], {}, False, False),
+        'metrics': (0, 'get', [], {}, False, False),
+        'monitoring:profile_list': (2, 'get', [], {}, True, False),
+        'monitoring:profile_download': (2, 'get', ['missing.prof'], {}, True, False),
+        'monitoring:sampled_profile': (2, 'get', ['main:catalog'], {}, True, False),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(200, categories_count=5, manufacturers_count=20)
+        products = list(Product.objects.values_list('id', 'name', 'price'))
+        seed_images([pk for pk, name, price in products], 2)
+        cls.user = get_user_model().objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass', is_staff=True
+        )
+        seed_orders(30, [cls.user], products)
+        cls.product_ids = [pk for pk, name, price in products[:3]]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_report_lists_queries(self):
+        with self.assertRaisesMessage(self.failureException, '1 запросов при бюджете 0:\n  1. SELECT'):
+            self.assertQueryBudget(0, 'products', lambda: list(Product.objects.all()[:1]))
+
+    def test_every_url_has_budget(self):
+        self.assertEqual(sorted(set(url_names()) - set(self.BUDGETS)), [])
+
+    def test_budgets(self):
+        for name, (budget, method, args, data, login, with_cart) in self.BUDGETS.items():
+            with self.subTest(name):
+                if data == 'liqpay':
+                    data = liqpay_post(Order.objects.values_list('order_id', flat=True).first())
+                args = [self.product_ids[0]] if args == [1] else args
+                url = reverse(name, args=args)
+                request = getattr(self.client, method)
+
+                # Первый запрос прогревает кэши каталога, бюджет — для повторного
+                # с тем же состоянием сессии (вход, корзина)
+                for attempt in range(2):
+                    self.client.logout()
+                    if with_cart:
+                        for pk in self.product_ids:
+                            self.client.post(reverse('cart:cart_add', args=[pk]))
+                    if login:
+                        self.client.force_login(self.user)
+                    if attempt == 0:
+                        cache.clear()
+                        request(url, data)
+                self.assertQueryBudget(budget, name, request, url, data)
+
+
+class StartupTests(TestCase):
+    # Сторонние пакеты, без которых запуск невозможен; новый пакет в этом списке —
+    # повод сделать его импорт ленивым
+    STARTUP_PACKAGES = {'asgiref', 'django', 'django_filters', 'sqlparse'}
+
+    def test_heavy_modules_are_lazy(self):
+        result = measure_startup()
+        loaded = set(result['modules'])
+        self.assertEqual([name for name in LAZY_MODULES if name in loaded], [])
+        self.assertEqual(set(result['phases']), {'settings', 'setup', 'urls'})
+
+    def test_startup_imports_only_required_packages(self):
+        result = measure_startup()
+        packages = {name.partition('.')[0] for name in set(result['modules']) - set(result['preloaded'])}
+        third_party = {
+            name for name in packages - set(sys.stdlib_module_names)
+            if not name.startswith('_') and name not in ('apps', 'BulavaArms')
+        }
+        self.assertLessEqual(third_party, self.STARTUP_PACKAGES)
+
+    def test_lazy_module_imports_on_first_access(self):
+        with mock.patch('BulavaArms.lazy.importlib.import_module', wraps=importlib.import_module) as import_module:
+            module = LazyModule('json')
+            import_module.assert_not_called()
+            self.assertEqual(module.dumps([1]), '[1]')
+            self.assertEqual(module.loads('[1]'), [1])
+        import_module.assert_called_once_with('json')
+        self.assertIs(module._module, json)
+        self.assertIsNone(lazy_import('no_such_module_here'))
+
+    def test_parse_importtime(self):
+        text = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   apps.main.cards\n'
+            'import time:      1500 |       2000 | apps.main.views\n'
+        )
+        self.assertEqual(parse_importtime(text), [
+            ('apps.main.cards', 0.12, 0.12, 1),
+            ('apps.main.views', 1.5, 2.0, 0),
+        ])
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'monitoring'
+
+urlpatterns = [
+    path('profiles/', views.profile_list, name='profile_list'),
+    path('profiles/sampled/<str:view_name>', views.sampled_profile, name='sampled_profile'),
+    path('profiles/<str:name>', views.profile_download, name='profile_download'),
+]
@@ -0,0 +1,53 @@
+import hmac
+import io
+import marshal
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+
+from .metrics import REGISTRY
+from .profiling import PROFILE_NAME, merged_sampled, profile_dir
+
+
+def metrics(request):
+    """Метрики для Prometheus; при заданном METRICS_TOKEN нужен заголовок Authorization: Bearer"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def profile_list(request):
+    """Список сохранённых профилей, новые сверху"""
+    paths = sorted(profile_dir().glob('*.prof'), key=lambda path: path.stat().st_mtime, reverse=True)
+    return HttpResponse('\n'.join(path.name for path in paths), content_type='text/plain; charset=utf-8')
+
+
+@staff_member_required
+def profile_download(request, name):
+    if not PROFILE_NAME.match(name):
+        raise Http404
+    path = profile_dir() / name
+    if not path.is_file():
+        raise Http404
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)
+
+
+@staff_member_required
+def sampled_profile(request, view_name):
+    """Сумма выборочных профилей view по всем процессам: файл pstats или ?format=text"""
+    label = view_name.replace(':', '.')
+    stats = merged_sampled(label) if PROFILE_NAME.match(f'{label}.prof') else None
+    if stats is None:
+        raise Http404
+    if request.GET.get('format') == 'text':
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats('cumulative').print_stats(50)
+        return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+    # Тот же формат, что пишет Stats.dump_stats
+    response = HttpResponse(marshal.dumps(stats.stats), content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="sampled-{label}.prof"'
+    return response
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from apps.main.admin_mixins import LargeTableAdminMixin
 from .models import Order, OrderItem
 
 
@@ -7,12 +8,16 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('product', 'product_name', 'quantity', 'unit_price')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('order_id', 'email', 'status', 'total', 'created_at', 'city', 'address')
     list_filter = ('status', 'created_at')
-    search_fields = ('order_id', 'email', 'phone', 'liqpay_payment_id', 'liqpay_order_id')
+    # Поля-идентификаторы: префиксный поиск (istartswith) по индексам без учёта регистра (payments.0006)
+    search_fields = ('^order_id', '^email', '^phone', '^liqpay_payment_id', '^liqpay_order_id')
     readonly_fields = ('order_id', 'liqpay_payment_id', 'liqpay_order_id', 'created_at', 'updated_at')
     ordering = ('-created_at',)
 
@@ -39,4 +44,5 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'product_name', 'quantity', 'unit_price')
-    list_filter = ('order',)
\ No newline at end of file
+    list_filter = ('order',)
+    list_select_related = ('order',)
\ No newline at end of file
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+# Префиксный поиск админки (^поле) — istartswith:
+#   SQLite:     "поле" LIKE 'x%' ESCAPE '\'  — LIKE без учёта регистра использует только индекс с COLLATE NOCASE;
+#   PostgreSQL: UPPER("поле"::text) LIKE UPPER('x%')  — нужен индекс по тому же выражению с text_pattern_ops.
+# Обычные индексы из 0005 ни одну из форм не обслуживают и удаляются.
+SEARCH_FIELDS = {
+    'order_id': 'payments_order_order_id_ci',
+    'email': 'payments_order_email_ci',
+    'phone': 'payments_order_phone_ci',
+    'liqpay_payment_id': 'payments_order_lp_pay_ci',
+    'liqpay_order_id': 'payments_order_lp_order_ci',
+}
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for field, name in SEARCH_FIELDS.items():
+        if vendor == 'sqlite':
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON payments_order ({field} COLLATE NOCASE)')
+        elif vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON payments_order (UPPER({field}::text) text_pattern_ops)'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for name in SEARCH_FIELDS.values():
+        schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY не работает внутри транзакции, зато не блокирует запись в таблицу
+    atomic = False
+
+    dependencies = [
+        ('payments', '0005_order_payments_order_email_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(model_name='order', name='payments_order_email_idx'),
+        migrations.RemoveIndex(model_name='order', name='payments_order_phone_idx'),
+        migrations.RemoveIndex(model_name='order', name='payments_order_lp_pay_idx'),
+        migrations.RemoveIndex(model_name='order', name='payments_order_lp_order_idx'),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
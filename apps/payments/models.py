@@ -49,6 +49,10 @@ class Order(models.Model):
         verbose_name = 'Замовлення'
         verbose_name_plural = 'Замовлення'
         ordering = ['-created_at']
+        # Индексы для поиска в админке — в миграции 0006: они зависят от СУБД
+        indexes = [
+            models.Index(fields=['-created_at'], name='payments_order_created_idx'),
+        ]
 
     def __str__(self):
         return f'Замовлення #{self.order_id} — {self.get_status_display()} — {self.total} ₴'
@@ -0,0 +1,278 @@
+// Адреси й сума замовлення — з data-атрибутів тегу <script> у checkout.html
+const checkoutConfig = document.currentScript.dataset;
+
+// ─── Nova Poshta logic ────────────────────────────────────────────────
+
+let cityDebounceTimer = null;
+let allWarehouses = [];   // кэш всех отделений для выбранного города
+
+// --- City search ---
+document.getElementById('city_search').addEventListener('input', function () {
+    clearTimeout(cityDebounceTimer);
+    const val = this.value.trim();
+
+    // Сброс при изменении
+    document.getElementById('city_ref').value = '';
+    document.getElementById('city').value = '';
+    hideDrop('city_dropdown');
+    hideWarehouseBlock();
+
+    if (val.length < 2) return;
+
+    cityDebounceTimer = setTimeout(() => searchCities(val), 350);
+});
+
+function searchCities(query) {
+    fetch(checkoutConfig.citiesUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCsrf(),
+        },
+        body: JSON.stringify({ city_name: query })
+    })
+    .then(r => r.json())
+    .then(data => {
+        if (data.success && data.cities.length > 0) {
+            renderCityDropdown(data.cities);
+        } else {
+            renderEmpty('city_dropdown', 'Міста не знайдено');
+        }
+    })
+    .catch(() => renderEmpty('city_dropdown', 'Помилка запиту'));
+}
+
+function renderCityDropdown(cities) {
+    const drop = document.getElementById('city_dropdown');
+    drop.innerHTML = '';
+    cities.forEach(city => {
+        const item = document.createElement('div');
+        item.className = 'np-dropdown-item';
+        item.innerHTML = `
+            <div class="np-dropdown-item__main">${city.present || city.main_description}</div>
+            <div class="np-dropdown-item__sub">${city.area || ''} ${city.region ? '• ' + city.region : ''}</div>
+        `;
+        item.addEventListener('click', () => selectCity(city));
+        drop.appendChild(item);
+    });
+    showDrop('city_dropdown');
+}
+
+function selectCity(city) {
+    document.getElementById('city_search').value = city.present || city.main_description;
+    document.getElementById('city_ref').value = city.ref;
+    document.getElementById('city').value = city.present || city.main_description;
+    hideDrop('city_dropdown');
+    loadWarehouses(city.ref);
+}
+
+// --- Warehouse logic ---
+function loadWarehouses(cityRef) {
+    showWarehouseBlock();
+    document.getElementById('warehouse_loading').style.display = 'block';
+    document.getElementById('warehouse_search').value = '';
+    document.getElementById('address').value = '';
+    allWarehouses = [];
+
+    fetch(checkoutConfig.warehousesUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCsrf(),
+        },
+        body: JSON.stringify({ city_ref: cityRef })
+    })
+    .then(r => r.json())
+    .then(data => {
+        document.getElementById('warehouse_loading').style.display = 'none';
+        if (data.success && data.warehouses.length > 0) {
+            allWarehouses = data.warehouses;
+        } else {
+            renderEmpty('warehouse_dropdown', 'Відділення не знайдено');
+        }
+    })
+    .catch(() => {
+        document.getElementById('warehouse_loading').style.display = 'none';
+        renderEmpty('warehouse_dropdown', 'Помилка запиту');
+    });
+}
+
+// Filter warehouses on input
+document.getElementById('warehouse_search').addEventListener('input', function () {
+    const val = this.value.trim().toLowerCase();
+    document.getElementById('address').value = '';
+
+    if (!allWarehouses.length) return;
+
+    if (val.length === 0) {
+        hideDrop('warehouse_dropdown');
+        return;
+    }
+
+    const filtered = allWarehouses.filter(w =>
+        (w.description || '').toLowerCase().includes(val) ||
+        (w.short_address || '').toLowerCase().includes(val) ||
+        (w.number || '').toString().includes(val)
+    ).slice(0, 30);
+
+    if (filtered.length > 0) {
+        renderWarehouseDropdown(filtered);
+    } else {
+        renderEmpty('warehouse_dropdown', 'Нічого не знайдено');
+    }
+});
+
+// Show all warehouses on focus
+document.getElementById('warehouse_search').addEventListener('focus', function () {
+    if (allWarehouses.length > 0 && !document.getElementById('address').value) {
+        renderWarehouseDropdown(allWarehouses.slice(0, 40));
+    }
+});
+
+function renderWarehouseDropdown(warehouses) {
+    const drop = document.getElementById('warehouse_dropdown');
+    drop.style.position = 'absolute';
+    drop.innerHTML = '';
+    warehouses.forEach(w => {
+        const item = document.createElement('div');
+        item.className = 'np-dropdown-item';
+        item.innerHTML = `
+            <div class="np-dropdown-item__main">${w.description || w.short_address}</div>
+            <div class="np-dropdown-item__sub">${w.short_address || ''}</div>
+        `;
+        item.addEventListener('click', () => selectWarehouse(w));
+        drop.appendChild(item);
+    });
+    showDrop('warehouse_dropdown');
+}
+
+function selectWarehouse(w) {
+    document.getElementById('warehouse_search').value = w.description || w.short_address;
+    document.getElementById('address').value = w.description || w.short_address;
+    hideDrop('warehouse_dropdown');
+    document.getElementById('warehouse-error').classList.add('hidden');
+    document.getElementById('warehouse_search').classList.remove('error');
+}
+
+// --- Helpers ---
+function showWarehouseBlock() {
+    document.getElementById('warehouse_block').style.display = 'block';
+}
+function hideWarehouseBlock() {
+    document.getElementById('warehouse_block').style.display = 'none';
+    document.getElementById('address').value = '';
+    allWarehouses = [];
+    hideDrop('warehouse_dropdown');
+}
+function showDrop(id) { document.getElementById(id).style.display = 'block'; }
+function hideDrop(id) { document.getElementById(id).style.display = 'none'; }
+function renderEmpty(dropId, msg) {
+    const drop = document.getElementById(dropId);
+    drop.innerHTML = `<div class="np-dropdown-item" style="color:#888;">${msg}</div>`;
+    showDrop(dropId);
+}
+function getCsrf() {
+    return document.querySelector('[name=csrfmiddlewaretoken]').value;
+}
+
+// Close dropdowns on outside click
+document.addEventListener('click', function (e) {
+    if (!e.target.closest('#city_search') && !e.target.closest('#city_dropdown')) {
+        hideDrop('city_dropdown');
+    }
+    if (!e.target.closest('#warehouse_search') && !e.target.closest('#warehouse_dropdown')) {
+        hideDrop('warehouse_dropdown');
+    }
+});
+
+// ─── Validation ────────────────────────────────────────────────────────
+
+function validateNovaPoshta() {
+    let ok = true;
+
+    const cityRef = document.getElementById('city_ref').value;
+    const cityErr = document.getElementById('city-error');
+    if (!cityRef) {
+        document.getElementById('city_search').classList.add('error');
+        cityErr.classList.remove('hidden');
+        ok = false;
+    } else {
+        document.getElementById('city_search').classList.remove('error');
+        cityErr.classList.add('hidden');
+    }
+
+    const address = document.getElementById('address').value;
+    const wErr = document.getElementById('warehouse-error');
+    if (!address) {
+        document.getElementById('warehouse_search').classList.add('error');
+        wErr.classList.remove('hidden');
+        ok = false;
+    } else {
+        document.getElementById('warehouse_search').classList.remove('error');
+        wErr.classList.add('hidden');
+    }
+
+    return ok;
+}
+
+// ─── Checkout submit ───────────────────────────────────────────────────
+
+function submitCheckout() {
+    const form = document.getElementById('checkoutForm');
+    if (!form.checkValidity()) {
+        form.reportValidity();
+        return;
+    }
+    if (!validateNovaPoshta()) return;
+
+    const formData = new FormData(form);
+    const btn = document.getElementById('payBtn');
+    btn.disabled = true;
+    btn.innerHTML = '<span>Обробка...</span>';
+
+    fetch(checkoutConfig.checkoutUrl, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCsrf() },
+        body: formData
+    })
+    .then(response => {
+        if (response.ok) {
+            document.getElementById('liqpayForm').submit();
+        } else {
+            throw new Error('Помилка обробки замовлення');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Виникла помилка при оформленні замовлення. Спробуйте ще раз.');
+        btn.disabled = false;
+        btn.innerHTML = `<svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2"
+                  d="M3 10h18M7 15h1m4 0h1m-7 4h12a3 3 0 003-3V8a3 3 0 00-3-3H6a3 3 0 00-3 3v8a3 3 0 003 3z"/>
+        </svg> Оплатити ${checkoutConfig.cartTotal} ₴`;
+    });
+}
+
+// ─── Email / Phone validation ──────────────────────────────────────────
+
+document.getElementById('email')?.addEventListener('blur', function () {
+    const emailError = document.getElementById('email-error');
+    if (!/^[^\s@]+@[^\s@]+\.[^\s@]+$/.test(this.value)) {
+        this.classList.add('error');
+        emailError.classList.remove('hidden');
+    } else {
+        this.classList.remove('error');
+        emailError.classList.add('hidden');
+    }
+});
+
+document.getElementById('phone')?.addEventListener('blur', function () {
+    const phoneError = document.getElementById('phone-error');
+    if (!/^\+?[0-9]{10,15}$/.test(this.value)) {
+        this.classList.add('error');
+        phoneError.classList.remove('hidden');
+    } else {
+        this.classList.remove('error');
+        phoneError.classList.add('hidden');
+    }
+});
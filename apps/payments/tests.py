@@ -1,3 +1,140 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.base import UpdateError
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from BulavaArms.db import _in_worker, is_locked_error, retry_on_locked
+from apps.monitoring.slow_queries import explain
+
+from .models import Order
+
+User = get_user_model()
+
+
+def create_order(order_id, **kwargs):
+    kwargs.setdefault('subtotal', Decimal('100.00'))
+    kwargs.setdefault('total', Decimal('100.00'))
+    return Order.objects.create(order_id=order_id, **kwargs)
+
+
+class OrderAdminTests(TestCase):
+    def setUp(self):
+        admin_user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin_user)
+        create_order('ORDER-AAA111', email='ivan@example.com', phone='+380501112233')
+        create_order('ORDER-BBB222', email='olena@example.com', liqpay_payment_id='777001')
+        self.url = reverse('admin:payments_order_changelist')
+
+    def search(self, term):
+        response = self.client.get(self.url, {'q': term})
+        return {order.order_id for order in response.context['cl'].result_list}
+
+    def test_prefix_search_by_identifiers(self):
+        self.assertEqual(self.search('order-aaa'), {'ORDER-AAA111'})
+        self.assertEqual(self.search('olena@'), {'ORDER-BBB222'})
+        self.assertEqual(self.search('+38050'), {'ORDER-AAA111'})
+        self.assertEqual(self.search('777'), {'ORDER-BBB222'})
+
+    def test_search_does_not_match_in_the_middle(self):
+        self.assertEqual(self.search('example.com'), set())
+
+    @skipUnless(connection.vendor == 'sqlite', 'Планы SQLite')
+    def test_prefix_search_uses_indexes(self):
+        queryset = self.client.get(self.url, {'q': 'olena@'}).context['cl'].queryset
+        sql, params = queryset[:100].query.sql_with_params()
+        plan = explain(connection, sql, params)
+        self.assertFalse([step for step in plan if step.startswith('SCAN payments_order')], '\n'.join(plan))
+        for index in ('order_id_ci', 'email_ci', 'phone_ci', 'lp_pay_ci', 'lp_order_ci'):
+            self.assertIn(f'SEARCH payments_order USING INDEX payments_order_{index}', '\n'.join(plan))
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+
+@mock.patch('BulavaArms.db.time.sleep')
+class RetryOnLockedTests(SimpleTestCase):
+    def flaky(self, failures, error=None):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise error or OperationalError('database is locked')
+            return 'ok'
+
+        return func, calls
+
+    def test_retries_until_success(self, sleep):
+        func, calls = self.flaky(2)
+        self.assertEqual(retry_on_locked(func)(), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_gives_up_after_attempts(self, sleep):
+        func, calls = self.flaky(10)
+        with self.assertRaises(OperationalError):
+            retry_on_locked(attempts=3)(func)()
+        self.assertEqual(len(calls), 3)
+
+    def test_wrapped_locked_error(self, sleep):
+        try:
+            try:
+                raise OperationalError('database is locked')
+            except OperationalError as error:
+                raise UpdateError from error
+        except UpdateError as error:
+            wrapped = error
+        self.assertTrue(is_locked_error(wrapped))
+        func, calls = self.flaky(1, wrapped)
+        self.assertEqual(retry_on_locked(func)(), 'ok')
+
+    def test_other_errors_not_retried(self, sleep):
+        func, calls = self.flaky(1, OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(func)()
+        self.assertEqual(len(calls), 1)
+        sleep.assert_not_called()
+
+
+class PoolWorkerTests(SimpleTestCase):
+    def test_pooled_connections_returned_after_call(self):
+        pooled = mock.Mock(settings_dict={'OPTIONS': {'pool': {'max_size': 10}}})
+        persistent = mock.Mock(settings_dict={'OPTIONS': {}})
+
+        def func():
+            raise ValueError
+
+        with mock.patch('BulavaArms.db.connections') as connections, \
+                mock.patch('BulavaArms.db.close_old_connections'), self.assertRaises(ValueError):
+            connections.all.return_value = [pooled, persistent]
+            _in_worker(func)()
+        pooled.close.assert_called_once_with()
+        persistent.close.assert_not_called()
+
+
+class RetryInsideTransactionTests(TestCase):
+    def test_not_retried_inside_atomic(self):
+        calls = []
+
+        @retry_on_locked
+        def func():
+            calls.append(1)
+            raise OperationalError('database is locked')
+
+        with transaction.atomic(), self.assertRaises(OperationalError):
+            func()
+        self.assertEqual(len(calls), 1)
@@ -1,8 +1,8 @@
 # payments/views.py
 import json
+import time
 import uuid
 
-import requests
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import HttpResponse, JsonResponse
@@ -11,12 +11,82 @@ from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.urls import reverse
 from apps.cart.cart import Cart
+from BulavaArms.db import write_transaction
+from BulavaArms.lazy import LazyModule
+from apps.monitoring.metrics import (
+    CHECKOUT_EVENTS, LIQPAY_CALLBACKS, NOVA_POSHTA_ERRORS, NOVA_POSHTA_LATENCY,
+)
 from .models import Order, OrderItem
 from .liqpay_utils import LiqPayAPI
 import logging
 
 logger = logging.getLogger(__name__)
 
+# requests потрібен лише API Нової Пошти — імпорт під час першого звернення
+requests = LazyModule('requests')
+
+NOVA_POSHTA_API_URL = 'https://api.novaposhta.ua/v2.0/json/'
+
+
+def nova_poshta_request(called_method, method_properties):
+    """Запит до API Нової Пошти з метриками часу відповіді та помилок"""
+    payload = {
+        "apiKey": settings.NOVA_POST_KEY,
+        "modelName": "Address",
+        "calledMethod": called_method,
+        "methodProperties": method_properties,
+    }
+    started = time.perf_counter()
+    try:
+        response = requests.post(NOVA_POSHTA_API_URL, json=payload, timeout=10)
+        result = response.json()
+    except requests.exceptions.RequestException as error:
+        NOVA_POSHTA_ERRORS.inc(method=called_method, error=type(error).__name__)
+        raise
+    finally:
+        NOVA_POSHTA_LATENCY.observe(time.perf_counter() - started, method=called_method)
+    if not result.get('success'):
+        NOVA_POSHTA_ERRORS.inc(method=called_method, error='api')
+    return result
+
+
+@write_transaction
+def create_order(order_id, user, cart_items, subtotal, discount, total):
+    """Замовлення з позиціями однією транзакцією запису (з повтором при блокуванні БД)"""
+    # ← Привязываем заказ к пользователю; контакты из профиля — сразу в INSERT
+    contacts = {}
+    if user:
+        contacts = {
+            'email': user.email,
+            'phone': user.phone or '',
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'city': user.city or '',
+            'postal_code': user.postal_code or '',
+            'address': user.address or '',
+        }
+
+    order = Order.objects.create(
+        order_id=order_id,
+        subtotal=subtotal,
+        discount=discount,
+        total=total,
+        status='pending',
+        user=user,
+        **contacts,
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=item['product'],
+            product_name=item['product'].name,
+            quantity=item['quantity'],
+            unit_price=item['price'],
+        )
+        for item in cart_items
+    ])
+    return order
+
 
 def checkout(request):
     cart = Cart(request)
@@ -38,6 +108,7 @@ def checkout(request):
             order.address = request.POST.get('address', '')
             order.delivery_notes = request.POST.get('delivery_notes', '')
             order.save()
+            CHECKOUT_EVENTS.inc(stage='details_saved')
             return HttpResponse(status=200)
         except Order.DoesNotExist:
             return HttpResponse(status=404)
@@ -49,34 +120,18 @@ def checkout(request):
     discount = str(cart.get_discount())
     total = str(cart.get_total_price())
 
-    # ← Привязываем заказ к пользователю
-    order = Order.objects.create(
-        order_id=order_id,
-        subtotal=subtotal,
-        discount=discount,
-        total=total,
-        status='pending',
-        user=request.user if request.user.is_authenticated else None,
-    )
-
-    if request.user.is_authenticated:
-        order.email = request.user.email
-        order.phone = request.user.phone or ''
-        order.first_name = request.user.first_name
-        order.last_name = request.user.last_name
-        order.city = request.user.city or ''
-        order.postal_code = request.user.postal_code or ''
-        order.address = request.user.address or ''
-        order.save()
-
+    cart_items = []
     for item in cart:
-        OrderItem.objects.create(
-            order=order,
-            product=item['product'],
-            product_name=item['product'].name,
-            quantity=item['quantity'],
-            unit_price=item['price'],
-        )
+        cart_items.append({
+            'product': item['product'],
+            'quantity': item['quantity'],
+            'price': item['price'],
+            'total_price': item['total_price'],
+        })
+
+    user = request.user if request.user.is_authenticated else None
+    order = create_order(order_id, user, cart_items, subtotal, discount, total)
+    CHECKOUT_EVENTS.inc(stage='created')
 
     request.session['pending_order_id'] = order_id
 
@@ -93,15 +148,6 @@ def checkout(request):
         server_url=server_url,
     )
 
-    cart_items = []
-    for item in cart:
-        cart_items.append({
-            'product': item['product'],
-            'quantity': item['quantity'],
-            'price': item['price'],
-            'total_price': item['total_price'],
-        })
-
     context = {
         'order': order,
         'cart_items': cart_items,
@@ -126,21 +172,10 @@ def get_nova_poshta_cities(request):
         if not city_name or len(city_name) < 2:
             return JsonResponse({'success': False, 'error': 'Введіть мінімум 2 символи'})
 
-        api_key = settings.NOVA_POST_KEY
-        url = 'https://api.novaposhta.ua/v2.0/json/'
-
-        payload = {
-            "apiKey": api_key,
-            "modelName": "Address",
-            "calledMethod": "searchSettlements",
-            "methodProperties": {
-                "CityName": city_name,
-                "Limit": "10"
-            }
-        }
-
-        response = requests.post(url, json=payload, timeout=10)
-        result = response.json()
+        result = nova_poshta_request('searchSettlements', {
+            "CityName": city_name,
+            "Limit": "10"
+        })
 
         if result.get('success'):
             cities = []
@@ -174,21 +209,10 @@ def get_nova_poshta_warehouses(request):
         if not city_ref:
             return JsonResponse({'success': False, 'error': 'Не вказано місто'})
 
-        api_key = settings.NOVA_POST_KEY
-        url = 'https://api.novaposhta.ua/v2.0/json/'
-
-        payload = {
-            "apiKey": api_key,
-            "modelName": "Address",
-            "calledMethod": "getWarehouses",
-            "methodProperties": {
-                "CityRef": city_ref,
-                "Limit": "400"
-            }
-        }
-
-        response = requests.post(url, json=payload, timeout=10)
-        result = response.json()
+        result = nova_poshta_request('getWarehouses', {
+            "CityRef": city_ref,
+            "Limit": "400"
+        })
 
         if result.get('success'):
             warehouses = []
@@ -211,6 +235,34 @@ def get_nova_poshta_warehouses(request):
         return JsonResponse({'success': False, 'error': f'Помилка: {str(e)}'})
 
 
+LIQPAY_STATUSES = {
+    'success': 'paid',
+    'failure': 'cancelled',
+    'reversed': 'refunded',
+    'sandbox': 'paid',
+    'processing': 'processing',
+}
+
+
+@write_transaction
+def update_order_payment(callback_data):
+    """
+    Статус оплати замовлення з callback LiqPay: (замовлення, попередній статус);
+    (None, None), якщо замовлення немає
+    """
+    try:
+        # Блокування рядка: повторні callback LiqPay бачать статус один одного
+        order = Order.objects.select_for_update().get(order_id=callback_data.get('order_id'))
+    except Order.DoesNotExist:
+        return None, None
+
+    previous_status = order.status
+    order.liqpay_payment_id = callback_data.get('payment_id') or ''
+    order.liqpay_order_id = callback_data.get('liqpay_order_id') or ''
+    order.status = LIQPAY_STATUSES.get(callback_data.get('status'), 'pending')
+    order.save()
+    return order, previous_status
+
 @csrf_exempt
 @require_POST
 def liqpay_callback(request):
@@ -218,36 +270,28 @@ def liqpay_callback(request):
     signature = request.POST.get('signature')
 
     if not data or not signature:
+        LIQPAY_CALLBACKS.inc(outcome='bad_request')
         return HttpResponse(status=400)
 
     liqpay = LiqPayAPI()
     callback_data = liqpay.verify_callback(data, signature)
 
     if not callback_data:
+        LIQPAY_CALLBACKS.inc(outcome='invalid_signature')
         return HttpResponse(status=400)
 
-    order_id = callback_data.get('order_id')
-    status = callback_data.get('status')
-    payment_id = callback_data.get('payment_id')
-    liqpay_order_id = callback_data.get('liqpay_order_id')
-
-    try:
-        order = Order.objects.get(order_id=order_id)
-    except Order.DoesNotExist:
+    # Метрики — після транзакції: при блокуванні БД вона повторюється
+    order, previous_status = update_order_payment(callback_data)
+    if order is None:
+        LIQPAY_CALLBACKS.inc(outcome='unknown_order')
         return HttpResponse(status=404)
 
-    order.liqpay_payment_id = payment_id or ''
-    order.liqpay_order_id = liqpay_order_id or ''
-
-    status_map = {
-        'success': 'paid',
-        'failure': 'cancelled',
-        'reversed': 'refunded',
-        'sandbox': 'paid',
-        'processing': 'processing',
-    }
-    order.status = status_map.get(status, 'pending')
-    order.save()
+    # Статус LiqPay як результат: success, failure, sandbox, ...
+    status = callback_data.get('status')
+    LIQPAY_CALLBACKS.inc(outcome=status if status in LIQPAY_STATUSES else 'other')
+    # LiqPay повторює callback: оплата рахується лише при переході в 'paid'
+    if order.status == 'paid' and previous_status != 'paid':
+        CHECKOUT_EVENTS.inc(stage='paid')
 
     return HttpResponse('OK', status=200)
 
@@ -0,0 +1,19 @@
+"""
+Gunicorn, ASGI (pip install uvicorn): async-каталог и карточка товара,
+по одному циклу событий на воркер. Синхронные view Django выполняет в пуле потоков.
+
+    gunicorn -c deploy/gunicorn_asgi.py
+"""
+import multiprocessing
+import os
+
+from deploy.hooks import PRELOAD_APP, child_exit, post_worker_init, when_ready, worker_exit  # noqa: F401
+
+os.environ.setdefault('ASYNC_VIEWS', '1')
+
+wsgi_app = 'BulavaArms.asgi:application'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+timeout = 30
+preload_app = PRELOAD_APP
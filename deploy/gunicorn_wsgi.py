@@ -0,0 +1,17 @@
+"""
+Gunicorn, WSGI: синхронные view, потоки на воркер.
+
+    gunicorn -c deploy/gunicorn_wsgi.py
+"""
+import multiprocessing
+import os
+
+from deploy.hooks import PRELOAD_APP, child_exit, post_worker_init, when_ready, worker_exit  # noqa: F401
+
+wsgi_app = 'BulavaArms.wsgi:application'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('THREADS', '4'))
+timeout = 30
+preload_app = PRELOAD_APP
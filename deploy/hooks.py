@@ -0,0 +1,59 @@
+"""
+Прогрев воркеров gunicorn, общий для gunicorn_wsgi.py и gunicorn_asgi.py.
+
+PRELOAD_APP=1 (по умолчанию): приложение загружается и прогревается один раз
+в мастер-процессе до запуска воркеров (when_ready). Воркеры, в том числе
+перезапущенные по max_requests, получают импорты, скомпилированные шаблоны,
+кэш в памяти и индексы каталога через fork и не идут в БД все разом.
+До fork мастер закрывает соединения с БД и кэшем и замораживает сборщик
+мусора (prepare_fork).
+
+PRELOAD_APP=0: каждый воркер прогревается сам после загрузки приложения
+(post_worker_init) — медленнее, но код можно обновлять через HUP.
+
+Перед выходом воркер записывает последние значения метрик (worker_exit), затем
+мастер переносит его файл в общий архив (child_exit).
+"""
+import os
+
+PRELOAD_APP = os.getenv('PRELOAD_APP', '1') == '1'
+
+
+def _warm_up(log, where):
+    from apps.main.warmup import warm_up
+
+    # Прогрев — оптимизация: без него воркеры заполнят кэши сами, сервер должен запуститься
+    try:
+        timings = warm_up()
+    except Exception:
+        log.exception('Прогрев (%s) не удался, воркеры запускаются без него', where)
+        return
+    log.info('Прогрев (%s): %s', where, ', '.join(f'{name} {ms:.0f} мс' for name, ms in timings.items()))
+
+
+def when_ready(server):
+    if PRELOAD_APP:
+        from apps.main.warmup import prepare_fork
+
+        _warm_up(server.log, 'мастер')
+        prepare_fork()
+
+
+def post_worker_init(worker):
+    if not PRELOAD_APP:
+        _warm_up(worker.log, f'воркер {worker.pid}')
+
+
+def worker_exit(server, worker):
+    if os.getenv('METRICS_DIR'):
+        from apps.monitoring.metrics import REGISTRY
+
+        REGISTRY.flush_pending()
+
+
+def child_exit(server, worker):
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        from apps.monitoring.metrics import mark_process_dead
+
+        mark_process_dead(directory, worker.pid)